@@ -1,11 +1,14 @@
 from fastapi import APIRouter, HTTPException
-from app.models.schema import IngestRequest, IngestResponse
-from app.services.paper import  fetch_paper
-from app.services.embedding import generate_embedding
-from app.utils.text_cleaning import clean_text, chunk_text
-from app.core.config import configs
-from app.core.logging import logger
-from app.db.database import db
+from app.models.schema import IngestRequest, IngestResponse, IngestJob, ReindexRequest, ReindexStatus
+from app.db.vector_store import get_vector_store
+from app.services.ingestion import create_pipeline
+from app.services.jobs import ingestion_jobs
+from app.services.reindex import reindex_jobs
+from app.core.logging import get_logger
+
+
+logger = get_logger(__name__)
+
 
 router = APIRouter()
 
@@ -14,55 +17,73 @@ router = APIRouter()
 async def ingest_paper(request: IngestRequest):
     try:
         logger.info(f"Starting ingestion of {request.max_papers} papers...")
-        
-        papers = await  fetch_paper(request.max_papers)
-        
-        if not papers:
+
+        pipeline = create_pipeline(request)
+        write_stats = await pipeline.run()
+
+        if not pipeline.papers_fetched and not request.incremental:
             raise HTTPException(status_code=404, detail="No papers found")
-        
-        collection = db.get_collection()
-        total_chunks = 0
-        
-        for i, paper in enumerate(papers, 1):
-            logger.info(f"Processing paper {i}/{len(papers)}: {paper.arxiv_id}")
-            
-            clean_abstract = clean_text(paper.abstract)
-            
-            chunks = chunk_text(
-                clean_abstract,
-                chunk_size=configs.chunk_size,
-                overlap=configs.chunk_overlap
-            )
-            logger.info(f"Created {len(chunks)} chunks")
-            
-            for chunk_idx, chunk in enumerate(chunks):
-                embedding = generate_embedding(chunk)
-                
-                doc = {
-                    "arxiv_id": paper.arxiv_id,
-                    "title": paper.title,
-                    "authors": paper.authors,
-                    "published": paper.published,
-                    "categories": paper.categories,
-                    "chunk_text": chunk,
-                    "chunk_index": chunk_idx,
-                    "embedding": embedding
-                }
-                
-                await collection.insert_one(doc)
-                total_chunks += 1
-            
-            logger.info(f"Stored {len(chunks)} chunks for {paper.arxiv_id}")
-        
-        message = f"Successfully ingested {len(papers)} papers with {total_chunks} chunks"
+
+        total_chunks = write_stats.documents
+        skipped_chunks = pipeline.chunks_skipped + write_stats.duplicates
+        logger.info(
+            f"Stored {total_chunks} chunks in {write_stats.batches} batches "
+            f"({write_stats.throughput_docs_per_sec} chunks/s)"
+        )
+
+        message = (
+            f"Successfully ingested {pipeline.papers_fetched} papers with {total_chunks} new chunks "
+            f"({skipped_chunks} already stored)"
+        )
         logger.info(message)
-        
+
         return IngestResponse(
-            papers_processed=len(papers),
+            papers_processed=pipeline.papers_fetched,
             chunks_created=total_chunks,
-            message=message
+            chunks_skipped=skipped_chunks,
+            message=message,
+            write_stats=write_stats
         )
-    
+
     except Exception as e:
         logger.error(f"Ingestion failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/jobs", response_model=IngestJob, status_code=202)
+async def submit_ingest_job(request: IngestRequest):
+    if not ingestion_jobs.running:
+        raise HTTPException(status_code=503, detail="Ingestion job queue is not running")
+    
+    return await ingestion_jobs.submit(request)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJob)
+async def get_ingest_job(job_id: str):
+    job = await ingestion_jobs.get(job_id) if ingestion_jobs.running else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+
+@router.delete("/jobs/{job_id}", response_model=IngestJob)
+async def cancel_ingest_job(job_id: str):
+    job = await ingestion_jobs.cancel(job_id) if ingestion_jobs.running else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+
+@router.post("/reindex", response_model=ReindexStatus, status_code=202)
+async def start_reindex(request: ReindexRequest):
+    try:
+        return reindex_jobs.start(request, get_vector_store())
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/reindex", response_model=ReindexStatus)
+async def get_reindex():
+    return reindex_jobs.status()
@@ -1,9 +1,20 @@
+import json
+from typing import List, Dict, Any, AsyncIterator, Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models.schema import QueryRequest, QueryResponse, Reference
-from app.services.retrieval import search_papers
-from app.services.generation import generate_answer
-from app.core.logging import logger
-from app.db.database import db
+from app.services.retrieval import search_papers, build_search_filter
+from app.services.generation import generate_answer, stream_answer
+from app.services.embedding import generate_embedding
+from app.services.answer_cache import answer_cache
+from app.core.config import configs
+from app.core.logging import get_logger
+from app.db.vector_store import get_vector_store
+from app.utils.text_cleaning import ANSWER, StreamingCleaner, clean_text
+
+
+logger = get_logger(__name__)
+
 
 router = APIRouter()
 
@@ -13,32 +24,153 @@ async def query_case(request: QueryRequest):
     try:
         logger.info(f"Received query: '{request.case_description[:100]}...'")
         
-        collection = db.get_collection()
+        store = get_vector_store()
+        
+        query_embedding = await embed_query(request.case_description, store.space.model, store.space.version)
+        
+        retrieved_docs = await search_papers(
+            request.case_description,
+            store,
+            query_embedding=query_embedding,
+            filters=build_search_filter(request),
+            embed_if_missing=False
+        )
         
-        retrieved_docs = await search_papers(request.case_description, collection)
+        chunk_ids = retrieved_chunk_ids(retrieved_docs)
+        use_cache = configs.answer_cache_enabled and bool(chunk_ids) and query_embedding is not None
         
-        answer = generate_answer(request.case_description, retrieved_docs)
+        if use_cache:
+            cached = answer_cache.lookup(query_embedding, chunk_ids)
+            if cached is not None:
+                logger.info("Answer cache hit")
+                return cached
         
-        references = []
-        seen_ids = set()
+        # Cleaned as /case/stream cleans its tokens; the cache holds cleaned answers for both.
+        answer = clean_text(await generate_answer(request.case_description, retrieved_docs), ANSWER)
         
-        for doc in retrieved_docs:
-            arxiv_id = doc["arxiv_id"]
-            if arxiv_id not in seen_ids:
-                references.append(Reference(
-                    arxiv_id=arxiv_id,
-                    title=doc["title"],
-                    score=doc.get("score", 0.0)
-                ))
-                seen_ids.add(arxiv_id)
+        references = build_references(retrieved_docs)
         
         logger.info(f"Query complete. Found {len(references)} unique papers")
         
-        return QueryResponse(
+        response = QueryResponse(
             answer=answer,
             references=references
         )
+        
+        if use_cache:
+            answer_cache.store(query_embedding, chunk_ids, response)
+        
+        return response
     
     except Exception as e:
         logger.error(f"Query failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/case/stream")
+async def query_case_stream(request: QueryRequest):
+    try:
+        logger.info(f"Received streaming query: '{request.case_description[:100]}...'")
+        
+        store = get_vector_store()
+        
+        query_embedding = await embed_query(request.case_description, store.space.model, store.space.version)
+        
+        retrieved_docs = await search_papers(
+            request.case_description,
+            store,
+            query_embedding=query_embedding,
+            filters=build_search_filter(request),
+            embed_if_missing=False
+        )
+    
+    except Exception as e:
+        logger.error(f"Query failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    chunk_ids = retrieved_chunk_ids(retrieved_docs)
+    use_cache = configs.answer_cache_enabled and bool(chunk_ids) and query_embedding is not None
+    references = build_references(retrieved_docs)
+    
+    async def events() -> AsyncIterator[str]:
+        yield _event("references", references=[ref.model_dump() for ref in references])
+        
+        cleaner = StreamingCleaner()
+        answer = []
+        
+        try:
+            cached = answer_cache.lookup(query_embedding, chunk_ids) if use_cache else None
+            if cached is not None:
+                logger.info("Answer cache hit")
+                # Already cleaned, and cleaning it again is not a no-op.
+                yield _event("token", text=cached.answer)
+            else:
+                async for token in stream_answer(request.case_description, retrieved_docs):
+                    text = cleaner.feed(token)
+                    if text:
+                        answer.append(text)
+                        yield _event("token", text=text)
+                
+                text = cleaner.flush()
+                if text:
+                    answer.append(text)
+                    yield _event("token", text=text)
+        
+        except Exception as e:
+            logger.error(f"Streaming query failed: {e}")
+            yield _event("error", detail=str(e))
+            return
+        
+        if use_cache and cached is None:
+            answer_cache.store(
+                query_embedding,
+                chunk_ids,
+                QueryResponse(answer="".join(answer), references=references)
+            )
+        
+        logger.info(f"Streaming query complete. Found {len(references)} unique papers")
+        yield _event("done")
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+async def embed_query(text: str, model: str = None, version: int = None) -> Optional[List[float]]:
+    try:
+        # The query must be embedded by the model that produced the searched vectors.
+        return await generate_embedding(text, model=model, version=version)
+    except Exception as e:
+        # Retrieval can still answer from the lexical index without an embedding.
+        logger.warning(f"Query embedding failed: {e}")
+        return None
+
+
+def retrieved_chunk_ids(retrieved_docs: List[Dict[str, Any]]) -> List[str]:
+    # Collapsed entries stand for several stored chunks.
+    chunk_ids = []
+    for doc in retrieved_docs:
+        if "chunk_ids" in doc:
+            chunk_ids.extend(doc["chunk_ids"])
+        elif "_id" in doc:
+            chunk_ids.append(str(doc["_id"]))
+    return chunk_ids
+
+
+def build_references(retrieved_docs: List[Dict[str, Any]]) -> List[Reference]:
+    references = []
+    seen_ids = set()
+    
+    for doc in retrieved_docs:
+        arxiv_id = doc["arxiv_id"]
+        if arxiv_id not in seen_ids:
+            references.append(Reference(
+                arxiv_id=arxiv_id,
+                title=doc["title"],
+                score=doc.get("score", 0.0)
+            ))
+            seen_ids.add(arxiv_id)
+    
+    return references
+
+
+def _event(event_type: str, **payload) -> str:
+    return json.dumps({"type": event_type, **payload}) + "\n"
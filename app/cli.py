@@ -0,0 +1,324 @@
+"""Command-line tools.
+
+    python -m app.cli ingest sample_xml.xml dumps/ --backend local --workers 4
+    python -m app.cli reindex --model nomic-embed-text
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Dict, Any, Optional
+from app.core.config import configs
+from app.core.logging import get_logger
+from app.db.chunk_writer import ChunkWriter
+from app.db.database import db
+from app.db.embedding_spaces import embedding_spaces, new_space
+from app.db.local_vector_store import LocalVectorStore, StoreLockedError
+from app.db.vector_store import VectorStore, AtlasVectorStore
+from app.models.schema import Paper, WriteStats
+from app.services.embedding_cache import embedding_cache
+from app.services.ingestion import ChunkPlanner, build_chunk_docs_batch, store_chunks
+from app.services.ollama_client import ollama_client
+from app.services.paper import AtomEntryParser
+from app.services.reindex import Reindexer
+from app.utils.arxiv_ids import split_arxiv_id
+
+
+logger = get_logger(__name__)
+
+
+ATOM_SUFFIXES = {".xml", ".atom"}
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+
+# Field names of the arXiv API and of the arXiv metadata snapshot on Kaggle.
+FIELD_ALIASES = {
+    "arxiv_id": ("arxiv_id", "id"),
+    "title": ("title",),
+    "abstract": ("abstract", "summary"),
+    "authors": ("authors",),
+    "published": ("published",),
+    "updated": ("updated", "update_date"),
+    "categories": ("categories",),
+}
+
+
+def iter_input_files(paths: Iterable[Path]) -> Iterator[Path]:
+    suffixes = ATOM_SUFFIXES | JSONL_SUFFIXES
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob("*") if p.suffix in suffixes)
+        else:
+            yield path
+
+
+def iter_atom_papers(path: Path) -> Iterator[Paper]:
+    parser = AtomEntryParser()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            yield from parser.feed(block)
+    yield from parser.close()
+
+
+def iter_jsonl_papers(path: Path) -> Iterator[Paper]:
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                paper = paper_from_record(json.loads(line))
+            except (json.JSONDecodeError, ValueError) as e:
+                logger.warning(f"Skipping {path}:{line_number}: {e}")
+                continue
+            if paper is not None:
+                yield paper
+
+
+def iter_papers(paths: Iterable[Path]) -> Iterator[Paper]:
+    for path in iter_input_files(paths):
+        logger.info(f"Reading {path}")
+        if path.suffix in ATOM_SUFFIXES:
+            yield from iter_atom_papers(path)
+        elif path.suffix in JSONL_SUFFIXES:
+            yield from iter_jsonl_papers(path)
+        else:
+            logger.warning(f"Skipping {path}: unsupported file type")
+
+
+def paper_from_record(record: Dict[str, Any]) -> Optional[Paper]:
+    fields = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if record.get(alias) not in (None, ""):
+                fields[field] = record[alias]
+                break
+
+    if "arxiv_id" not in fields or "abstract" not in fields:
+        return None
+
+    authors = fields.get("authors", [])
+    categories = fields.get("categories", [])
+    # The Kaggle snapshot lists versions instead: [{"version": "v1", "created": "Mon, 2 Apr 2007 ..."}, ...]
+    versions = record.get("versions") or []
+    published = (
+        _parse_date(fields.get("published"))
+        or (_parse_date(versions[0].get("created")) if versions else None)
+        or datetime.now(timezone.utc)
+    )
+    arxiv_id = str(fields["arxiv_id"])
+    if versions and versions[-1].get("version") and split_arxiv_id(arxiv_id)[1] is None:
+        arxiv_id += versions[-1]["version"]
+
+    return Paper(
+        arxiv_id=arxiv_id,
+        title=fields.get("title", str(fields["arxiv_id"])),
+        authors=[authors] if isinstance(authors, str) else authors,
+        published=published,
+        updated=_parse_date(fields.get("updated")),
+        categories=categories.split() if isinstance(categories, str) else categories,
+        abstract=" ".join(str(fields["abstract"]).split())
+    )
+
+
+def _parse_date(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return value
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return parsedate_to_datetime(value)
+
+
+def prepare_batch(papers: List[Paper], max_tokens: int, overlap_tokens: int) -> List[dict]:
+    """Runs in a worker process: the regex cleaning and chunking are CPU-bound."""
+    return build_chunk_docs_batch(papers, max_tokens, overlap_tokens)
+
+
+class BulkLoader:
+    """Loads papers into a vector store without going through the API server.
+
+    Clean/chunk batches run in a process pool while earlier batches are
+    embedded and written, with at most two batches per worker in flight.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        workers: int = None,
+        batch_papers: int = 64,
+        report_every: float = 5.0
+    ):
+        self.store = store
+        self.workers = os.cpu_count() if workers is None else workers
+        self.batch_papers = batch_papers
+        self.report_every = report_every
+        self.writer = ChunkWriter(store)
+
+        self.papers_read = 0
+        self.chunks_created = 0
+        self.chunks_skipped = 0
+        self.planner = ChunkPlanner()
+        self._started = None
+        self._last_report = 0.0
+
+    async def run(self, papers: Iterable[Paper]) -> WriteStats:
+        loop = asyncio.get_running_loop()
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 0 else None
+        max_pending = max(1, self.workers) * 2
+        pending = deque()
+
+        self._started = time.perf_counter()
+        try:
+            async with self.writer:
+                for batch in _batched(papers, self.batch_papers):
+                    self.papers_read += len(batch)
+                    if executor is None:
+                        future = loop.create_future()
+                        future.set_result(prepare_batch(batch, configs.chunk_max_tokens, configs.chunk_overlap_tokens))
+                    else:
+                        future = loop.run_in_executor(
+                            executor, prepare_batch, batch, configs.chunk_max_tokens, configs.chunk_overlap_tokens
+                        )
+                    pending.append(future)
+
+                    if len(pending) >= max_pending:
+                        await self._store(await pending.popleft())
+
+                while pending:
+                    await self._store(await pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        self._report(force=True)
+        return self.writer.stats()
+
+    async def _store(self, docs: List[dict]):
+        self.chunks_created += len(docs)
+
+        new_docs = await store_chunks(self.store, self.writer, self.planner, docs)
+        self.chunks_skipped += len(docs) - len(new_docs)
+
+        self._report()
+
+    def _report(self, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self._last_report < self.report_every:
+            return
+        self._last_report = now
+
+        elapsed = max(now - self._started, 1e-9)
+        logger.info(
+            f"{self.papers_read} papers, {self.chunks_created} chunks "
+            f"({self.chunks_skipped} already stored), {self.writer.documents_written} written, "
+            f"{self.papers_read / elapsed:.1f} papers/s, {self.chunks_created / elapsed:.1f} chunks/s"
+        )
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+async def open_store(args) -> VectorStore:
+    """The store the command works on, searching the persisted active embedding space.
+
+    A local store is locked for the command's run: a running API server has
+    it open and would not see the writes until restarted.
+    """
+    if args.backend == "local":
+        store = LocalVectorStore(args.index_path or configs.local_index_path, exclusive=True)
+        await embedding_spaces.refresh(store)
+        return store
+
+    await db.connect()
+    await db.ensure_indexes()
+    await embedding_spaces.refresh(AtlasVectorStore(db.get_collection(), spaces=db.get_space_collection()))
+    return AtlasVectorStore(db.get_collection(), space=embedding_spaces.current(), spaces=db.get_space_collection())
+
+
+async def close_store(store: VectorStore):
+    await ollama_client.close()
+    embedding_cache.close()
+    if isinstance(store, LocalVectorStore):
+        store.close()
+    else:
+        await db.close()
+
+
+async def run_ingest(args) -> WriteStats:
+    store = await open_store(args)
+
+    try:
+        loader = BulkLoader(store, workers=args.workers, batch_papers=args.batch_papers)
+        stats = await loader.run(iter_papers(args.paths))
+    finally:
+        await close_store(store)
+
+    logger.info(
+        f"Ingested {loader.papers_read} papers: {stats.documents} chunks written in "
+        f"{stats.batches} batches ({stats.throughput_docs_per_sec} chunks/s), "
+        f"{loader.chunks_skipped + stats.duplicates} already stored"
+    )
+    return stats
+
+
+async def run_reindex(args):
+    store = await open_store(args)
+
+    try:
+        reindexer = Reindexer(
+            store,
+            new_space(args.model, args.version),
+            batch_size=args.batch_size,
+            switch=not args.no_switch
+        )
+        space = await reindexer.run()
+    finally:
+        await close_store(store)
+
+    state = "now active" if not args.no_switch else "ready to switch"
+    logger.info(f"Re-embedded {reindexer.chunks_embedded} chunks into {space.name}; {state}")
+    return space
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Medical RAG command-line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Bulk-load local Atom XML or JSONL dumps")
+    ingest.add_argument("paths", nargs="+", type=Path, help="files or directories to load")
+    ingest.add_argument("--backend", choices=["atlas", "local"], default=configs.vector_backend)
+    ingest.add_argument("--index-path", default=None, help="local vector store directory")
+    ingest.add_argument("--workers", type=int, default=os.cpu_count(), help="clean/chunk processes, 0 to run inline")
+    ingest.add_argument("--batch-papers", type=int, default=64)
+
+    reindex = commands.add_parser("reindex", help="Re-embed stored chunks with another model and switch to it")
+    reindex.add_argument("--model", required=True, help="embedding model to re-embed with")
+    reindex.add_argument("--version", type=int, default=1, help="bump to re-embed with an updated model of the same name")
+    reindex.add_argument("--backend", choices=["atlas", "local"], default=configs.vector_backend)
+    reindex.add_argument("--index-path", default=None, help="local vector store directory")
+    reindex.add_argument("--batch-size", type=int, default=None)
+    reindex.add_argument("--no-switch", action="store_true", help="fill the new space but keep searching the old one")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "ingest":
+            asyncio.run(run_ingest(args))
+        elif args.command == "reindex":
+            asyncio.run(run_reindex(args))
+    except StoreLockedError as e:
+        parser.exit(1, f"{e}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Dict, List
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -7,16 +8,96 @@ class Settings(BaseSettings):
     mongodb_uri: str=os.getenv("MONGODB_URI")
     database_name: str = os.getenv("DATABASE_NAME")
     collection_name: str = os.getenv("COLLECTION_NAME")
+    checkpoint_collection_name: str = "ingestion_checkpoints"
+    job_collection_name: str = "ingestion_jobs"
+    embedding_space_collection_name: str = "embedding_spaces"
     
     ollama_url: str = os.getenv("OLLAMA_URL")
     embedding_model: str = os.getenv("EMBEDDING_MODEL")
+    # Tags the vectors of embedding_model; bump it to re-embed with an updated model of the same name.
+    embedding_model_version: int = 1
     llm_model: str = os.getenv("LLM_MODEL")
+    llm_keep_alive: str = "30m"
     
-    chunk_size: int = 500
-    chunk_overlap: int = 50
+    arxiv_url: str = "https://export.arxiv.org/api/query"
+    arxiv_queries: List[str] = ["cat:q-bio.TO"]
+    arxiv_page_size: int = 50
+    arxiv_rate_per_sec: float = 1 / 3
+    arxiv_burst: int = 1
+    arxiv_concurrency: int = 4
+    arxiv_max_retries: int = 4
+    arxiv_backoff_base: float = 1.0
+    arxiv_backoff_max: float = 30.0
+    arxiv_timeout: float = 30.0
+    
+    embedding_batch_size: int = 32
+    embedding_concurrency: int = 4
+    llm_concurrency: int = 2
+    model_concurrency: Dict[str, int] = {}
+    
+    embedding_cache_enabled: bool = True
+    embedding_cache_size: int = 10000
+    embedding_cache_path: str = ".cache/embeddings.sqlite3"
+    
+    write_batch_size: int = 500
+    write_flush_interval: float = 1.0
+    write_max_inflight: int = 2
+    
+    pipeline_queue_size: int = 64
+    ingest_job_concurrency: int = 1
+    ingest_job_progress_interval: float = 2.0
+    
+    # In estimated tokens; chunks never exceed the embedding model's input limit.
+    chunk_max_tokens: int = 128
+    chunk_overlap_tokens: int = 16
+    embedding_max_tokens: int = 512
     
     top_k: int = 5
     min_score: float = 0.7
+    num_candidates_factor: int = 10
+    
+    hybrid_search_enabled: bool = True
+    hybrid_depth_factor: int = 4
+    rrf_k: int = 60
+    # A chunk only BM25 found must match a query term that occurs in at most this
+    # share of the indexed papers, or in at most lexical_min_df papers.
+    lexical_max_df: float = 0.01
+    lexical_min_df: int = 3
+    
+    mmr_enabled: bool = True
+    mmr_lambda: float = 0.5
+    mmr_depth_factor: int = 4
+    context_max_tokens: int = 1500
+    
+    vector_backend: str = "atlas"
+    vector_index_name: str = "vector_index"
+    # "array", or packed BSON binary vectors: "float32" or "int8". Changing it
+    # does not convert stored chunks, so only do it on an empty collection.
+    embedding_storage: str = "array"
+    vector_index_provisioning: bool = True
+    vector_index_ready_timeout: float = 600.0
+    vector_index_poll_interval: float = 5.0
+    local_index_path: str = ".cache/vector_store"
+    local_ivf_min_vectors: int = 50000
+    local_ivf_nlist: int = 0
+    local_quantization: str = "none"
+    local_rescore_factor: int = 4
+    
+    reindex_batch_size: int = 256
+    embedding_space_refresh_interval: float = 30.0
+    
+    log_level: str = "INFO"
+    log_format: str = "json"
+    # Per-module levels, e.g. {"services.ingestion": "WARNING"}.
+    log_levels: Dict[str, str] = {}
+    # Keep one in N records of these high-volume events.
+    log_sample_every: Dict[str, int] = {"chunks_created": 100, "embedding_progress": 10}
+    log_queue_size: int = 10000
+    
+    answer_cache_enabled: bool = True
+    answer_cache_size: int = 256
+    answer_cache_ttl: float = 3600.0
+    answer_cache_max_distance: float = 0.05
 
 
 configs = Settings()
\ No newline at end of file
@@ -1,21 +1,185 @@
+import atexit
+import itertools
+import json
 import logging
+import queue
 import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from app.core.config import configs
 
 
-def setup_logger(name: str = "medical_rag") -> logging.Logger:
+ROOT_LOGGER = "medical_rag"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+job_id_var: ContextVar[Optional[str]] = ContextVar("job_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via extra=.
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "job_id"}
+
+
+class ContextFilter(logging.Filter):
+    """Tags records with the current request/job IDs and samples high-volume events.
+
+    Runs in the logging thread's caller, where the context variables are set.
+    Records logged with extra={"event": name} are kept once every
+    sample_every[name] calls.
+    """
+
+    def __init__(self, sample_every: Dict[str, int] = None):
+        super().__init__()
+        self.sample_every = dict(sample_every or {})
+        self._counters: Dict[str, itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        every = self.sample_every.get(event, 1) if event else 1
+        if every > 1:
+            counter = self._counters.setdefault(event, itertools.count())
+            if next(counter) % every:
+                return False
+            record.sampled_every = every
+
+        record.request_id = request_id_var.get()
+        record.job_id = job_id_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread; drops them rather than block when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the message is merged here; JSON encoding and tracebacks are
+        # formatted on the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ("request_id", "job_id"):
+            if getattr(record, field, None):
+                entry[field] = getattr(record, field)
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        ids = [f"{field}={getattr(record, field)}" for field in ("request_id", "job_id") if getattr(record, field, None)]
+        return f"{text} [{' '.join(ids)}]" if ids else text
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logger(name: str = ROOT_LOGGER, stream=None) -> logging.Logger:
+    """Configures the application logger to write through a queue on a background thread.
+
+    Callers never block on stdout: records are queued, and formatted and
+    written by a QueueListener thread.
+    """
+    global _listener
+
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    
+    logger.setLevel(configs.log_level)
+
     if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%H:%M:%S'
-        )
-        handler.setFormatter(formatter)
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JsonFormatter() if configs.log_format == "json" else TextFormatter())
+
+        log_queue = queue.Queue(maxsize=configs.log_queue_size)
+        handler = NonBlockingQueueHandler(log_queue)
+        handler.addFilter(ContextFilter(configs.log_sample_every))
         logger.addHandler(handler)
-    
+
+        _listener = QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+    for module, level in configs.log_levels.items():
+        logging.getLogger(f"{name}.{module}").setLevel(level)
+
     return logger
 
 
-logger = setup_logger()
\ No newline at end of file
+def shutdown_logging():
+    """Flushes queued records; called at exit."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(module: str) -> logging.Logger:
+    """Child of the application logger named after the module, e.g. medical_rag.services.ingestion.
+
+    Per-module levels in configs.log_levels use the same names without the
+    medical_rag prefix.
+    """
+    if module.startswith("app."):
+        module = module[len("app."):]
+    return logging.getLogger(f"{ROOT_LOGGER}.{module}")
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving each request a correlation ID.
+
+    An incoming X-Request-ID header is reused, otherwise one is generated;
+    it is set for log records and echoed in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+logger = setup_logger()
@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+from typing import Optional
+from app.models.schema import IngestCheckpoint
+
+
+class CheckpointStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def load(self, query: str) -> Optional[IngestCheckpoint]:
+        doc = await self.collection.find_one({"_id": query})
+        if not doc:
+            return None
+
+        doc.pop("_id")
+        return IngestCheckpoint(query=query, **doc)
+
+    async def save(self, checkpoint: IngestCheckpoint):
+        checkpoint.updated_at = datetime.now(timezone.utc)
+        await self.collection.replace_one(
+            {"_id": checkpoint.query},
+            checkpoint.model_dump(exclude={"query"}),
+            upsert=True
+        )
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from typing import List, Dict, Any
+from pymongo.errors import BulkWriteError
+from app.core.config import configs
+from app.core.logging import get_logger
+from app.models.schema import WriteStats
+
+
+logger = get_logger(__name__)
+
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class ChunkWriter:
+    def __init__(
+        self,
+        collection,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_inflight: int = None
+    ):
+        self.collection = collection
+        self.batch_size = batch_size or configs.write_batch_size
+        self.flush_interval = flush_interval if flush_interval is not None else configs.write_flush_interval
+        self.max_inflight = max_inflight or configs.write_max_inflight
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._writes = set()
+        self._timer = None
+        self._last_flush = time.perf_counter()
+        self._started = None
+        self._error = None
+
+        self.batch_latencies: List[float] = []
+        self.documents_written = 0
+        self.duplicates_skipped = 0
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._last_flush = self._started
+        if self.flush_interval > 0:
+            self._timer = asyncio.create_task(self._flush_periodically())
+
+    async def add(self, doc: Dict[str, Any]):
+        self._raise_on_error()
+        self._buffer.append(doc)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def add_many(self, docs: List[Dict[str, Any]]):
+        for doc in docs:
+            await self.add(doc)
+
+    async def flush(self):
+        if not self._buffer:
+            return
+
+        # Waiting for a free slot is what pushes back on the producer: once
+        # max_inflight batches are being written, add() blocks until one lands.
+        # The buffer is only taken once a slot is held, so a flush cancelled
+        # while it waits (the timer, on close) leaves its documents for drain().
+        await self._slots.acquire()
+        if not self._buffer:
+            self._slots.release()
+            return
+
+        batch = self._buffer
+        self._buffer = []
+        self._last_flush = time.perf_counter()
+        task = asyncio.create_task(self._write(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def drain(self):
+        await self.flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        self._raise_on_error()
+
+    async def close(self):
+        if self._timer:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+
+        await self.drain()
+
+    def stats(self) -> WriteStats:
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        latencies_ms = [round(latency * 1000, 2) for latency in self.batch_latencies]
+
+        return WriteStats(
+            batches=len(latencies_ms),
+            documents=self.documents_written,
+            duplicates=self.duplicates_skipped,
+            batch_latencies_ms=latencies_ms,
+            mean_batch_latency_ms=round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else 0.0,
+            max_batch_latency_ms=max(latencies_ms, default=0.0),
+            throughput_docs_per_sec=round(self.documents_written / elapsed, 2) if elapsed > 0 else 0.0
+        )
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            latency = time.perf_counter() - start
+            self.batch_latencies.append(latency)
+            self.documents_written += len(batch)
+            logger.info(f"Wrote batch of {len(batch)} chunks in {latency * 1000:.1f} ms")
+        except BulkWriteError as e:
+            # With ordered=False every non-conflicting document is still
+            # inserted; chunks another run already stored are not an error.
+            errors = e.details.get("writeErrors", [])
+            inserted = e.details.get("nInserted", 0)
+            if errors and all(error.get("code") == DUPLICATE_KEY_ERROR for error in errors):
+                self.batch_latencies.append(time.perf_counter() - start)
+                self.documents_written += inserted
+                self.duplicates_skipped += len(errors)
+                logger.info(f"Wrote batch of {inserted} chunks, skipped {len(errors)} duplicates")
+            else:
+                logger.error(f"Bulk write of {len(batch)} chunks failed: {e}")
+                if self._error is None:
+                    self._error = e
+        except Exception as e:
+            logger.error(f"Bulk write of {len(batch)} chunks failed: {e}")
+            if self._error is None:
+                self._error = e
+        finally:
+            self._slots.release()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._buffer and time.perf_counter() - self._last_flush >= self.flush_interval:
+                await self.flush()
+
+    def _raise_on_error(self):
+        if self._error is not None:
+            raise self._error
@@ -1,12 +1,20 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
 from app.core.config import configs
-from app.core.logging import logger
+from app.core.logging import get_logger
+
+
+logger = get_logger(__name__)
+
 
 class Database:    
     def __init__(self):
         self.client = None
         self.db = None
         self.collection = None
+        self.checkpoints = None
+        self.jobs = None
+        self.spaces = None
     
     async def connect(self):
         try:
@@ -17,12 +25,60 @@ class Database:
             
             self.db = self.client[configs.database_name]
             self.collection = self.db[configs.collection_name]
+            self.checkpoints = self.db[configs.checkpoint_collection_name]
+            self.jobs = self.db[configs.job_collection_name]
+            self.spaces = self.db[configs.embedding_space_collection_name]
             
             logger.info("Connected to MongoDB successfully")
         except Exception as e:
             logger.error(f"✗ Failed to connect to MongoDB: {e}")
             raise
     
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [
+                ("arxiv_id", ASCENDING),
+                ("version", ASCENDING),
+                ("chunk_index", ASCENDING),
+                ("content_hash", ASCENDING)
+            ],
+            name="chunk_key",
+            unique=True,
+            partialFilterExpression={"content_hash": {"$exists": True}}
+        )
+        await self.collection.create_index(
+            [("arxiv_id", ASCENDING), ("chunk_index", ASCENDING)],
+            name="paper_chunks"
+        )
+        await self.collection.create_index([("content_hash", ASCENDING)], name="content_hash")
+        await self.jobs.create_index(
+            [("status", ASCENDING), ("created_at", ASCENDING)],
+            name="job_status"
+        )
+        logger.info("Chunk indexes ready")
+        await self.migrate_arxiv_ids()
+
+    async def migrate_arxiv_ids(self):
+        """Moves the version suffix out of arxiv_id in chunks stored before IDs were split.
+
+        Chunks stored before versions were tracked get the suffix as their
+        version. They have no content_hash either; ChunkPlanner replaces them
+        the next time their paper is ingested.
+        """
+        result = await self.collection.update_many(
+            {"arxiv_id": {"$regex": r"v\d+$"}},
+            [
+                {"$set": {"_split_id": {"$regexFind": {"input": "$arxiv_id", "regex": r"^(.+?)v(\d+)$"}}}},
+                {"$set": {
+                    "arxiv_id": {"$arrayElemAt": ["$_split_id.captures", 0]},
+                    "version": {"$ifNull": ["$version", {"$toInt": {"$arrayElemAt": ["$_split_id.captures", 1]}}]}
+                }},
+                {"$unset": "_split_id"}
+            ]
+        )
+        if result.modified_count:
+            logger.info(f"Moved the version out of arxiv_id in {result.modified_count} stored chunks")
+    
     async def close(self):
         if self.client:
             self.client.close()
@@ -30,6 +86,15 @@ class Database:
     
     def get_collection(self):
         return self.collection
+    
+    def get_checkpoint_collection(self):
+        return self.checkpoints
+    
+    def get_job_collection(self):
+        return self.jobs
+    
+    def get_space_collection(self):
+        return self.spaces
 
 
 db = Database()
\ No newline at end of file
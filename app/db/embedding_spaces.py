@@ -0,0 +1,82 @@
+import re
+from typing import List, Optional
+from app.core.config import configs
+from app.core.logging import get_logger
+from app.models.schema import EmbeddingSpace
+
+
+logger = get_logger(__name__)
+
+
+SPACES_DOC_ID = "embedding_spaces"
+
+
+def space_name(model: str, version: int) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", model.lower()).strip("_")
+    return f"{slug}_v{version}"
+
+
+def default_space() -> EmbeddingSpace:
+    """The bare `embedding` field and index that chunks were stored in before any re-embed."""
+    model = configs.embedding_model or ""
+    return EmbeddingSpace(
+        model=model,
+        version=configs.embedding_model_version,
+        name=space_name(model, configs.embedding_model_version),
+        path="embedding",
+        index_name=configs.vector_index_name
+    )
+
+
+def new_space(model: str, version: int = 1, dimensions: Optional[int] = None) -> EmbeddingSpace:
+    """A space for re-embedded vectors, stored next to the others under embeddings.<name>."""
+    name = space_name(model, version)
+    return EmbeddingSpace(
+        model=model,
+        version=version,
+        name=name,
+        path=f"embeddings.{name}",
+        index_name=f"{configs.vector_index_name}_{name}",
+        dimensions=dimensions
+    )
+
+
+class EmbeddingSpaces:
+    """Which embedding space retrieval searches, and which one a re-embed job is filling.
+
+    Both are persisted by the vector store; this is the process-wide copy,
+    loaded at startup and refreshed periodically so a switch made by another
+    process is picked up.
+    """
+
+    def __init__(self):
+        self.active: Optional[EmbeddingSpace] = None
+        self.target: Optional[EmbeddingSpace] = None
+        self._announced: Optional[str] = None
+
+    def current(self) -> EmbeddingSpace:
+        return self.active or default_space()
+
+    def write_spaces(self) -> List[EmbeddingSpace]:
+        """Spaces new chunks are embedded into, so a re-embed never falls behind ingestion."""
+        spaces = [self.current()]
+        if self.target is not None and self.target.name != spaces[0].name:
+            spaces.append(self.target)
+        return spaces
+
+    async def refresh(self, store) -> EmbeddingSpace:
+        self.active, self.target = await store.load_spaces()
+
+        current = self.current()
+        if current.name != self._announced:
+            self._announced = current.name
+            logger.info(f"Retrieval uses embedding space {current.name} ({current.model})")
+            if configs.embedding_model and configs.embedding_model != current.model:
+                logger.warning(
+                    f"EMBEDDING_MODEL is {configs.embedding_model} but stored chunks are searched with "
+                    f"{current.model}; re-embed to switch models"
+                )
+        return current
+
+
+embedding_spaces = EmbeddingSpaces()
@@ -0,0 +1,56 @@
+from typing import Optional, List, Dict
+from app.models.schema import IngestJob
+
+
+UNFINISHED_STATUSES = ["queued", "running"]
+
+
+class JobStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def create(self, job: IngestJob):
+        await self.collection.insert_one({"_id": job.job_id, **job.model_dump(exclude={"job_id"})})
+
+    async def get(self, job_id: str) -> Optional[IngestJob]:
+        doc = await self.collection.find_one({"_id": job_id})
+        if not doc:
+            return None
+
+        doc.pop("_id")
+        return IngestJob(job_id=job_id, **doc)
+
+    async def update(self, job_id: str, **fields):
+        await self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    async def unfinished(self) -> List[IngestJob]:
+        cursor = self.collection.find({"status": {"$in": UNFINISHED_STATUSES}}).sort("created_at", 1)
+        jobs = []
+        async for doc in cursor:
+            job_id = doc.pop("_id")
+            jobs.append(IngestJob(job_id=job_id, **doc))
+        return jobs
+
+
+class MemoryJobStore:
+    """Job store for the local backend, where no MongoDB is available."""
+
+    def __init__(self):
+        self.jobs: Dict[str, IngestJob] = {}
+
+    async def create(self, job: IngestJob):
+        self.jobs[job.job_id] = job.model_copy(deep=True)
+
+    async def get(self, job_id: str) -> Optional[IngestJob]:
+        job = self.jobs.get(job_id)
+        return job.model_copy(deep=True) if job else None
+
+    async def update(self, job_id: str, **fields):
+        job = self.jobs[job_id]
+        self.jobs[job_id] = IngestJob.model_validate({**job.model_dump(), **fields})
+
+    async def unfinished(self) -> List[IngestJob]:
+        return sorted(
+            (job for job in self.jobs.values() if job.status in UNFINISHED_STATUSES),
+            key=lambda job: job.created_at
+        )
@@ -0,0 +1,235 @@
+import heapq
+import math
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from app.core.logging import get_logger
+
+
+logger = get_logger(__name__)
+
+
+_TOKEN = re.compile(r"\w+(?:[-/]\w+)*")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers him his how i if in into is it its itself just me more most my
+no nor not now of off on once only or other our out over own same she should so some such than
+that the their them then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your
+""".split())
+
+INDEXED_FIELDS = (
+    "_id", "arxiv_id", "version", "title", "authors", "published",
+    "categories", "chunk_text", "chunk_index", "content_hash"
+)
+
+FusionKey = Tuple[str, Optional[int], Optional[str]]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; hyphenated terms (IL-6, BRCA1/2) also emit their parts."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token or "/" in token:
+            tokens.extend(part for part in re.split(r"[-/]", token) if part and part not in STOPWORDS)
+    return tokens
+
+
+def fusion_key(doc: Dict[str, Any]) -> FusionKey:
+    return (doc["arxiv_id"], doc.get("chunk_index"), doc.get("content_hash"))
+
+
+class BM25Index:
+    """In-memory BM25 index over chunk titles and text.
+
+    Documents are added incrementally as chunks are written; term statistics
+    are read at query time, so no rebuild is needed after an insert.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._docs: List[Dict[str, Any]] = []
+        self._lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._keys: Dict[FusionKey, int] = {}
+        self._paper_chunks: Dict[str, int] = {}
+        self._total_length = 0
+        self._removed = 0
+
+    def __len__(self) -> int:
+        return len(self._docs) - self._removed
+
+    def paper_count(self) -> int:
+        return len(self._paper_chunks)
+
+    def add(self, docs: Iterable[Dict[str, Any]]) -> int:
+        added = 0
+        for doc in docs:
+            key = fusion_key(doc)
+            if key in self._keys:
+                continue
+
+            terms = Counter(tokenize(f"{doc.get('title', '')} {doc.get('chunk_text', '')}"))
+            position = len(self._docs)
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[position] = count
+
+            self._docs.append({field: doc[field] for field in INDEXED_FIELDS if field in doc})
+            self._lengths.append(sum(terms.values()))
+            self._total_length += self._lengths[-1]
+            self._keys[key] = position
+            self._paper_chunks[key[0]] = self._paper_chunks.get(key[0], 0) + 1
+            added += 1
+        return added
+
+    def remove(self, keys: Iterable[FusionKey]) -> int:
+        """Drops chunks from the index; their slots stay empty so positions never shift."""
+        removed = 0
+        for key in keys:
+            position = self._keys.pop(key, None)
+            if position is None:
+                continue
+
+            doc = self._docs[position]
+            for term in set(tokenize(f"{doc.get('title', '')} {doc.get('chunk_text', '')}")):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(position, None)
+                    if not postings:
+                        del self._postings[term]
+
+            self._total_length -= self._lengths[position]
+            self._lengths[position] = 0
+            self._docs[position] = None
+            self._removed += 1
+            self._paper_chunks[key[0]] -= 1
+            if not self._paper_chunks[key[0]]:
+                del self._paper_chunks[key[0]]
+            removed += 1
+        return removed
+
+    def clear(self):
+        self.__init__(self.k1, self.b)
+
+    async def build(self, documents) -> int:
+        """Indexes every chunk from an async iterator, e.g. VectorStore.iter_documents()."""
+        self.clear()
+        batch = []
+        async for doc in documents:
+            batch.append(doc)
+            if len(batch) >= 1000:
+                self.add(batch)
+                batch = []
+        self.add(batch)
+        logger.info(f"Lexical index ready with {len(self)} chunks and {len(self._postings)} terms")
+        return len(self)
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        n = len(self)
+        if not n:
+            return []
+
+        avg_length = self._total_length / n
+        scores: Dict[int, float] = {}
+        # How many papers contain the rarest query term each chunk matches. Papers,
+        # not chunks: overlapping chunks of one paper repeat the same sentences.
+        rarest: Dict[int, int] = {}
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            papers = len({self._docs[position]["arxiv_id"] for position in postings})
+            for position, count in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / avg_length)
+                scores[position] = scores.get(position, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+                rarest[position] = min(rarest.get(position, papers), papers)
+
+        # Filtered searches rank everything so enough matching documents remain.
+        limit = len(scores) if filters else top_k
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+        results = []
+        for position, score in ranked:
+            doc = self._docs[position]
+            if filters and not matches_filter(doc, filters):
+                continue
+            results.append({**doc, "lexical_score": score, "lexical_df": rarest[position]})
+            if len(results) >= top_k:
+                break
+        return results
+
+
+def matches_filter(doc: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """Evaluates a $vectorSearch-style filter against one document, MongoDB semantics."""
+    for field, condition in filters.items():
+        if field == "$and":
+            if not all(matches_filter(doc, sub) for sub in condition):
+                return False
+        elif field == "$or":
+            if not any(matches_filter(doc, sub) for sub in condition):
+                return False
+        elif not _matches_field(doc.get(field), condition):
+            return False
+    return True
+
+
+def _matches_field(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+
+    values = value if isinstance(value, list) else [value]
+    for op, operand in condition.items():
+        if op == "$eq":
+            ok = any(_comparable(v) == _comparable(operand) for v in values)
+        elif op == "$in":
+            ok = any(_comparable(v) == _comparable(o) for v in values for o in operand)
+        elif op == "$ne":
+            ok = all(_comparable(v) != _comparable(operand) for v in values)
+        elif op == "$nin":
+            ok = all(_comparable(v) != _comparable(o) for v in values for o in operand)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            ok = any(v is not None and _compare(op, _comparable(v), _comparable(operand)) for v in values)
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    try:
+        if op == "$gt":
+            return left > right
+        if op == "$gte":
+            return left >= right
+        if op == "$lt":
+            return left < right
+        return left <= right
+    except TypeError:
+        return False
+
+
+def _comparable(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+lexical_index = BM25Index()
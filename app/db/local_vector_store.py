@@ -0,0 +1,703 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, List, Dict, Any, Optional, Set
+import numpy as np
+from app.core.config import configs
+from app.core.logging import get_logger
+from app.db.embedding_spaces import default_space
+from app.db.lexical_index import lexical_index
+from app.db.quantization import binary_codes, hamming_distances
+from app.db.vector_store import VectorStore, ChunkKey, SEARCH_PROJECTION, chunk_key, fusion_keys
+from app.models.schema import EmbeddingSpace
+from app.utils.arxiv_ids import base_arxiv_id
+
+
+logger = get_logger(__name__)
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows: run one process per store directory.
+    fcntl = None
+
+
+class StoreLockedError(RuntimeError):
+    pass
+
+
+def lock_store_dir(path: Path) -> Optional[IO]:
+    """Takes the store directory's lock, held until the returned file is closed.
+
+    A store is read into memory when opened, so another process writing to
+    the same directory goes unseen, and concurrent appends can corrupt the
+    manifest.
+    """
+    if fcntl is None:
+        return None
+    path.mkdir(parents=True, exist_ok=True)
+    lock_file = open(path / ".lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        raise StoreLockedError(
+            f"Local vector store {path} is open in another process (the API server?); "
+            f"stop it first and restart it afterwards to see the changes"
+        ) from None
+    return lock_file
+
+
+class IVFIndex:
+    """Inverted-file index: k-means clusters over normalized vectors.
+
+    A query scans only the rows of its closest clusters, stopping once
+    num_candidates rows have been collected, and those are then scored exactly.
+    """
+
+    def __init__(self, nlist: int, iterations: int = 10, seed: int = 0):
+        self.nlist = nlist
+        self.iterations = iterations
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.order: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+        self.size = 0
+
+    def train(self, matrix: np.ndarray):
+        rng = np.random.default_rng(self.seed)
+        n = len(matrix)
+        nlist = min(self.nlist, n)
+
+        sample = matrix[rng.choice(n, size=min(n, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(self.iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = sample[assignments == cluster]
+                if len(members):
+                    centroids[cluster] = members.sum(axis=0)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        assignments = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 65536):
+            block = np.asarray(matrix[start:start + 65536])
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        self.centroids = centroids.astype(np.float32)
+        self.order = np.argsort(assignments, kind="stable")
+        self.offsets = np.searchsorted(assignments[self.order], np.arange(nlist + 1))
+        self.size = n
+
+    def candidates(self, query: np.ndarray, num_candidates: int) -> np.ndarray:
+        probes = np.argsort(-(self.centroids @ query))
+        selected = []
+        collected = 0
+        for cluster in probes:
+            rows = self.order[self.offsets[cluster]:self.offsets[cluster + 1]]
+            selected.append(rows)
+            collected += len(rows)
+            if collected >= num_candidates:
+                break
+        return np.concatenate(selected) if selected else np.empty(0, dtype=np.int64)
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store backed by a memory-mapped float32 matrix.
+
+    Rows are L2-normalized on insert, so cosine similarity is a dot product;
+    exact search is a single matrix-vector product plus argpartition. Scores
+    are reported as (1 + cosine) / 2 to match Atlas vectorSearchScore.
+
+    With quantization="binary", the sign bits of every row are kept in memory
+    and searched by Hamming distance; only the closest candidates are rescored
+    against the full-precision rows on disk.
+
+    A re-embed target gets its own matrix file, filled in row order: its rows
+    are always a prefix of the store's, so "missing" is everything past its
+    count, and the switch just remaps the store onto the new file.
+
+    Deleted chunks keep their rows, which preserves that prefix; they are
+    listed in the manifest and masked out of search.
+    """
+
+    MATRIX_FILE = "embeddings.f32"
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ivf_min_vectors: int = None,
+        ivf_nlist: int = None,
+        quantization: str = None,
+        rescore_factor: int = None,
+        exclusive: bool = False
+    ):
+        self.path = Path(path) if path else None
+        # exclusive: hold the directory lock so no other process opens the store meanwhile.
+        self._dir_lock = lock_store_dir(self.path) if exclusive and self.path else None
+        self.ivf_min_vectors = configs.local_ivf_min_vectors if ivf_min_vectors is None else ivf_min_vectors
+        self.ivf_nlist = configs.local_ivf_nlist if ivf_nlist is None else ivf_nlist
+        self.quantization = quantization or configs.local_quantization
+        self.rescore_factor = rescore_factor or configs.local_rescore_factor
+        if self.quantization not in ("none", "binary"):
+            raise ValueError(f"Unknown local quantization {self.quantization!r}, expected 'none' or 'binary'")
+
+        self.dim: Optional[int] = None
+        self.space: EmbeddingSpace = default_space()
+        self._space_persisted = False
+        self._file = self.MATRIX_FILE
+        self._target: Optional[Dict[str, Any]] = None
+        self._target_matrix = np.empty((0, 0), dtype=np.float32)
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._codes = np.empty((0, 0), dtype=np.uint8)
+        self._meta: List[Dict[str, Any]] = []
+        self._keys: Dict[ChunkKey, int] = {}
+        self._deleted: Set[int] = set()
+        self._live: Optional[np.ndarray] = None
+        self._postings: Dict[str, Dict[Any, np.ndarray]] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._ivf: Optional[IVFIndex] = None
+        self._lock = threading.RLock()
+
+        if self.path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._meta) - len(self._deleted)
+
+    def close(self):
+        if self._dir_lock is not None:
+            self._dir_lock.close()
+            self._dir_lock = None
+
+    async def search(self, query_vector, top_k, num_candidates, filters=None, include_embeddings=False):
+        return await asyncio.to_thread(
+            self.search_sync, query_vector, top_k, num_candidates, filters, include_embeddings
+        )
+
+    async def insert_many(self, docs, ordered=False):
+        await asyncio.to_thread(self.insert_sync, docs)
+        # Updated here rather than in the worker thread, so searches never see it mid-insert.
+        lexical_index.add(doc for doc in docs if "_id" in doc)
+
+    async def existing_keys(self, arxiv_ids):
+        wanted = set(arxiv_ids)
+        with self._lock:
+            return {key for key in self._keys if key[0] in wanted}
+
+    async def delete_chunks(self, keys):
+        keys = list(keys)
+        deleted = await asyncio.to_thread(self.delete_chunks_sync, keys)
+        lexical_index.remove(fusion_keys(keys))
+        return deleted
+
+    async def iter_documents(self):
+        with self._lock:
+            metas = [(row, meta) for row, meta in enumerate(self._meta) if row not in self._deleted]
+        for row, meta in metas:
+            yield {**meta, "_id": str(row)}
+
+    async def load_spaces(self):
+        with self._lock:
+            active = self.space if self._space_persisted else None
+            return active, self._target["space"] if self._target else None
+
+    async def begin_space(self, space):
+        await asyncio.to_thread(self.begin_space_sync, space)
+
+    async def missing_embeddings(self, space, limit, after=None):
+        with self._lock:
+            if self._target is None or self._target["space"].name != space.name:
+                return []
+            start = self._target["count"]
+            return [
+                {"_id": str(row), "chunk_text": self._meta[row]["chunk_text"]}
+                for row in range(start, min(start + limit, len(self._meta)))
+            ]
+
+    async def add_embeddings(self, space, docs, vectors):
+        await asyncio.to_thread(self.add_embeddings_sync, space, docs, vectors)
+
+    async def count_embeddings(self, space):
+        with self._lock:
+            if space.name == self.space.name:
+                return len(self._meta), len(self._meta)
+            if self._target is not None and self._target["space"].name == space.name:
+                return self._target["count"], len(self._meta)
+            return 0, len(self._meta)
+
+    async def switch_space(self, space):
+        await asyncio.to_thread(self.switch_space_sync, space)
+
+    def search_sync(
+        self,
+        query_vector: List[float],
+        top_k: int,
+        num_candidates: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            n = len(self._meta)
+            if n == 0 or top_k <= 0:
+                return []
+
+            query = _normalize(np.asarray(query_vector, dtype=np.float32))
+            mask = self._mask(filters) if filters else None
+            if self._deleted:
+                live = self._live_mask()
+                mask = live if mask is None else mask & live
+            rows = self._candidate_rows(query, num_candidates, mask)
+            if self.quantization == "binary":
+                rows = self._hamming_candidates(query, rows, max(num_candidates, top_k * self.rescore_factor))
+
+            if rows is None:
+                scores = self._matrix @ query
+                rows = np.arange(n)
+            else:
+                scores = self._matrix[rows] @ query
+
+            return self._top_k(rows, scores, top_k, include_embeddings)
+
+    def insert_sync(self, docs: List[Dict[str, Any]]):
+        with self._lock:
+            new_docs = []
+            seen = set()
+            for doc in docs:
+                key = chunk_key(doc) if "content_hash" in doc else None
+                if key is not None and (key in self._keys or key in seen):
+                    continue
+                new_docs.append(doc)
+                if key is not None:
+                    seen.add(key)
+
+            if not new_docs:
+                return
+
+            vectors = np.asarray([doc["embedding"] for doc in new_docs], dtype=np.float32)
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding has {vectors.shape[1]} dimensions, store expects {self.dim}")
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+            metas = [
+                {k: v for k, v in doc.items() if k not in ("embedding", "embeddings", "_id")}
+                for doc in new_docs
+            ]
+            # Mirror insert_many in pymongo, which assigns _id on the inserted documents.
+            for row, doc in enumerate(new_docs, len(self._meta)):
+                doc["_id"] = str(row)
+                if "content_hash" in doc:
+                    self._keys[chunk_key(doc)] = row
+
+            target_vectors = self._target_rows(new_docs)
+            if self.path:
+                self._append_to_disk(vectors, metas, target_vectors)
+            else:
+                self._matrix = np.vstack([self._matrix.reshape(-1, self.dim), vectors])
+                if target_vectors is not None:
+                    self._append_target(target_vectors)
+            if self.quantization == "binary":
+                self._codes = np.vstack([self._codes.reshape(-1, (self.dim + 7) // 8), binary_codes(vectors)])
+
+            self._meta.extend(metas)
+            self._postings.clear()
+            self._columns.clear()
+            self._live = None
+
+    def delete_chunks_sync(self, keys: List[ChunkKey]) -> int:
+        with self._lock:
+            rows = [self._keys.pop(key) for key in keys if key in self._keys]
+            if not rows:
+                return 0
+            self._deleted.update(rows)
+            self._live = None
+            if self.path:
+                self._write_manifest(len(self._meta))
+            return len(rows)
+
+    def _live_mask(self) -> np.ndarray:
+        if self._live is None or len(self._live) != len(self._meta):
+            live = np.ones(len(self._meta), dtype=bool)
+            live[list(self._deleted)] = False
+            self._live = live
+        return self._live
+
+    def begin_space_sync(self, space: EmbeddingSpace):
+        with self._lock:
+            if space.name == self.space.name:
+                raise ValueError(f"Embedding space {space.name} is already active")
+            if self._target is not None and self._target["space"].name == space.name:
+                return
+
+            self._target = {"space": space, "file": f"embeddings.{space.name}.f32", "dim": space.dimensions, "count": 0}
+            self._target_matrix = np.empty((0, space.dimensions or 0), dtype=np.float32)
+            if self.path:
+                self.path.mkdir(parents=True, exist_ok=True)
+                (self.path / self._target["file"]).write_bytes(b"")
+                self._write_manifest(len(self._meta))
+
+    def add_embeddings_sync(self, space: EmbeddingSpace, docs: List[Dict[str, Any]], vectors: List[List[float]]):
+        with self._lock:
+            if self._target is None or self._target["space"].name != space.name:
+                raise ValueError(f"Embedding space {space.name} is not being re-embedded")
+
+            rows = [int(doc["_id"]) for doc in docs]
+            start = self._target["count"]
+            if rows != list(range(start, start + len(rows))):
+                raise ValueError(f"Re-embedded rows must continue at row {start}")
+
+            vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+            if self.path:
+                self._append_target_to_disk(vectors)
+            else:
+                self._append_target(vectors)
+
+    def switch_space_sync(self, space: EmbeddingSpace):
+        with self._lock:
+            target = self._target
+            if target is None or target["space"].name != space.name:
+                raise ValueError(f"Embedding space {space.name} is not being re-embedded")
+            if target["count"] != len(self._meta):
+                raise ValueError(
+                    f"Embedding space {space.name} covers {target['count']} of {len(self._meta)} chunks"
+                )
+
+            previous = self.space.name
+            self.space = target["space"].model_copy(update={"dimensions": target["dim"]})
+            self._space_persisted = True
+            self.dim = target["dim"]
+            self._file = target["file"]
+            self._target = None
+            if self.path:
+                self._write_manifest(len(self._meta))
+                self._remap()
+            else:
+                self._matrix = self._target_matrix
+            self._target_matrix = np.empty((0, 0), dtype=np.float32)
+
+            self._rebuild_codes()
+            self._ivf = None
+            logger.info(f"Switched local vector store from {previous} to {self.space.name}")
+
+    def _target_rows(self, docs: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Target vectors carried by new docs, used only while the target is caught up."""
+        target = self._target
+        if target is None or target["count"] != len(self._meta):
+            return None
+
+        vectors = [(doc.get("embeddings") or {}).get(target["space"].name) for doc in docs]
+        if any(vector is None for vector in vectors):
+            return None
+        return _normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+    def _append_target(self, vectors: np.ndarray):
+        target = self._target
+        if target["dim"] is None:
+            target["dim"] = vectors.shape[1]
+        if vectors.shape[1] != target["dim"]:
+            raise ValueError(f"Embedding has {vectors.shape[1]} dimensions, {target['space'].name} expects {target['dim']}")
+        if not self.path:
+            self._target_matrix = np.vstack([self._target_matrix.reshape(-1, target["dim"]), vectors])
+        target["count"] += len(vectors)
+
+    def _append_target_to_disk(self, vectors: np.ndarray):
+        with open(self.path / self._target["file"], "ab") as f:
+            self._append_target(vectors)
+            f.write(vectors.tobytes())
+        self._write_manifest(len(self._meta))
+
+    def build_index(self):
+        with self._lock:
+            n = len(self._meta)
+            nlist = self.ivf_nlist or max(1, int(np.sqrt(n)))
+            logger.info(f"Building IVF index over {n} vectors ({nlist} lists)")
+            index = IVFIndex(nlist)
+            index.train(self._matrix)
+            self._ivf = index
+
+    def _candidate_rows(self, query: np.ndarray, num_candidates: int, mask: Optional[np.ndarray]):
+        n = len(self._meta)
+
+        if mask is not None:
+            allowed = np.flatnonzero(mask)
+            # Selective filters are cheapest to answer exactly, like Atlas pre-filtering.
+            if len(allowed) <= num_candidates * 10 or not self._use_ivf(n):
+                return allowed
+
+        if not self._use_ivf(n):
+            return None
+
+        if self._ivf is None or n > self._ivf.size * 1.2:
+            self.build_index()
+
+        rows = self._ivf.candidates(query, num_candidates)
+        if self._ivf.size < n:
+            rows = np.concatenate([rows, np.arange(self._ivf.size, n)])
+        if mask is not None:
+            rows = rows[mask[rows]]
+        return rows
+
+    def _hamming_candidates(self, query: np.ndarray, rows: Optional[np.ndarray], limit: int) -> np.ndarray:
+        codes = self._codes if rows is None else self._codes[rows]
+        if rows is None:
+            rows = np.arange(len(codes))
+        if len(rows) <= limit:
+            return rows
+
+        distances = hamming_distances(codes, binary_codes(query))
+        return rows[np.argpartition(distances, limit - 1)[:limit]]
+
+    def _use_ivf(self, n: int) -> bool:
+        return 0 < self.ivf_min_vectors <= n
+
+    def _top_k(
+        self,
+        rows: np.ndarray,
+        scores: np.ndarray,
+        top_k: int,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        if len(rows) == 0:
+            return []
+
+        k = min(top_k, len(rows))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+
+        results = []
+        for i in best:
+            row = int(rows[i])
+            meta = self._meta[row]
+            doc = {field: meta[field] for field in SEARCH_PROJECTION if field in meta}
+            doc["_id"] = str(row)
+            doc["score"] = float((1.0 + scores[i]) / 2.0)
+            if include_embeddings:
+                doc["embedding"] = self._matrix[row].tolist()
+            results.append(doc)
+        return results
+
+    def _mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        n = len(self._meta)
+        mask = np.ones(n, dtype=bool)
+
+        for field, condition in filters.items():
+            if field == "$and":
+                for sub in condition:
+                    mask &= self._mask(sub)
+            elif field == "$or":
+                any_mask = np.zeros(n, dtype=bool)
+                for sub in condition:
+                    any_mask |= self._mask(sub)
+                mask &= any_mask
+            else:
+                mask &= self._field_mask(field, condition)
+
+        return mask
+
+    def _field_mask(self, field: str, condition: Any) -> np.ndarray:
+        n = len(self._meta)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        mask = np.ones(n, dtype=bool)
+        for op, value in condition.items():
+            if op == "$eq":
+                mask &= self._membership(field, [value])
+            elif op == "$in":
+                mask &= self._membership(field, value)
+            elif op == "$ne":
+                mask &= ~self._membership(field, [value])
+            elif op == "$nin":
+                mask &= ~self._membership(field, value)
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                column = self._column(field)
+                bound = _comparable(value)
+                with np.errstate(invalid="ignore"):
+                    if op == "$gt":
+                        mask &= column > bound
+                    elif op == "$gte":
+                        mask &= column >= bound
+                    elif op == "$lt":
+                        mask &= column < bound
+                    else:
+                        mask &= column <= bound
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return mask
+
+    def _membership(self, field: str, values: List[Any]) -> np.ndarray:
+        postings = self._postings.get(field)
+        if postings is None:
+            grouped: Dict[Any, List[int]] = {}
+            for row, meta in enumerate(self._meta):
+                value = meta.get(field)
+                # Array fields match when any element matches, as in MongoDB.
+                for item in (value if isinstance(value, list) else [value]):
+                    grouped.setdefault(_hashable(item), []).append(row)
+            postings = {key: np.asarray(rows, dtype=np.int64) for key, rows in grouped.items()}
+            self._postings[field] = postings
+
+        mask = np.zeros(len(self._meta), dtype=bool)
+        for value in values:
+            rows = postings.get(_hashable(value))
+            if rows is not None:
+                mask[rows] = True
+        return mask
+
+    def _column(self, field: str) -> np.ndarray:
+        column = self._columns.get(field)
+        if column is None:
+            values = [meta.get(field) for meta in self._meta]
+            if any(isinstance(value, datetime) for value in values):
+                column = np.array(
+                    [_comparable(value) if value is not None else np.datetime64("NaT") for value in values],
+                    dtype="datetime64[us]"
+                )
+            else:
+                column = np.array(
+                    [value if isinstance(value, (int, float)) else np.nan for value in values],
+                    dtype=np.float64
+                )
+            self._columns[field] = column
+        return column
+
+    def _load(self):
+        manifest_path = self.path / "manifest.json"
+        if not manifest_path.exists():
+            return
+
+        manifest = json.loads(manifest_path.read_text())
+        self.dim = manifest["dim"]
+        count = manifest["count"]
+        self._file = manifest.get("file", self.MATRIX_FILE)
+        if manifest.get("space"):
+            self.space = EmbeddingSpace(**manifest["space"])
+            self._space_persisted = True
+        if manifest.get("target"):
+            self._target = {**manifest["target"], "space": EmbeddingSpace(**manifest["target"]["space"])}
+            # Drop vectors appended after the last manifest write, so new ones line up with their rows.
+            target_path = self.path / self._target["file"]
+            if target_path.exists() and self._target["dim"]:
+                with open(target_path, "r+b") as f:
+                    f.truncate(self._target["count"] * self._target["dim"] * 4)
+
+        self._deleted = set(manifest.get("deleted", []))
+
+        with open(self.path / "metadata.jsonl", encoding="utf-8") as f:
+            for line in f:
+                if len(self._meta) >= count:
+                    break
+                meta = _decode(json.loads(line))
+                if "arxiv_id" in meta:
+                    # Chunks stored before IDs were split carry the version in arxiv_id.
+                    meta["arxiv_id"] = base_arxiv_id(meta["arxiv_id"])
+                self._meta.append(meta)
+
+        for row, meta in enumerate(self._meta):
+            if "content_hash" in meta and row not in self._deleted:
+                self._keys[chunk_key(meta)] = row
+
+        self._remap()
+        self._rebuild_codes()
+        logger.info(f"Loaded local vector store with {len(self._meta)} vectors (dim={self.dim})")
+
+    def _append_to_disk(
+        self,
+        vectors: np.ndarray,
+        metas: List[Dict[str, Any]],
+        target_vectors: Optional[np.ndarray] = None
+    ):
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        with open(self.path / self._file, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.path / "metadata.jsonl", "a", encoding="utf-8") as f:
+            for meta in metas:
+                f.write(json.dumps(_encode(meta)) + "\n")
+        if target_vectors is not None:
+            with open(self.path / self._target["file"], "ab") as f:
+                self._append_target(target_vectors)
+                f.write(target_vectors.tobytes())
+
+        count = len(self._meta) + len(metas)
+        self._write_manifest(count)
+        self._remap(count)
+
+    def _write_manifest(self, count: int):
+        # The manifest is written last: rows beyond its counts are ignored on
+        # load, so a crash mid-append never exposes a half-written batch, and
+        # replacing it is what makes a space switch atomic.
+        manifest = {"dim": self.dim, "count": count, "file": self._file}
+        if self._space_persisted:
+            manifest["space"] = self.space.model_dump()
+        if self._target is not None:
+            manifest["target"] = {**self._target, "space": self._target["space"].model_dump()}
+        if self._deleted:
+            manifest["deleted"] = sorted(self._deleted)
+
+        tmp_path = self.path / "manifest.json.tmp"
+        tmp_path.write_text(json.dumps(manifest))
+        tmp_path.replace(self.path / "manifest.json")
+
+    def _rebuild_codes(self):
+        if self.quantization != "binary":
+            return
+        self._codes = np.concatenate([
+            binary_codes(self._matrix[start:start + 65536])
+            for start in range(0, len(self._meta), 65536)
+        ] or [np.empty((0, (self.dim + 7) // 8), dtype=np.uint8)])
+
+    def _remap(self, count: int = None):
+        count = len(self._meta) if count is None else count
+        if count == 0:
+            self._matrix = np.empty((0, self.dim or 0), dtype=np.float32)
+            return
+        self._matrix = np.memmap(
+            self.path / self._file,
+            dtype=np.float32,
+            mode="r",
+            shape=(count, self.dim)
+        )
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return _comparable(value)
+    return value
+
+
+def _comparable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return np.datetime64(value, "us")
+    return value
+
+
+def _encode(meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: {"$date": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in meta.items()
+    }
+
+
+def _decode(meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: datetime.fromisoformat(value["$date"]) if isinstance(value, dict) and "$date" in value else value
+        for key, value in meta.items()
+    }
@@ -0,0 +1,52 @@
+from typing import List, Any
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
+
+
+EMBEDDING_STORAGE = ("array", "float32", "int8")
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantize_int8(vector) -> np.ndarray:
+    """Scalar-quantizes one vector to int8 using its own max magnitude.
+
+    Cosine similarity ignores the per-vector scale, so no calibration set or
+    stored scale factor is needed to search the quantized vectors.
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    scale = float(np.max(np.abs(vector))) if vector.size else 0.0
+    if scale == 0.0:
+        return np.zeros(vector.shape, dtype=np.int8)
+    return np.clip(np.rint(vector * (127.0 / scale)), -127, 127).astype(np.int8)
+
+
+def encode_embedding(vector, storage: str) -> Any:
+    """Encodes an embedding for MongoDB: a plain array, or a packed BSON binary vector."""
+    if storage == "array" or isinstance(vector, Binary):
+        return vector
+    if storage == "float32":
+        return Binary.from_vector(np.asarray(vector, dtype=np.float32).tolist(), BinaryVectorDtype.FLOAT32)
+    if storage == "int8":
+        return Binary.from_vector(quantize_int8(vector).tolist(), BinaryVectorDtype.INT8)
+    raise ValueError(f"Unknown embedding storage {storage!r}, expected one of {EMBEDDING_STORAGE}")
+
+
+def decode_embedding(value) -> List[float]:
+    if isinstance(value, Binary):
+        return [float(x) for x in value.as_vector().data]
+    return value
+
+
+def binary_codes(matrix: np.ndarray) -> np.ndarray:
+    """Sign bits of each row, packed eight dimensions per byte."""
+    return np.packbits(np.asarray(matrix) > 0, axis=-1)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray, block: int = 65536) -> np.ndarray:
+    distances = np.empty(len(codes), dtype=np.int32)
+    # Blocked so the XOR temporaries stay small on large stores.
+    for start in range(0, len(codes), block):
+        xor = np.bitwise_xor(codes[start:start + block], query_code)
+        distances[start:start + block] = _POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+    return distances
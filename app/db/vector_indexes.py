@@ -1,3 +1,15 @@
+import asyncio
+import copy
+import time
+from typing import Dict, Any, Optional
+from pymongo.operations import SearchIndexModel
+from app.core.config import configs
+from app.core.logging import get_logger
+
+
+logger = get_logger(__name__)
+
+
 VECTOR_INDEX_DEFINITION = {
     "fields": [
         {
@@ -13,6 +25,104 @@ VECTOR_INDEX_DEFINITION = {
         {
             "type": "filter",
             "path": "arxiv_id"
+        },
+        {
+            "type": "filter",
+            "path": "published"
         }
     ]
-}
\ No newline at end of file
+}
+
+
+def vector_index_definition(dimensions: Optional[int] = None, path: str = None) -> Dict[str, Any]:
+    definition = copy.deepcopy(VECTOR_INDEX_DEFINITION)
+    if dimensions is not None:
+        _vector_field(definition)["numDimensions"] = dimensions
+    if path is not None:
+        _vector_field(definition)["path"] = path
+    return definition
+
+
+async def ensure_vector_index(
+    collection,
+    name: str = None,
+    dimensions: Optional[int] = None,
+    timeout: float = None,
+    poll_interval: float = None,
+    path: str = None,
+    wait: bool = True
+) -> Optional[Dict[str, Any]]:
+    """Creates or updates the Atlas vector search index and waits until it is queryable.
+
+    An existing index whose numDimensions differs from the embedding model is
+    an error: its vectors would have to be re-embedded, not re-indexed.
+    """
+    name = name or configs.vector_index_name
+    definition = vector_index_definition(dimensions, path)
+    expected = _vector_field(definition)["numDimensions"]
+
+    index = await find_search_index(collection, name)
+    if index is None:
+        logger.info(f"Creating vector search index '{name}' ({expected} dimensions)")
+        await collection.create_search_index(
+            SearchIndexModel(definition=definition, name=name, type="vectorSearch")
+        )
+    else:
+        current = index.get("latestDefinition", {})
+        actual = _vector_field(current).get("numDimensions")
+        # Without a probed model size the existing index is trusted as-is.
+        if dimensions is not None and actual != dimensions:
+            raise RuntimeError(
+                f"Vector index '{name}' has {actual} dimensions but the embedding model "
+                f"produces {dimensions}; re-embed the collection or point it at a new index"
+            )
+
+        missing = _filter_paths(definition) - _filter_paths(current)
+        if missing:
+            logger.info(f"Adding filter fields {sorted(missing)} to vector search index '{name}'")
+            _vector_field(definition)["numDimensions"] = actual
+            await collection.update_search_index(name, definition)
+
+    if not wait:
+        return None
+    return await wait_until_queryable(collection, name, timeout, poll_interval)
+
+
+async def wait_until_queryable(
+    collection,
+    name: str,
+    timeout: float = None,
+    poll_interval: float = None
+) -> Dict[str, Any]:
+    timeout = configs.vector_index_ready_timeout if timeout is None else timeout
+    poll_interval = configs.vector_index_poll_interval if poll_interval is None else poll_interval
+    deadline = time.monotonic() + timeout
+
+    while True:
+        index = await find_search_index(collection, name)
+        status = index.get("status") if index else "DOES_NOT_EXIST"
+
+        if index and index.get("queryable"):
+            logger.info(f"Vector search index '{name}' is queryable ({status})")
+            return index
+        if status == "FAILED":
+            raise RuntimeError(f"Vector search index '{name}' failed to build: {index.get('message', '')}")
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Vector search index '{name}' not queryable after {timeout:.0f}s ({status})")
+
+        logger.info(f"Waiting for vector search index '{name}' ({status})...")
+        await asyncio.sleep(poll_interval)
+
+
+async def find_search_index(collection, name: str) -> Optional[Dict[str, Any]]:
+    async for index in collection.list_search_indexes(name):
+        return index
+    return None
+
+
+def _vector_field(definition: Dict[str, Any]) -> Dict[str, Any]:
+    return next((field for field in definition.get("fields", []) if field.get("type") == "vector"), {})
+
+
+def _filter_paths(definition: Dict[str, Any]) -> set:
+    return {field["path"] for field in definition.get("fields", []) if field.get("type") == "filter"}
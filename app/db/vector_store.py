@@ -0,0 +1,271 @@
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple, AsyncIterator
+from app.core.config import configs
+from app.core.metrics import timed
+from app.db.database import db
+from app.db.embedding_spaces import SPACES_DOC_ID, default_space, embedding_spaces
+from app.db.lexical_index import FusionKey, lexical_index, INDEXED_FIELDS
+from app.db.quantization import encode_embedding, decode_embedding
+from app.db.vector_indexes import ensure_vector_index, wait_until_queryable
+from app.models.schema import EmbeddingSpace
+
+
+ChunkKey = Tuple[str, Optional[int], int, Optional[str]]
+CHUNK_KEY_FIELDS = ("arxiv_id", "version", "chunk_index", "content_hash")
+
+SEARCH_PROJECTION = ["arxiv_id", "version", "title", "authors", "chunk_text", "chunk_index", "content_hash"]
+
+
+class VectorStore:
+    """Chunk storage and vector search over one embedding space at a time.
+
+    Inserted docs carry the vector of the store's space in "embedding", and
+    may carry vectors of a space being re-embedded in "embeddings", keyed by
+    space name.
+    """
+    space: EmbeddingSpace
+
+    async def search(
+        self,
+        query_vector: List[float],
+        top_k: int,
+        num_candidates: int,
+        filters: Optional[Dict[str, Any]] = None,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = False):
+        raise NotImplementedError
+
+    async def existing_keys(self, arxiv_ids: List[str]) -> Set[ChunkKey]:
+        raise NotImplementedError
+
+    async def delete_chunks(self, keys: Iterable[ChunkKey]) -> int:
+        """Removes stored chunks by key, e.g. those of a superseded paper version."""
+        raise NotImplementedError
+
+    def iter_documents(self) -> AsyncIterator[Dict[str, Any]]:
+        """Every stored chunk without its embedding, used to rebuild the lexical index."""
+        raise NotImplementedError
+
+    async def load_spaces(self) -> Tuple[Optional[EmbeddingSpace], Optional[EmbeddingSpace]]:
+        """The persisted active space (None until the first switch) and the space being re-embedded."""
+        raise NotImplementedError
+
+    async def begin_space(self, space: EmbeddingSpace):
+        """Prepares storage and an index for a new space and records it as the re-embed target."""
+        raise NotImplementedError
+
+    async def missing_embeddings(
+        self,
+        space: EmbeddingSpace,
+        limit: int,
+        after: Any = None
+    ) -> List[Dict[str, Any]]:
+        """Up to limit chunks (_id and chunk_text) without a vector in space, in _id order after `after`."""
+        raise NotImplementedError
+
+    async def add_embeddings(self, space: EmbeddingSpace, docs: List[Dict[str, Any]], vectors: List[List[float]]):
+        raise NotImplementedError
+
+    async def count_embeddings(self, space: EmbeddingSpace) -> Tuple[int, int]:
+        """Chunks with a vector in space, and all chunks."""
+        raise NotImplementedError
+
+    async def switch_space(self, space: EmbeddingSpace):
+        """Atomically makes the fully re-embedded target the space searched by retrieval."""
+        raise NotImplementedError
+
+
+class AtlasVectorStore(VectorStore):
+    def __init__(
+        self,
+        collection,
+        index_name: str = "vector_index",
+        path: str = "embedding",
+        storage: str = None,
+        space: EmbeddingSpace = None,
+        spaces=None
+    ):
+        self.collection = collection
+        self.space = space or default_space().model_copy(update={"index_name": index_name, "path": path})
+        self.index_name = self.space.index_name
+        self.path = self.space.path
+        self.storage = storage or configs.embedding_storage
+        # Holds the persisted active/target spaces; None disables re-embedding.
+        self.spaces = spaces
+
+    async def search(self, query_vector, top_k, num_candidates, filters=None, include_embeddings=False):
+        vector_search = {
+            "index": self.index_name,
+            "path": self.path,
+            # Query in the same encoding as the stored vectors.
+            "queryVector": encode_embedding(query_vector, self.storage),
+            "numCandidates": num_candidates,
+            "limit": top_k
+        }
+        if filters:
+            vector_search["filter"] = filters
+
+        projection = {field: 1 for field in SEARCH_PROJECTION}
+        projection["score"] = {"$meta": "vectorSearchScore"}
+        if include_embeddings:
+            projection["embedding"] = f"${self.path}"
+
+        pipeline = [
+            {"$vectorSearch": vector_search},
+            {"$project": projection}
+        ]
+        docs = [doc async for doc in self.collection.aggregate(pipeline)]
+        if include_embeddings:
+            for doc in docs:
+                doc["embedding"] = decode_embedding(doc.get("embedding"))
+        return docs
+
+    async def insert_many(self, docs, ordered=False):
+        for doc in docs:
+            if doc.get("embeddings"):
+                doc["embeddings"] = {
+                    name: encode_embedding(vector, self.storage) for name, vector in doc["embeddings"].items()
+                }
+            if "embedding" in doc:
+                vector = encode_embedding(doc.pop("embedding"), self.storage)
+                _set_path(doc, self.path, vector)
+        try:
+            with timed("mongo_insert"):
+                result = await self.collection.insert_many(docs, ordered=ordered)
+        except BulkWriteError as e:
+            # insert_many assigns _id in place; index everything that was not rejected.
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            lexical_index.add(doc for i, doc in enumerate(docs) if i not in failed)
+            raise
+        lexical_index.add(docs)
+        return result
+
+    async def existing_keys(self, arxiv_ids):
+        cursor = self.collection.find(
+            {"arxiv_id": {"$in": arxiv_ids}},
+            {"_id": 0, "arxiv_id": 1, "version": 1, "chunk_index": 1, "content_hash": 1}
+        )
+        with timed("mongo_existing_keys"):
+            return {chunk_key(doc) async for doc in cursor}
+
+    async def delete_chunks(self, keys):
+        keys = list(keys)
+        deleted = 0
+        # Bounded $or clauses per request, like the writer's batches.
+        for start in range(0, len(keys), 500):
+            clauses = [dict(zip(CHUNK_KEY_FIELDS, key)) for key in keys[start:start + 500]]
+            with timed("mongo_delete"):
+                result = await self.collection.delete_many({"$or": clauses})
+            deleted += result.deleted_count
+        lexical_index.remove(fusion_keys(keys))
+        return deleted
+
+    async def iter_documents(self):
+        projection = {field: 1 for field in INDEXED_FIELDS}
+        async for doc in self.collection.find({}, projection):
+            yield doc
+
+    async def load_spaces(self):
+        doc = await self.spaces.find_one({"_id": SPACES_DOC_ID}) if self.spaces is not None else None
+        if not doc:
+            return None, None
+
+        active = EmbeddingSpace(**doc["active"]) if doc.get("active") else None
+        target = EmbeddingSpace(**doc["target"]) if doc.get("target") else None
+        return active, target
+
+    async def begin_space(self, space):
+        if self.spaces is None:
+            raise RuntimeError("Re-embedding needs the embedding space collection")
+
+        # Built while the vectors are written; waited for before the switch.
+        await ensure_vector_index(self.collection, space.index_name, space.dimensions, path=space.path, wait=False)
+        await self.spaces.update_one(
+            {"_id": SPACES_DOC_ID},
+            {"$set": {"target": space.model_dump()}, "$setOnInsert": {"active": self.space.model_dump()}},
+            upsert=True
+        )
+
+    async def missing_embeddings(self, space, limit, after=None):
+        query: Dict[str, Any] = {space.path: {"$exists": False}}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        cursor = self.collection.find(query, {"chunk_text": 1}).sort("_id", 1).limit(limit)
+        return [doc async for doc in cursor]
+
+    async def add_embeddings(self, space, docs, vectors):
+        updates = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": {space.path: encode_embedding(vector, self.storage)}})
+            for doc, vector in zip(docs, vectors)
+        ]
+        if updates:
+            with timed("mongo_reembed"):
+                await self.collection.bulk_write(updates, ordered=False)
+
+    async def count_embeddings(self, space):
+        embedded = await self.collection.count_documents({space.path: {"$exists": True}})
+        total = await self.collection.count_documents({})
+        return embedded, total
+
+    async def switch_space(self, space):
+        await wait_until_queryable(self.collection, space.index_name)
+
+        # Guarded on the target, so two switches can never interleave.
+        result = await self.spaces.find_one_and_update(
+            {"_id": SPACES_DOC_ID, "target.name": space.name},
+            {
+                "$set": {
+                    "active": space.model_dump(),
+                    "previous": self.space.model_dump(),
+                    "switched_at": datetime.now(timezone.utc)
+                },
+                "$unset": {"target": ""}
+            }
+        )
+        if result is None:
+            raise RuntimeError(f"Embedding space {space.name} is no longer the re-embed target")
+
+        self.space = space
+        self.index_name = space.index_name
+        self.path = space.path
+
+
+def chunk_key(doc) -> ChunkKey:
+    # Chunks stored before versions and content hashes were tracked key with None.
+    return (doc["arxiv_id"], doc.get("version"), doc["chunk_index"], doc.get("content_hash"))
+
+
+def fusion_keys(keys: Iterable[ChunkKey]) -> List[FusionKey]:
+    return [(arxiv_id, chunk_index, content_hash) for arxiv_id, _, chunk_index, content_hash in keys]
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any):
+    *parents, leaf = path.split(".")
+    for key in parents:
+        doc = doc.setdefault(key, {})
+    doc[leaf] = value
+
+
+_local_store = None
+
+
+def get_vector_store() -> VectorStore:
+    global _local_store
+
+    if configs.vector_backend == "local":
+        if _local_store is None:
+            # Imported here because local_vector_store subclasses VectorStore.
+            from app.db.local_vector_store import LocalVectorStore
+            _local_store = LocalVectorStore(configs.local_index_path, exclusive=True)
+        return _local_store
+
+    return AtlasVectorStore(
+        db.get_collection(),
+        space=embedding_spaces.current(),
+        spaces=db.get_space_collection()
+    )
@@ -1,23 +1,92 @@
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 from app.db.database import db
 from app.api.routes import ingest, query
-from app.core.logging import logger
+from app.core.config import configs
+from app.core.logging import get_logger, RequestIdMiddleware
+from app.core.metrics import registry, CallbackGauge, CallbackCounter, MetricsMiddleware
+from app.services.embedding_cache import embedding_cache
+from app.services.ollama_client import ollama_client
+from app.services.answer_cache import answer_cache
+from app.services.jobs import ingestion_jobs
+from app.services.reindex import reindex_jobs
+from app.db.jobs import JobStore, MemoryJobStore
+from app.db.embedding_spaces import embedding_spaces
+from app.db.lexical_index import lexical_index
+from app.db.vector_store import get_vector_store
+from app.db.vector_indexes import ensure_vector_index
+from app.services.embedding import probe_embedding_dimensions
+
+
+logger = get_logger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting Medical RAG System...")
-    await db.connect()
+    if configs.vector_backend == "atlas":
+        await db.connect()
+        await db.ensure_indexes()
+    else:
+        logger.info(f"Using local vector store at {configs.local_index_path}")
+    await ollama_client.connect()
+    await embedding_spaces.refresh(get_vector_store())
+    await check_vector_index()
+    refresher = asyncio.create_task(refresh_embedding_spaces())
+    
+    if configs.hybrid_search_enabled:
+        await lexical_index.build(get_vector_store().iter_documents())
+    
+    job_store = JobStore(db.get_job_collection()) if db.get_job_collection() is not None else MemoryJobStore()
+    await ingestion_jobs.start(job_store)
     logger.info("System ready!")
     
     yield
     
     logger.info("Shutting down...")
+    refresher.cancel()
+    await reindex_jobs.stop()
+    await ingestion_jobs.stop()
     await db.close()
+    await ollama_client.close()
+    embedding_cache.close()
     logger.info("Goodbye!")
 
 
+async def check_vector_index():
+    space = embedding_spaces.current()
+    dimensions = await probe_embedding_dimensions(space.model, space.version)
+    if embedding_spaces.target is not None:
+        logger.warning(
+            f"Re-embedding into {embedding_spaces.target.name} was not finished; "
+            f"start it again to resume"
+        )
+    
+    if configs.vector_backend == "atlas":
+        if configs.vector_index_provisioning:
+            await ensure_vector_index(db.get_collection(), space.index_name, dimensions, path=space.path)
+        return
+    
+    store = get_vector_store()
+    if dimensions is not None and store.dim is not None and store.dim != dimensions:
+        raise RuntimeError(
+            f"Local vector store has {store.dim} dimensions but {space.model} "
+            f"produces {dimensions}"
+        )
+
+
+async def refresh_embedding_spaces():
+    # Picks up a switch made by a re-embed job in another process.
+    while True:
+        await asyncio.sleep(configs.embedding_space_refresh_interval)
+        try:
+            await embedding_spaces.refresh(get_vector_store())
+        except Exception as e:
+            logger.warning(f"Could not refresh embedding spaces: {e}")
+
+
 app = FastAPI(
     title="Medical RAG System",
     description="Research support tool for medical literature (arXiv q-bio papers)",
@@ -25,6 +94,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
 app.include_router(ingest.router, prefix="/ingest", tags=["Ingestion"])
 app.include_router(query.router, prefix="/query", tags=["Query"])
 
@@ -40,4 +112,37 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "answer_cache": answer_cache.stats()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _cache_lookups():
+    embedding = embedding_cache.stats()
+    answer = answer_cache.stats()
+    return {
+        ("embedding", "hit"): embedding["memory_hits"] + embedding["disk_hits"],
+        ("embedding", "miss"): embedding["misses"],
+        ("answer", "hit"): answer["hits"],
+        ("answer", "miss"): answer["misses"],
+    }
+
+
+registry.register(CallbackCounter(
+    "rag_cache_lookups_total", "Cache lookups by result", ("cache", "result"), _cache_lookups
+))
+registry.register(CallbackGauge(
+    "rag_cache_hit_ratio", "Share of cache lookups that hit", ("cache",),
+    lambda: {("embedding",): embedding_cache.stats()["hit_rate"], ("answer",): answer_cache.stats()["hit_rate"]}
+))
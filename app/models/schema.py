@@ -1,29 +1,136 @@
-from pydantic import BaseModel, Field
-from typing import List
+from pydantic import AliasChoices, BaseModel, Field, field_validator, model_validator
+from typing import List, Optional
 from datetime import datetime
+from app.utils.arxiv_ids import base_arxiv_id, split_arxiv_id
 
 
 class Paper(BaseModel):
-    arxiv_id: str
+    arxiv_id: str = Field(description="Base arXiv ID; a version suffix is moved to version")
+    version: int = 1
     title: str
     authors: List[str]
     published: datetime
+    updated: Optional[datetime] = Field(default=None, description="Date of the latest version, published if unknown")
     categories: List[str]
     abstract: str
 
+    @model_validator(mode="before")
+    @classmethod
+    def split_version(cls, data):
+        if isinstance(data, dict) and isinstance(data.get("arxiv_id"), str):
+            base, version = split_arxiv_id(data["arxiv_id"])
+            data = {**data, "arxiv_id": base}
+            if version is not None:
+                data.setdefault("version", version)
+        return data
+
+    @model_validator(mode="after")
+    def default_updated(self):
+        if self.updated is None:
+            self.updated = self.published
+        return self
+
 
 class IngestRequest(BaseModel):
-    max_papers: int = Field(default=50, description="How many papers to fetch")
+    max_papers: int = Field(default=50, description="How many papers to fetch in total, split evenly across the queries")
+    resume: bool = Field(default=False, description="Continue from the last checkpoint of an interrupted run")
+    incremental: bool = Field(default=False, description="Stop once papers older than the last completed run are reached")
+    queries: Optional[List[str]] = Field(default=None, description="arXiv search queries to harvest, e.g. cat:q-bio.NC")
+
+
+class IngestCheckpoint(BaseModel):
+    query: str
+    next_start: int = 0
+    # Latest-version dates; checkpoints written before revisions were tracked hold submission dates.
+    oldest_updated: Optional[datetime] = Field(default=None, validation_alias=AliasChoices("oldest_updated", "oldest_published"))
+    newest_updated: Optional[datetime] = Field(default=None, validation_alias=AliasChoices("newest_updated", "newest_published"))
+    completed: bool = False
+    updated_at: Optional[datetime] = None
+
+
+class WriteStats(BaseModel):
+    batches: int
+    documents: int
+    duplicates: int = 0
+    batch_latencies_ms: List[float]
+    mean_batch_latency_ms: float
+    max_batch_latency_ms: float
+    throughput_docs_per_sec: float
 
 
 class IngestResponse(BaseModel):
     papers_processed: int
     chunks_created: int
+    chunks_skipped: int = 0
     message: str
+    write_stats: Optional[WriteStats] = None
+
+
+class IngestJob(BaseModel):
+    job_id: str
+    status: str = "queued"
+    request: IngestRequest
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    papers_fetched: int = 0
+    chunks_created: int = 0
+    chunks_embedded: int = 0
+    chunks_stored: int = 0
+    chunks_skipped: int = 0
+    rate_chunks_per_sec: float = 0.0
+    eta_seconds: Optional[float] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+
+class EmbeddingSpace(BaseModel):
+    """The vectors of one embedding model version: where they are stored and which index searches them."""
+    model: str
+    version: int = 1
+    name: str
+    path: str
+    index_name: str
+    dimensions: Optional[int] = None
+
+
+class ReindexRequest(BaseModel):
+    model: str = Field(..., description="Embedding model to re-embed the stored chunks with")
+    version: int = Field(default=1, description="Bump to re-embed with an updated model of the same name")
+    switch: bool = Field(default=True, description="Move retrieval to the new model once every chunk has a vector")
+
+
+class ReindexStatus(BaseModel):
+    status: str = "idle"
+    active: EmbeddingSpace
+    target: Optional[EmbeddingSpace] = None
+    chunks_embedded: int = 0
+    chunks_total: Optional[int] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
 
 
 class QueryRequest(BaseModel):
     case_description: str = Field(..., min_length=20)
+    categories: Optional[List[str]] = Field(default=None, description="Only papers in any of these arXiv categories")
+    published_from: Optional[datetime] = Field(default=None, description="Only papers published on or after this time")
+    published_to: Optional[datetime] = Field(default=None, description="Only papers published on or before this time")
+    arxiv_ids: Optional[List[str]] = Field(default=None, description="Only these papers, by base or versioned arXiv ID")
+
+    @field_validator("arxiv_ids")
+    @classmethod
+    def strip_versions(cls, arxiv_ids):
+        # Chunks are stored under base IDs, so "2301.12345v2" has to filter as "2301.12345".
+        if arxiv_ids is None:
+            return None
+        return list(dict.fromkeys(base_arxiv_id(arxiv_id) for arxiv_id in arxiv_ids))
+
+    @model_validator(mode="after")
+    def check_date_range(self):
+        if self.published_from and self.published_to and self.published_from > self.published_to:
+            raise ValueError("published_from must not be after published_to")
+        return self
 
 
 class Reference(BaseModel):
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
+import numpy as np
+from app.core.config import configs
+from app.models.schema import QueryResponse
+
+
+class _Entry:
+    __slots__ = ("embedding", "chunk_ids", "response", "expires_at")
+
+    def __init__(self, embedding: np.ndarray, chunk_ids: frozenset, response: QueryResponse, expires_at: float):
+        self.embedding = embedding
+        self.chunk_ids = chunk_ids
+        self.response = response
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """Semantic cache of generated answers for /query/case.
+
+    A cached answer is reused only when the new query embedding is within
+    max_distance (cosine) of the cached one and retrieval returned exactly the
+    same chunks, so newly ingested chunks that change the retrieved set are
+    never masked even when invalidate() was called in another process.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0, max_distance: float = 0.05):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_chunks: Dict[frozenset, List[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, query_embedding: List[float], chunk_ids: List[str]) -> Optional[QueryResponse]:
+        key = frozenset(chunk_ids)
+        query = _normalize(query_embedding)
+
+        with self._lock:
+            self._expire()
+            best: Tuple[float, Optional[int]] = (-1.0, None)
+
+            for entry_id in self._by_chunks.get(key, []):
+                entry = self._entries[entry_id]
+                if entry.embedding.shape != query.shape:
+                    continue
+                similarity = float(np.dot(entry.embedding, query))
+                if similarity > best[0]:
+                    best = (similarity, entry_id)
+
+            similarity, entry_id = best
+            if entry_id is None or 1.0 - similarity > self.max_distance:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id].response.model_copy(deep=True)
+
+    def store(self, query_embedding: List[float], chunk_ids: List[str], response: QueryResponse):
+        key = frozenset(chunk_ids)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+
+            self._entries[entry_id] = _Entry(
+                embedding=_normalize(query_embedding),
+                chunk_ids=key,
+                response=response.model_copy(deep=True),
+                expires_at=time.monotonic() + self.ttl_seconds
+            )
+            self._by_chunks.setdefault(key, []).append(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                oldest_id, oldest = self._entries.popitem(last=False)
+                self._forget(oldest_id, oldest.chunk_ids)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_chunks.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "invalidations": self.invalidations,
+        }
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry.expires_at <= now]
+        for entry_id in expired:
+            entry = self._entries.pop(entry_id)
+            self._forget(entry_id, entry.chunk_ids)
+
+    def _forget(self, entry_id: int, key: frozenset):
+        ids = self._by_chunks.get(key)
+        if ids and entry_id in ids:
+            ids.remove(entry_id)
+            if not ids:
+                del self._by_chunks[key]
+
+
+def _normalize(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+answer_cache = AnswerCache(
+    max_entries=configs.answer_cache_size,
+    ttl_seconds=configs.answer_cache_ttl,
+    max_distance=configs.answer_cache_max_distance
+)
@@ -1,31 +1,122 @@
-import ollama
-from typing import List
+import asyncio
+from typing import List, Optional
 from app.core.config import configs
-from app.core.logging import logger
+from app.core.logging import get_logger
+from app.core.metrics import timed
+from app.services.embedding_cache import embedding_cache
+from app.services.ollama_client import ollama_client
 
 
-def generate_embedding(text: str) -> List[float]:
-    try:
-        client = ollama.Client(host=configs.ollama_url)
-        response = client.embeddings(
-            model=configs.embedding_model,
-            prompt=text
-        )
-        return response["embedding"]
+logger = get_logger(__name__)
+
+
+def cache_namespace(model: str, version: int = None) -> str:
+    """Cache key prefix of an embedding space, so a new version of the same model never reuses old vectors.
+
+    Version 1 keeps the bare model name, which is what entries were keyed by
+    before embedding spaces were versioned.
+    """
+    version = configs.embedding_model_version if version is None else version
+    return model if version == 1 else f"{model}@v{version}"
+
+
+async def generate_embedding(text: str, model: str = None, version: int = None) -> List[float]:
+    model = model or configs.embedding_model
+    namespace = cache_namespace(model, version)
+    if configs.embedding_cache_enabled:
+        cached = (await embedding_cache.aget_many(namespace, [text]))[0]
+        if cached is not None:
+            return cached
     
+    try:
+        client = ollama_client.get_client()
+        async with ollama_client.limit(model):
+            with timed("embedding"):
+                response = await client.embed(
+                    model=model,
+                    input=text
+                )
+        embedding = response["embeddings"][0]
+        
+        if configs.embedding_cache_enabled:
+            # Returned as a later cache hit would return it.
+            embedding = (await embedding_cache.aput_many(namespace, [text], [embedding]))[0]
+        return embedding
+
     except Exception as e:
         logger.error(f"Error generating embedding: {e}")
         raise
 
 
-async def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
-    embeddings = []
-    
-    for i, text in enumerate(texts):
-        if (i + 1) % 10 == 0:
-            logger.info(f"Generated {i + 1}/{len(texts)} embeddings")
-        
-        embedding = generate_embedding(text)
-        embeddings.append(embedding)
-    
-    return embeddings
\ No newline at end of file
+async def generate_embeddings_batch(
+    texts: List[str],
+    batch_size: int = None,
+    max_concurrency: int = None,
+    model: str = None,
+    version: int = None
+) -> List[List[float]]:
+    if not texts:
+        return []
+
+    model = model or configs.embedding_model
+    namespace = cache_namespace(model, version)
+    if batch_size is None:
+        batch_size = configs.embedding_batch_size
+
+    cached = [None] * len(texts)
+    if configs.embedding_cache_enabled:
+        cached = await embedding_cache.aget_many(namespace, texts)
+
+    # Identical texts within the request are only sent to the model once.
+    missing = list(dict.fromkeys(text for text, hit in zip(texts, cached) if hit is None))
+    if not missing:
+        return cached
+
+    client = ollama_client.get_client()
+    semaphore = ollama_client.limit(model)
+    if max_concurrency is not None:
+        semaphore = asyncio.Semaphore(max_concurrency)
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    done = 0
+
+    async def embed_batch(batch: List[str]) -> List[List[float]]:
+        nonlocal done
+        async with semaphore:
+            response = await client.embed(
+                model=model,
+                input=batch
+            )
+
+        embeddings = response["embeddings"]
+        if len(embeddings) != len(batch):
+            raise ValueError(
+                f"Embedding server returned {len(embeddings)} vectors for {len(batch)} inputs"
+            )
+
+        done += len(batch)
+        logger.info(f"Generated {done}/{len(missing)} embeddings", extra={"event": "embedding_progress"})
+        return embeddings
+
+    try:
+        with timed("embedding_batch"):
+            results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    except Exception as e:
+        logger.error(f"Error generating embeddings batch: {e}")
+        raise
+
+    generated = [embedding for batch in results for embedding in batch]
+    if configs.embedding_cache_enabled:
+        generated = await embedding_cache.aput_many(namespace, missing, generated)
+
+    by_text = dict(zip(missing, generated))
+    return [hit if hit is not None else by_text[text] for text, hit in zip(texts, cached)]
+
+
+async def probe_embedding_dimensions(model: str = None, version: int = None) -> Optional[int]:
+    """Output size of an embedding model (the configured one by default), or None if it cannot be reached."""
+    model = model or configs.embedding_model
+    try:
+        return len(await generate_embedding("dimension probe", model=model, version=version))
+    except Exception as e:
+        logger.warning(f"Could not probe {model} for its embedding size: {e}")
+        return None
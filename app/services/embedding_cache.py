@@ -0,0 +1,182 @@
+import asyncio
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Tuple
+from app.core.config import configs
+from app.core.logging import get_logger
+from app.utils.hashing import embedding_key
+
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCache:
+    """Two-tier (in-process LRU + SQLite) cache of embeddings.
+
+    Entries are keyed by model name and a hash of the whitespace-normalized
+    text, so identical chunks and repeated queries never reach the model twice.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+
+        # Vectors are held as float32 arrays, a sixth of the size of a list of floats.
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        # The memory tier is used from the event loop, so it never waits
+        # behind SQLite I/O running in a worker thread.
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def aget_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vectors or None per text; memory hits are served inline, SQLite reads run in a worker thread."""
+        results, missing = self._get_from_memory(model, texts)
+        if missing:
+            if self.path:
+                await asyncio.to_thread(self._get_from_disk, results, missing)
+            else:
+                self._get_from_disk(results, missing)
+        return results
+
+    async def aput_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> List[List[float]]:
+        """Caches vectors, the SQLite write running in a worker thread.
+
+        Returns them rounded to float32 as later hits will be, so callers can
+        hand out the same values on a miss as on a hit.
+        """
+        rows, rounded = self._put_in_memory(model, texts, vectors)
+        if self.path:
+            await asyncio.to_thread(self._write, rows)
+        return rounded
+
+    def _get_from_memory(self, model: str, texts: List[str]) -> Tuple[list, Dict[str, List[int]]]:
+        keys = [embedding_key(model, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    results[i] = vector.tolist()
+                else:
+                    missing.setdefault(key, []).append(i)
+        return results, missing
+
+    def _get_from_disk(self, results: list, missing: Dict[str, List[int]]):
+        with self._disk_lock:
+            found = self._load(list(missing))
+
+        with self._lock:
+            for key, vector in found.items():
+                self._remember(key, vector)
+                for i in missing.pop(key):
+                    self.disk_hits += 1
+                    results[i] = vector.tolist()
+            self.misses += sum(len(positions) for positions in missing.values())
+
+    def _put_in_memory(self, model: str, texts: List[str], vectors: List[List[float]]) -> Tuple[List[tuple], list]:
+        rows = []
+        rounded = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = embedding_key(model, text)
+                packed = array("f", vector)
+                self._remember(key, packed)
+                rows.append((key, model, len(packed), packed.tobytes()))
+                rounded.append(packed.tolist())
+        return rows, rounded
+
+    def _write(self, rows: List[tuple]):
+        with self._disk_lock:
+            conn = self._connection()
+            if conn is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self._disk_lock:
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM embeddings")
+                conn.commit()
+
+    def close(self):
+        with self._disk_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+        }
+
+    def _remember(self, key: str, vector: array):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, keys: List[str]) -> Dict[str, array]:
+        conn = self._connection()
+        if conn is None or not keys:
+            return {}
+
+        found = {}
+        # Stay well below SQLite's bound-parameter limit.
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                part
+            )
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector
+        return found
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self.path:
+            try:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding disk cache unavailable, using memory only: {e}")
+                self.path = None
+                self._conn = None
+        return self._conn
+
+
+embedding_cache = EmbeddingCache(
+    path=configs.embedding_cache_path,
+    max_entries=configs.embedding_cache_size
+)
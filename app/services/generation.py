@@ -1,17 +1,42 @@
-import ollama
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator
 from app.core.config import configs
-from app.core.logging import logger
+from app.core.logging import get_logger
+from app.core.metrics import timed, record_llm_usage
+from app.services.ollama_client import ollama_client
+from app.utils.chunking import estimate_tokens, split_sentences
 
 
-def generate_answer(case_description: str, retrieved_chunks: List[Dict[str, Any]]) -> str:
+logger = get_logger(__name__)
+
+
+# Sent as the Ollama system prompt: it is identical on every request, so the
+# model's KV cache for it can be reused while the model stays loaded.
+SYSTEM_PROMPT = """You are a medical research assistant helping researchers understand scientific literature.
+
+RULES:
+1. Use ONLY the research papers provided in the prompt - do not add external knowledge
+2. Always start with "Based on available research literature..."
+3. Cite arXiv IDs when referencing findings (e.g., "According to arXiv:2301.12345...")
+4. If the research doesn't contain enough information, clearly state this
+5. Do NOT provide clinical advice or treatment recommendations
+6. Do NOT hallucinate or make up information
+7. Be honest about uncertainties and limitations
+
+REMEMBER: This is a research support tool."""
+
+MIN_CHUNK_TOKENS = 16
+
+NO_RESULTS_ANSWER = (
+    "Based on available research literature, I could not find "
+    "sufficient relevant studies to address this query. "
+    "Please try rephrasing your question or consult additional sources."
+)
+
+
+async def generate_answer(case_description: str, retrieved_chunks: List[Dict[str, Any]]) -> str:
     if not retrieved_chunks:
         logger.warning("No relevant research found")
-        return (
-            "Based on available research literature, I could not find "
-            "sufficient relevant studies to address this query. "
-            "Please try rephrasing your question or consult additional sources."
-        )
+        return NO_RESULTS_ANSWER
     
     logger.info("Generating answer from LLM...")
     
@@ -20,11 +45,16 @@ def generate_answer(case_description: str, retrieved_chunks: List[Dict[str, Any]
     prompt = create_prompt(case_description, context)
     
     try:
-        client = ollama.Client(host=configs.ollama_url)
-        response = client.generate(
-            model=configs.llm_model,
-            prompt=prompt
-        )
+        client = ollama_client.get_client()
+        async with ollama_client.limit(configs.llm_model):
+            with timed("generation"):
+                response = await client.generate(
+                    model=configs.llm_model,
+                    prompt=prompt,
+                    system=SYSTEM_PROMPT,
+                    keep_alive=configs.llm_keep_alive
+                )
+        record_llm_usage(configs.llm_model, response)
         
         answer = response["response"]
         logger.info(f"Generated answer ({len(answer)} chars)")
@@ -35,38 +65,121 @@ def generate_answer(case_description: str, retrieved_chunks: List[Dict[str, Any]
         raise
 
 
-def build_context(chunks: List[Dict[str, Any]]) -> str:
-    context_parts = []
+async def stream_answer(case_description: str, retrieved_chunks: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    if not retrieved_chunks:
+        logger.warning("No relevant research found")
+        yield NO_RESULTS_ANSWER
+        return
     
-    for i, chunk in enumerate(chunks, 1):
-        context_parts.append(
-            f"[Research Paper {i}]\n"
-            f"arXiv ID: {chunk['arxiv_id']}\n"
-            f"Title: {chunk['title']}\n"
-            f"Content: {chunk['chunk_text']}\n"
-        )
+    logger.info("Streaming answer from LLM...")
+    
+    context = build_context(retrieved_chunks)
+    
+    prompt = create_prompt(case_description, context)
+    
+    try:
+        client = ollama_client.get_client()
+        async with ollama_client.limit(configs.llm_model):
+            with timed("generation"):
+                stream = await client.generate(
+                    model=configs.llm_model,
+                    prompt=prompt,
+                    system=SYSTEM_PROMPT,
+                    keep_alive=configs.llm_keep_alive,
+                    stream=True
+                )
+                
+                async for part in stream:
+                    token = part["response"]
+                    if token:
+                        yield token
+                    if part.get("done"):
+                        record_llm_usage(configs.llm_model, part)
+    
+    except Exception as e:
+        logger.error(f"  ✗ Error streaming answer: {e}")
+        raise
+
+
+def build_context(chunks: List[Dict[str, Any]], max_tokens: int = None) -> str:
+    """Packs retrieved chunks into at most max_tokens of prompt context.
+
+    Sentences already given by a higher-ranked chunk are dropped, then the
+    budget is split across chunks in proportion to their retrieval score;
+    budget a short chunk does not need goes to the others. Chunks are cut at
+    sentence boundaries.
+    """
+    if max_tokens is None:
+        max_tokens = configs.context_max_tokens
+    
+    entries = []
+    seen = set()
+    for chunk in chunks:
+        sentences = []
+        for sentence in split_sentences(chunk["chunk_text"]):
+            key = " ".join(sentence.lower().split())
+            if key not in seen:
+                seen.add(key)
+                sentences.append(sentence)
+        if sentences:
+            label = f"arXiv:{chunk['arxiv_id']} - {chunk['title']}"
+            weight = max(chunk.get("score", 1.0), 1e-3)
+            entries.append((label, sentences, weight))
+    
+    needs = [
+        _header_tokens(label) + sum(estimate_tokens(sentence) for sentence in sentences)
+        for label, sentences, _ in entries
+    ]
+    allocations = [0.0] * len(entries)
+    remaining = float(max_tokens)
+    remaining_weight = sum(weight for _, _, weight in entries)
+    # Smallest need per unit of score first, so leftover shares flow to larger chunks.
+    for i in sorted(range(len(entries)), key=lambda i: needs[i] / entries[i][2]):
+        weight = entries[i][2]
+        allocations[i] = min(needs[i], remaining * weight / remaining_weight)
+        remaining -= allocations[i]
+        remaining_weight -= weight
+    
+    context_parts = []
+    for (label, sentences, _), allocation in zip(entries, allocations):
+        budget = allocation - _header_tokens(label)
+        kept = []
+        for sentence in sentences:
+            cost = estimate_tokens(sentence)
+            if cost > budget:
+                break
+            kept.append(sentence)
+            budget -= cost
+        
+        if not kept and budget >= MIN_CHUNK_TOKENS:
+            # A single long sentence is cut at a word boundary rather than lost.
+            kept = [_truncate_words(sentences[0], int(budget))]
+        if kept:
+            context_parts.append(f"[Research Paper {len(context_parts) + 1}] {label}\n{' '.join(kept)}\n")
     
     return "\n".join(context_parts)
 
 
-def create_prompt(case_description: str, context: str) -> str:
-   return f"""You are a medical research assistant helping researchers understand scientific literature.
+def _header_tokens(label: str) -> int:
+    return estimate_tokens(f"[Research Paper 10] {label}") + 1
 
-RULES:
-1. Use ONLY the research papers provided below - do not add external knowledge
-2. Always start with "Based on available research literature..."
-3. Cite arXiv IDs when referencing findings (e.g., "According to arXiv:2301.12345...")
-4. If the research doesn't contain enough information, clearly state this
-5. Do NOT provide clinical advice or treatment recommendations
-6. Do NOT hallucinate or make up information
-7. Be honest about uncertainties and limitations
 
-REMEMBER: This is a research support tool.
+def _truncate_words(text: str, max_tokens: int) -> str:
+    words = []
+    used = 0
+    for word in text.split():
+        used += estimate_tokens(word + " ")
+        if used > max_tokens - 1:
+            break
+        words.append(word)
+    return " ".join(words) + " …"
 
-RESEARCHER'S QUESTION:
+
+def create_prompt(case_description: str, context: str) -> str:
+    return f"""RESEARCHER'S QUESTION:
 {case_description}
 
 RELEVANT RESEARCH PAPERS:
 {context}
 
-Please provide a comprehensive response based on the research above, with proper citations."""
\ No newline at end of file
+Please provide a comprehensive response based on the research above, with proper citations."""
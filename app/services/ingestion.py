@@ -0,0 +1,393 @@
+import asyncio
+from contextlib import aclosing
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.config import configs
+from app.core.logging import get_logger
+from app.core.metrics import timed
+from app.db.checkpoints import CheckpointStore
+from app.db.chunk_writer import ChunkWriter
+from app.db.database import db
+from app.db.embedding_spaces import embedding_spaces
+from app.db.vector_store import ChunkKey, VectorStore, chunk_key, get_vector_store
+from app.models.schema import Paper, WriteStats, IngestCheckpoint, IngestRequest
+from app.services.embedding import generate_embeddings_batch
+from app.services.answer_cache import answer_cache
+from app.services.paper import iter_paper_pages
+from app.utils.hashing import content_hash
+from app.utils.chunking import chunk_text
+from app.utils.text_cleaning import clean_text, clean_texts
+
+
+logger = get_logger(__name__)
+
+
+_DONE = object()
+
+
+class _QueryRun:
+    def __init__(self, query: str, max_papers: int):
+        self.query = query
+        self.max_papers = max_papers
+        self.checkpoint: Optional[IngestCheckpoint] = None
+        self.start_offset = 0
+        self.watermark: Optional[datetime] = None
+        self.newest_seen: Optional[datetime] = None
+        self.exhausted = False
+        self.failed = False
+
+
+class _PageDone:
+    def __init__(
+        self,
+        run: _QueryRun,
+        next_start: int,
+        oldest_updated: Optional[datetime],
+        failed: bool = False
+    ):
+        self.run = run
+        self.next_start = next_start
+        self.oldest_updated = oldest_updated
+        self.failed = failed
+
+
+def build_chunk_docs(paper: Paper, max_tokens: int = None, overlap_tokens: int = None) -> List[dict]:
+    return _chunk_docs(paper, clean_text(paper.abstract), max_tokens, overlap_tokens)
+
+
+def build_chunk_docs_batch(papers: List[Paper], max_tokens: int = None, overlap_tokens: int = None) -> List[dict]:
+    abstracts = clean_texts(paper.abstract for paper in papers)
+    return [
+        doc
+        for paper, abstract in zip(papers, abstracts)
+        for doc in _chunk_docs(paper, abstract, max_tokens, overlap_tokens)
+    ]
+
+
+def _chunk_docs(paper: Paper, clean_abstract: str, max_tokens: int, overlap_tokens: int) -> List[dict]:
+    paper_chunks = chunk_text(
+        clean_abstract,
+        max_tokens=min(max_tokens or configs.chunk_max_tokens, configs.embedding_max_tokens),
+        overlap_tokens=configs.chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+    )
+
+    return [
+        {
+            "arxiv_id": paper.arxiv_id,
+            "version": paper.version,
+            "title": paper.title,
+            "authors": paper.authors,
+            "published": paper.published,
+            "categories": paper.categories,
+            "chunk_text": chunk,
+            "chunk_index": chunk_idx,
+            "content_hash": content_hash(chunk)
+        }
+        for chunk_idx, chunk in enumerate(paper_chunks)
+    ]
+
+
+async def embed_chunk_docs(store: VectorStore, docs: List[dict]):
+    """Embeds chunks into the store's space and into any space a re-embed job is filling."""
+    texts = [doc["chunk_text"] for doc in docs]
+    embeddings = await generate_embeddings_batch(texts, model=store.space.model, version=store.space.version)
+    for doc, embedding in zip(docs, embeddings):
+        doc["embedding"] = embedding
+
+    for space in embedding_spaces.write_spaces():
+        if space.name == store.space.name:
+            continue
+        vectors = await generate_embeddings_batch(texts, model=space.model, version=space.version)
+        for doc, vector in zip(docs, vectors):
+            doc.setdefault("embeddings", {})[space.name] = vector
+
+
+class ChunkPlanner:
+    """Decides which built chunks to store and which stored chunks they supersede.
+
+    Works on the chunks of whole papers. A paper whose newest stored (or
+    already queued) version is newer is skipped; otherwise the chunks of
+    older versions are superseded, as are stored chunks of the same version
+    that the paper no longer produces (after a chunking or cleaning change
+    moved its boundaries) and chunks stored without a version or content
+    hash, from before either was tracked. Chunks already stored are skipped.
+    """
+
+    def __init__(self):
+        # Keys written by this run, per paper: cross-listed papers arrive once
+        # per query, possibly before the writer has flushed the first copy.
+        self._queued: Dict[str, Set[ChunkKey]] = {}
+
+    def plan(self, docs: List[dict], stored: Set[ChunkKey]) -> Tuple[List[dict], Set[ChunkKey]]:
+        stored_by_paper: Dict[str, Set[ChunkKey]] = {}
+        for key in stored:
+            stored_by_paper.setdefault(key[0], set()).add(key)
+        papers: Dict[str, List[dict]] = {}
+        for doc in docs:
+            papers.setdefault(doc["arxiv_id"], []).append(doc)
+
+        new_docs = []
+        stale: Set[ChunkKey] = set()
+        for arxiv_id, paper_docs in papers.items():
+            version = max(doc["version"] for doc in paper_docs)
+            known = stored_by_paper.get(arxiv_id, set()) | self._queued.get(arxiv_id, set())
+            if any(key[1] is not None and key[1] > version for key in known):
+                continue
+
+            paper_docs = [doc for doc in paper_docs if doc["version"] == version]
+            keys = {chunk_key(doc) for doc in paper_docs}
+            superseded = {
+                key for key in known
+                if key[1] is None or key[3] is None or key[1] < version or (key[1] == version and key not in keys)
+            }
+            stale |= superseded
+            new_docs.extend(doc for doc in paper_docs if chunk_key(doc) not in known)
+            self._queued[arxiv_id] = (self._queued.get(arxiv_id, set()) - superseded) | keys
+
+        return new_docs, stale
+
+
+async def store_chunks(store: VectorStore, writer: ChunkWriter, planner: ChunkPlanner, docs: List[dict]) -> List[dict]:
+    """Embeds and writes the new chunks of whole papers, after deleting the ones they supersede."""
+    stored = await store.existing_keys(list({doc["arxiv_id"] for doc in docs}))
+    new_docs, stale = planner.plan(docs, stored)
+
+    if stale:
+        if stale - stored:
+            # A superseded version queued by this run may still be in the writer.
+            await writer.drain()
+        deleted = await store.delete_chunks(stale)
+        logger.info(f"Removed {deleted} superseded chunks")
+
+    if new_docs:
+        await embed_chunk_docs(store, new_docs)
+        await writer.add_many(new_docs)
+    return new_docs
+
+
+class IngestionPipeline:
+    """Streams papers through fetch -> clean/chunk -> embed -> store.
+
+    Each stage runs as its own task and hands work to the next one through a
+    bounded queue, so fetching page N+1 overlaps with embedding and storing
+    page N while at most a few queues' worth of papers are held in memory.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        max_papers: int,
+        queue_size: int = None,
+        checkpoints: CheckpointStore = None,
+        resume: bool = False,
+        incremental: bool = False,
+        queries: List[str] = None
+    ):
+        self.store = store
+        self.max_papers = max_papers
+        self.queue_size = queue_size or configs.pipeline_queue_size
+        self.writer = ChunkWriter(store)
+        self.checkpoints = checkpoints
+        self.resume = resume
+        self.incremental = incremental
+
+        # max_papers is a total: each query gets an even share, the first ones the remainder.
+        queries = queries or configs.arxiv_queries
+        share, extra = divmod(max_papers, len(queries))
+        self.runs = [
+            _QueryRun(query, share + (i < extra)) for i, query in enumerate(queries)
+            if share + (i < extra) > 0
+        ]
+        self.planner = ChunkPlanner()
+
+        self.papers_fetched = 0
+        self.chunks_created = 0
+        self.chunks_skipped = 0
+        self.chunks_embedded = 0
+
+    @property
+    def chunks_stored(self) -> int:
+        return self.writer.documents_written
+
+    async def run(self) -> WriteStats:
+        for query_run in self.runs:
+            await self._load_checkpoint(query_run)
+
+        papers: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async with self.writer:
+            stages = [
+                asyncio.create_task(self._fetch(papers)),
+                asyncio.create_task(self._chunk(papers, chunks)),
+                asyncio.create_task(self._embed(chunks)),
+            ]
+            try:
+                await asyncio.gather(*stages)
+            except BaseException:
+                for stage in stages:
+                    stage.cancel()
+                await asyncio.gather(*stages, return_exceptions=True)
+                raise
+
+        if self.chunks_stored:
+            answer_cache.invalidate()
+
+        for query_run in self.runs:
+            await self._finish_checkpoint(query_run)
+        return self.writer.stats()
+
+    async def _load_checkpoint(self, run: _QueryRun):
+        if self.checkpoints is None:
+            return
+
+        run.checkpoint = await self.checkpoints.load(run.query) or IngestCheckpoint(query=run.query)
+
+        if self.resume and not run.checkpoint.completed:
+            run.start_offset = run.checkpoint.next_start
+            logger.info(f"Resuming ingestion of '{run.query}' at offset {run.start_offset}")
+        else:
+            run.checkpoint.next_start = 0
+            run.checkpoint.oldest_updated = None
+            run.checkpoint.completed = False
+
+        if self.incremental and run.checkpoint.newest_updated:
+            run.watermark = run.checkpoint.newest_updated
+            logger.info(f"Incremental ingestion of '{run.query}' down to {run.watermark.isoformat()}")
+
+    async def _save_page(self, page: _PageDone):
+        run = page.run
+        if page.failed:
+            # Freeze the checkpoint at the failed page so a resumed run retries it.
+            run.failed = True
+        if run.checkpoint is None or run.failed:
+            return
+
+        # Only advance once every chunk of the page has been written, so a
+        # resumed run never skips a page whose writes were still in flight.
+        await self.writer.drain()
+        run.checkpoint.next_start = page.next_start
+        if page.oldest_updated:
+            run.checkpoint.oldest_updated = page.oldest_updated
+        await self.checkpoints.save(run.checkpoint)
+
+    async def _finish_checkpoint(self, run: _QueryRun):
+        if run.checkpoint is None:
+            return
+
+        if run.failed or not run.exhausted:
+            logger.warning(f"Ingestion of '{run.query}' stopped at offset {run.checkpoint.next_start}; resume to continue")
+            return
+
+        run.checkpoint.completed = True
+        if run.newest_seen and (
+            run.checkpoint.newest_updated is None
+            or run.newest_seen > run.checkpoint.newest_updated
+        ):
+            run.checkpoint.newest_updated = run.newest_seen
+        await self.checkpoints.save(run.checkpoint)
+
+    async def _fetch(self, papers: asyncio.Queue):
+        await asyncio.gather(*(self._fetch_query(run, papers) for run in self.runs))
+        await papers.put(_DONE)
+
+    async def _fetch_query(self, run: _QueryRun, papers: asyncio.Queue):
+        pages = iter_paper_pages(run.max_papers, run.start_offset, query=run.query)
+        async with aclosing(pages):
+            async for next_start, page in pages:
+                if page is None:
+                    await papers.put(_PageDone(run, next_start, None, failed=True))
+                    continue
+                if not page:
+                    # Every entry failed to parse; the harvester decides where the feed ends.
+                    await papers.put(_PageDone(run, next_start, None))
+                    continue
+
+                # Pages are sorted by last update, so revised papers come back
+                # to the top and are picked up by incremental runs.
+                updated = [paper.updated for paper in page]
+                newest, oldest = max(updated), min(updated)
+                if run.newest_seen is None or newest > run.newest_seen:
+                    run.newest_seen = newest
+
+                new_papers = [
+                    paper for paper in page
+                    if run.watermark is None or paper.updated >= run.watermark
+                ]
+                for paper in new_papers:
+                    await papers.put(paper)
+                    self.papers_fetched += 1
+                await papers.put(_PageDone(run, next_start, oldest))
+
+                if run.watermark is not None and oldest < run.watermark:
+                    logger.info(f"Reached '{run.query}' papers from the previous run, stopping")
+                    break
+
+        run.exhausted = True
+
+    async def _chunk(self, papers: asyncio.Queue, chunks: asyncio.Queue):
+        while True:
+            paper = await papers.get()
+            if paper is _DONE:
+                break
+            if isinstance(paper, _PageDone):
+                await chunks.put(paper)
+                continue
+
+            with timed("chunking"):
+                docs = build_chunk_docs(paper)
+            logger.info(f"Created {len(docs)} chunks for {paper.arxiv_id}", extra={"event": "chunks_created"})
+
+            # A paper's chunks travel together, so older versions can be replaced as a whole.
+            if docs:
+                await chunks.put(docs)
+                self.chunks_created += len(docs)
+
+        await chunks.put(_DONE)
+
+    async def _embed(self, chunks: asyncio.Queue):
+        window = configs.embedding_batch_size * configs.embedding_concurrency
+        finished = False
+
+        while not finished:
+            item = await chunks.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _PageDone):
+                await self._save_page(item)
+                continue
+
+            batch = list(item)
+            page_done = None
+            while len(batch) < window and not chunks.empty():
+                item = chunks.get_nowait()
+                if item is _DONE:
+                    finished = True
+                    break
+                if isinstance(item, _PageDone):
+                    page_done = item
+                    break
+                batch.extend(item)
+
+            await self._store(batch)
+            if page_done:
+                await self._save_page(page_done)
+
+    async def _store(self, batch: List[dict]):
+        new_docs = await store_chunks(self.store, self.writer, self.planner, batch)
+        self.chunks_skipped += len(batch) - len(new_docs)
+        self.chunks_embedded += len(new_docs)
+
+
+def create_pipeline(request: IngestRequest) -> IngestionPipeline:
+    checkpoint_collection = db.get_checkpoint_collection()
+    checkpoints = CheckpointStore(checkpoint_collection) if checkpoint_collection is not None else None
+
+    return IngestionPipeline(
+        get_vector_store(),
+        request.max_papers,
+        checkpoints=checkpoints,
+        resume=request.resume,
+        incremental=request.incremental,
+        queries=request.queries
+    )
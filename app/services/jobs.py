@@ -0,0 +1,199 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional, Callable
+from app.core.config import configs
+from app.core.logging import get_logger, job_id_var
+from app.models.schema import IngestJob, IngestRequest
+from app.services.ingestion import IngestionPipeline, create_pipeline
+
+
+logger = get_logger(__name__)
+
+
+FINISHED_STATUSES = {"completed", "failed", "cancelled"}
+
+
+class IngestionJobManager:
+    """Runs submitted ingestion jobs on a fixed pool of background workers.
+
+    Job state lives in the job store, so progress survives the request that
+    submitted it. Jobs left queued or running by a restart are re-queued on
+    start and resume from their ingestion checkpoints.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = None,
+        progress_interval: float = None,
+        pipeline_factory: Callable[[IngestRequest], IngestionPipeline] = create_pipeline
+    ):
+        self.concurrency = concurrency or configs.ingest_job_concurrency
+        self.progress_interval = progress_interval or configs.ingest_job_progress_interval
+        self.pipeline_factory = pipeline_factory
+
+        self.store = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self, store):
+        self.store = store
+        self._queue = asyncio.Queue()
+
+        for job in await store.unfinished():
+            if job.status == "running":
+                await self._mark_interrupted(job)
+            self._queue.put_nowait(job.job_id)
+            logger.info(f"Re-queued ingestion job {job.job_id}")
+
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        logger.info(f"Ingestion job queue started with {self.concurrency} workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, request: IngestRequest) -> IngestJob:
+        job = IngestJob(job_id=uuid.uuid4().hex, request=request, created_at=_now())
+        await self.store.create(job)
+        await self._queue.put(job.job_id)
+        logger.info(f"Queued ingestion job {job.job_id} for {request.max_papers} papers")
+        return job
+
+    async def get(self, job_id: str) -> Optional[IngestJob]:
+        return await self.store.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[IngestJob]:
+        job = await self.store.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+
+        self._cancelled.add(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.wait({task})
+        else:
+            await self.store.update(job_id, status="cancelled", finished_at=_now())
+
+        return await self.store.get(job_id)
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self.store.get(job_id)
+                if job is None or job.status != "queued":
+                    continue
+
+                task = asyncio.create_task(self._run(job))
+                self._running[job_id] = task
+                await task
+            except Exception as e:
+                logger.error(f"Ingestion worker failed on job {job_id}: {e}")
+            finally:
+                self._running.pop(job_id, None)
+                self._cancelled.discard(job_id)
+
+    async def _run(self, job: IngestJob):
+        # _run is its own task, so the ID tags only this job's log records.
+        job_id_var.set(job.job_id)
+        try:
+            pipeline = self.pipeline_factory(job.request)
+        except Exception as e:
+            logger.error(f"Ingestion job {job.job_id} failed to start: {e}")
+            await self.store.update(job.job_id, status="failed", error=str(e), finished_at=_now())
+            return
+
+        started = time.perf_counter()
+        reporter = None
+
+        try:
+            await self.store.update(job.job_id, status="running", started_at=_now())
+            reporter = asyncio.create_task(self._report_progress(job, pipeline, started))
+            await pipeline.run()
+
+        except asyncio.CancelledError:
+            if job.job_id not in self._cancelled:
+                # Shutting down: leave the job to be resumed on the next start.
+                await self._mark_interrupted(job)
+                raise
+            logger.info(f"Ingestion job {job.job_id} cancelled")
+            await self.store.update(
+                job.job_id,
+                status="cancelled",
+                finished_at=_now(),
+                **self._progress(job, pipeline, started)
+            )
+
+        except Exception as e:
+            logger.error(f"Ingestion job {job.job_id} failed: {e}")
+            await self.store.update(
+                job.job_id,
+                status="failed",
+                error=str(e),
+                finished_at=_now(),
+                **self._progress(job, pipeline, started)
+            )
+
+        else:
+            progress = self._progress(job, pipeline, started)
+            message = (
+                f"Ingested {pipeline.papers_fetched} papers with {pipeline.chunks_stored} new chunks "
+                f"({progress['chunks_skipped']} already stored)"
+            )
+            logger.info(f"Ingestion job {job.job_id} completed: {message}")
+            await self.store.update(
+                job.job_id,
+                status="completed",
+                message=message,
+                finished_at=_now(),
+                **{**progress, "eta_seconds": 0.0}
+            )
+
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+
+    async def _report_progress(self, job: IngestJob, pipeline: IngestionPipeline, started: float):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            await self.store.update(job.job_id, **self._progress(job, pipeline, started))
+
+    def _progress(self, job: IngestJob, pipeline: IngestionPipeline, started: float) -> dict:
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        target = job.request.max_papers
+
+        papers_per_sec = pipeline.papers_fetched / elapsed
+        # The feed can run out before max_papers, so this is an upper bound.
+        eta = (target - pipeline.papers_fetched) / papers_per_sec if papers_per_sec > 0 else None
+
+        return {
+            "papers_fetched": pipeline.papers_fetched,
+            "chunks_created": pipeline.chunks_created,
+            "chunks_embedded": pipeline.chunks_embedded,
+            "chunks_stored": pipeline.chunks_stored,
+            "chunks_skipped": pipeline.chunks_skipped + pipeline.writer.duplicates_skipped,
+            "rate_chunks_per_sec": round(pipeline.chunks_stored / elapsed, 2),
+            "eta_seconds": round(max(eta, 0.0), 1) if eta is not None else None
+        }
+
+    async def _mark_interrupted(self, job: IngestJob):
+        request = job.request.model_copy(update={"resume": True})
+        await self.store.update(job.job_id, status="queued", request=request.model_dump())
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+ingestion_jobs = IngestionJobManager()
@@ -0,0 +1,54 @@
+import asyncio
+import ollama
+from typing import Dict, Optional
+from app.core.config import configs
+from app.core.logging import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class OllamaClient:
+    def __init__(self):
+        self.client: Optional[ollama.AsyncClient] = None
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._limits_loop = None
+
+    async def connect(self):
+        logger.info(f"Connecting to Ollama at {configs.ollama_url}...")
+        self.client = ollama.AsyncClient(host=configs.ollama_url)
+        self._limits = {}
+        self._limits_loop = None
+
+    async def close(self):
+        if self.client:
+            await self.client._client.aclose()
+            self.client = None
+            logger.info("Ollama client closed")
+
+    def get_client(self) -> ollama.AsyncClient:
+        # Scripts and tests may run without the app lifespan.
+        if self.client is None:
+            self.client = ollama.AsyncClient(host=configs.ollama_url)
+        return self.client
+
+    def limit(self, model: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop is not self._limits_loop:
+            self._limits = {}
+            self._limits_loop = loop
+
+        if model not in self._limits:
+            self._limits[model] = asyncio.Semaphore(concurrency_for(model))
+        return self._limits[model]
+
+
+def concurrency_for(model: str) -> int:
+    if model in configs.model_concurrency:
+        return configs.model_concurrency[model]
+    if model == configs.llm_model:
+        return configs.llm_concurrency
+    return configs.embedding_concurrency
+
+
+ollama_client = OllamaClient()
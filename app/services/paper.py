@@ -1,95 +1,380 @@
 import httpx
 import xml.etree.ElementTree as ET
-from typing import List
+import random
+import time
+from collections import deque
+from typing import List, AsyncIterator, Tuple, Dict, NamedTuple, Optional
 from datetime import datetime
 import asyncio
 from app.models.schema import Paper
-from app.core.logging import logger
+from app.core.config import configs
+from app.core.logging import get_logger
+from app.core.metrics import timed
 
 
-async def  fetch_paper(max_results: int = 50) -> List[Paper]:
-    base_url = "https://export.arxiv.org/api/query"
-    query = "cat:q-bio.TO"
-    
+logger = get_logger(__name__)
+
+
+ARXIV_QUERY = "cat:q-bio.TO"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+MAX_CACHED_PAGES = 256
+
+
+class TokenBucket:
+    """Async token bucket shared by every request to the same host.
+
+    Tokens are reserved synchronously before sleeping, so concurrent callers
+    queue up behind each other without needing a lock tied to one event loop.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class FeedPage(NamedTuple):
+    papers: List[Paper]
+    # Raw <entry> elements, counting any that failed to parse.
+    entries: int
+    total_results: Optional[int] = None
+
+
+class _CachedPage:
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], page: FeedPage):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.page = page
+
+
+class ArxivHarvester:
+    """Pages through arXiv search results within the API's politeness budget.
+
+    Up to `concurrency` pages are requested ahead of the consumer, but every
+    request waits for a token from the shared bucket. Failed requests are
+    retried with jittered exponential backoff; a page that still fails is
+    reported as None instead of ending the harvest.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        page_size: int = None,
+        rate: float = None,
+        burst: int = None,
+        concurrency: int = None,
+        max_retries: int = None,
+        backoff_base: float = None,
+        backoff_max: float = None,
+        transport: httpx.AsyncBaseTransport = None
+    ):
+        self.base_url = base_url or configs.arxiv_url
+        self.page_size = page_size or configs.arxiv_page_size
+        self.bucket = TokenBucket(rate or configs.arxiv_rate_per_sec, burst or configs.arxiv_burst)
+        self.concurrency = concurrency or configs.arxiv_concurrency
+        self.max_retries = configs.arxiv_max_retries if max_retries is None else max_retries
+        self.backoff_base = configs.arxiv_backoff_base if backoff_base is None else backoff_base
+        self.backoff_max = configs.arxiv_backoff_max if backoff_max is None else backoff_max
+        self.transport = transport
+
+        self._pages: Dict[Tuple[str, int, int], _CachedPage] = {}
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(timeout=configs.arxiv_timeout, transport=self.transport)
+
+    async def iter_pages(
+        self,
+        query: str,
+        max_results: int,
+        start_offset: int = 0
+    ) -> AsyncIterator[Tuple[int, Optional[List[Paper]]]]:
+        end = start_offset + max_results
+        starts = list(range(start_offset, end, self.page_size))
+
+        logger.info(f"Fetching up to {max_results} papers for '{query}' starting at {start_offset}...")
+
+        async with self.client() as client:
+            pending = deque()
+            scheduled = 0
+            try:
+                while pending or scheduled < len(starts):
+                    while scheduled < len(starts) and len(pending) < self.concurrency:
+                        start = starts[scheduled]
+                        size = min(self.page_size, end - start)
+                        task = asyncio.create_task(self._fetch_page_or_none(client, query, start, size))
+                        pending.append((start, size, task))
+                        scheduled += 1
+
+                    start, size, task = pending.popleft()
+                    page = await task
+                    yield start + size, page.papers if page is not None else None
+
+                    # arXiv sometimes returns short pages mid-feed, and entries that fail to
+                    # parse are dropped, so only an empty page or totalResults ends the feed.
+                    if page is not None and (
+                        page.entries == 0
+                        or page.total_results is not None and start + page.entries >= page.total_results
+                    ):
+                        break
+            finally:
+                for _, _, task in pending:
+                    task.cancel()
+                await asyncio.gather(*(task for _, _, task in pending), return_exceptions=True)
+
+    async def harvest(
+        self,
+        queries: List[str],
+        max_results: int
+    ) -> AsyncIterator[Tuple[str, int, Optional[List[Paper]]]]:
+        """Harvests several queries concurrently, yielding pages as they arrive."""
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        done = object()
+
+        async def run(query: str):
+            try:
+                async for next_start, papers in self.iter_pages(query, max_results):
+                    await pages.put((query, next_start, papers))
+            finally:
+                await pages.put(done)
+
+        tasks = [asyncio.create_task(run(query)) for query in queries]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await pages.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def fetch_page(self, client: httpx.AsyncClient, query: str, start: int, size: int) -> FeedPage:
+        params = {
+            "search_query": query,
+            "start": start,
+            "max_results": size,
+            "sortBy": "lastUpdatedDate",
+            "sortOrder": "descending"
+        }
+        key = (query, start, size)
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                logger.info(f"Fetching '{query}' batch: {start} to {start + size}")
+                with timed("arxiv_fetch"):
+                    async with client.stream(
+                        "GET", self.base_url, params=params, headers=self._conditional_headers(key)
+                    ) as response:
+                        if response.status_code == 304 and key in self._pages:
+                            logger.info(f"'{query}' batch {start} unchanged since last fetch")
+                            return self._pages[key].page
+
+                        response.raise_for_status()
+
+                        # Entries are parsed while the body is still arriving.
+                        parser = AtomEntryParser()
+                        papers = []
+                        async for chunk in response.aiter_bytes():
+                            papers.extend(parser.feed(chunk))
+                        papers.extend(parser.close())
+                        page = FeedPage(papers, parser.entries, parser.total_results)
+
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = (
+                    isinstance(e, httpx.TransportError)
+                    or e.response.status_code in RETRY_STATUSES
+                )
+                if not retryable or attempt == self.max_retries:
+                    raise
+
+                delay = self._backoff(attempt, getattr(e, "response", None))
+                logger.warning(f"Fetching '{query}' batch {start} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if page.entries > len(papers):
+                logger.warning(f"Skipped {page.entries - len(papers)} unparseable entries in '{query}' batch {start}")
+            logger.info(f"Got {len(papers)} papers")
+            self._remember(key, response, page)
+            return page
+
+    async def _fetch_page_or_none(self, client, query, start, size) -> Optional[FeedPage]:
+        try:
+            return await self.fetch_page(client, query, start, size)
+        except Exception as e:
+            logger.error(f"Giving up on '{query}' batch {start}: {e}")
+            return None
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return float(response.headers["Retry-After"])
+        # Full jitter keeps retries from concurrent pages from arriving in lockstep.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _conditional_headers(self, key) -> Dict[str, str]:
+        cached = self._pages.get(key)
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def _remember(self, key, response: httpx.Response, page: FeedPage):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._pages.pop(key, None)
+            self._pages[key] = _CachedPage(etag, last_modified, page)
+            if len(self._pages) > MAX_CACHED_PAGES:
+                del self._pages[next(iter(self._pages))]
+
+
+arxiv_harvester = ArxivHarvester()
+
+
+async def fetch_paper(max_results: int = 50, queries: List[str] = None) -> List[Paper]:
     papers = []
-    batch_size = 50
-    
-    logger.info(f"Fetching up to {max_results} papers from arXiv...")
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        for start in range(0, max_results, batch_size):
-            current_batch = min(batch_size, max_results - start)
-            
-            params = {
-                "search_query": query,
-                "start": start,
-                "max_results": current_batch,
-                "sortBy": "submittedDate",
-                "sortOrder": "descending"
-            }
-            
-            try:
-                logger.info(f"Fetching batch: {start} to {start + current_batch}")
-                response = await client.get(base_url, params=params)
-                response.raise_for_status()
-                
-                batch_papers =  parse_response(response.text)
-                papers.extend(batch_papers)
-                
-                logger.info(f"Got {len(batch_papers)} papers")
-                
-                if start + batch_size < max_results:
-                    await asyncio.sleep(3)
-                    
-            except Exception as e:
-                logger.error(f"Error fetching batch: {e}")
-                break
+    async for _, _, batch_papers in arxiv_harvester.harvest(queries or configs.arxiv_queries, max_results):
+        papers.extend(batch_papers or [])
     
     logger.info(f"Total papers fetched: {len(papers)}")
     return papers
 
 
+def iter_paper_pages(
+    max_results: int = 50,
+    start_offset: int = 0,
+    query: str = ARXIV_QUERY
+) -> AsyncIterator[Tuple[int, Optional[List[Paper]]]]:
+    return arxiv_harvester.iter_pages(query, max_results, start_offset)
+
+
+ATOM_NS = {"atom": "http://www.w3.org/2005/Atom"}
+
+ENTRY_TAG = "{http://www.w3.org/2005/Atom}entry"
+
+TOTAL_RESULTS_TAG = "{http://a9.com/-/spec/opensearch/1.1/}totalResults"
+
+
+class AtomEntryParser:
+    """Incremental Atom parser that hands back each entry as soon as it closes.
+
+    Finished <entry> elements are cleared and detached from the feed root, so
+    memory stays bounded by one entry no matter how large the page is.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root = None
+        self.entries = 0
+        self.total_results: Optional[int] = None
+
+    def feed(self, data) -> List[Paper]:
+        self._parser.feed(data)
+        return self._read_entries()
+
+    def close(self) -> List[Paper]:
+        self._parser.close()
+        return self._read_entries()
+
+    def _read_entries(self) -> List[Paper]:
+        papers = []
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                continue
+            if element.tag == TOTAL_RESULTS_TAG and element.text and element.text.strip().isdigit():
+                self.total_results = int(element.text)
+            if element.tag != ENTRY_TAG:
+                continue
+
+            self.entries += 1
+            paper = parse_entry(element)
+            if paper is not None:
+                papers.append(paper)
+
+            element.clear()
+            if self._root is not None and element in self._root:
+                self._root.remove(element)
+        return papers
+
+
+async def iter_entries(chunks: AsyncIterator[bytes]) -> AsyncIterator[Paper]:
+    parser = AtomEntryParser()
+    async for chunk in chunks:
+        for paper in parser.feed(chunk):
+            yield paper
+    for paper in parser.close():
+        yield paper
+
+
 def  parse_response(xml_text: str) -> List[Paper]:
-    papers = []
-    ns = {"atom": "http://www.w3.org/2005/Atom"}
-    
-    root = ET.fromstring(xml_text)
-    
-    for entry in root.findall("atom:entry", ns):
-        try:
-            id_url = entry.find("atom:id", ns).text
-            arxiv_id = id_url.split("/")[-1]
-            
-            title = entry.find("atom:title", ns).text.strip()
-            title = " ".join(title.split())
-            
-            authors = [
-                author.find("atom:name", ns).text
-                for author in entry.findall("atom:author", ns)
-            ]
-            
-            published_str = entry.find("atom:published", ns).text
-            published = datetime.fromisoformat(published_str.replace("Z", "+00:00"))
-            
-            categories = [
-                cat.attrib["term"]
-                for cat in entry.findall("atom:category", ns)
-            ]
-            
-            abstract = entry.find("atom:summary", ns).text.strip()
-            abstract = " ".join(abstract.split())
-            
-            papers.append(Paper(
-                arxiv_id=arxiv_id,
-                title=title,
-                authors=authors,
-                published=published,
-                categories=categories,
-                abstract=abstract
-            ))
-            
-        except Exception as e:
-            logger.warning(f"Could not parse entry: {e}")
-            continue
-    
-    return papers
\ No newline at end of file
+    parser = AtomEntryParser()
+    papers = parser.feed(xml_text)
+    papers.extend(parser.close())
+    return papers
+
+
+def parse_entry(entry: ET.Element) -> Optional[Paper]:
+    ns = ATOM_NS
+    try:
+        id_url = entry.find("atom:id", ns).text
+        # Old-style IDs keep their archive: http://arxiv.org/abs/q-bio/0601001v1
+        arxiv_id = id_url.split("/abs/")[-1]
+        
+        title = entry.find("atom:title", ns).text.strip()
+        title = " ".join(title.split())
+        
+        authors = [
+            author.find("atom:name", ns).text
+            for author in entry.findall("atom:author", ns)
+        ]
+        
+        published_str = entry.find("atom:published", ns).text
+        published = datetime.fromisoformat(published_str.replace("Z", "+00:00"))
+        updated_element = entry.find("atom:updated", ns)
+        updated = (
+            datetime.fromisoformat(updated_element.text.replace("Z", "+00:00"))
+            if updated_element is not None and updated_element.text else None
+        )
+        
+        categories = [
+            cat.attrib["term"]
+            for cat in entry.findall("atom:category", ns)
+        ]
+        
+        abstract = entry.find("atom:summary", ns).text.strip()
+        abstract = " ".join(abstract.split())
+        
+        return Paper(
+            arxiv_id=arxiv_id,
+            title=title,
+            authors=authors,
+            published=published,
+            updated=updated,
+            categories=categories,
+            abstract=abstract
+        )
+        
+    except Exception as e:
+        logger.warning(f"Could not parse entry: {e}")
+        return None
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+from app.core.config import configs
+from app.core.logging import get_logger
+from app.db.embedding_spaces import embedding_spaces, new_space
+from app.db.vector_store import VectorStore
+from app.models.schema import EmbeddingSpace, ReindexRequest, ReindexStatus
+from app.services.answer_cache import answer_cache
+from app.services.embedding import generate_embeddings_batch, probe_embedding_dimensions
+
+
+logger = get_logger(__name__)
+
+
+class Reindexer:
+    """Re-embeds every stored chunk with another model, next to the current vectors.
+
+    chunk_text is read back from the store in batches, so no paper is fetched
+    again. Retrieval keeps searching the active space until the new one covers
+    every chunk; the switch is then a single atomic update, and the old
+    vectors stay in place.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        target: EmbeddingSpace,
+        batch_size: int = None,
+        switch: bool = True
+    ):
+        self.store = store
+        self.target = target
+        self.batch_size = batch_size or configs.reindex_batch_size
+        self.switch = switch
+
+        self.chunks_embedded = 0
+        self.chunks_total: Optional[int] = None
+
+    async def run(self) -> EmbeddingSpace:
+        if self.target.name == self.store.space.name:
+            raise ValueError(f"Embedding space {self.target.name} is already active")
+
+        if self.target.dimensions is None:
+            dimensions = await probe_embedding_dimensions(self.target.model, self.target.version)
+            if dimensions is None:
+                raise RuntimeError(f"Could not reach embedding model {self.target.model}")
+            self.target = self.target.model_copy(update={"dimensions": dimensions})
+
+        await self.store.begin_space(self.target)
+        # From here on, ingestion also embeds new chunks into the target.
+        embedding_spaces.target = self.target
+
+        embedded, self.chunks_total = await self.store.count_embeddings(self.target)
+        logger.info(
+            f"Re-embedding {self.chunks_total - embedded} of {self.chunks_total} chunks "
+            f"with {self.target.model} into {self.target.name}"
+        )
+        await self._fill()
+
+        if not self.switch:
+            return self.target
+
+        await self.store.switch_space(self.target)
+        embedding_spaces.active = self.target
+        embedding_spaces.target = None
+        # Cached answers were retrieved with the old model's query vectors.
+        answer_cache.invalidate()
+        logger.info(f"Retrieval switched to {self.target.name}")
+
+        # An ingestion batch embedded just before the job began can land after
+        # the last pass; pick those chunks up now.
+        await self._fill()
+        return self.target
+
+    async def _fill(self):
+        after = None
+        while True:
+            docs = await self.store.missing_embeddings(self.target, self.batch_size, after)
+            if not docs:
+                return
+
+            vectors = await generate_embeddings_batch(
+                [doc["chunk_text"] for doc in docs], model=self.target.model, version=self.target.version
+            )
+            await self.store.add_embeddings(self.target, docs, vectors)
+            self.chunks_embedded += len(docs)
+            after = docs[-1]["_id"]
+            logger.info(f"Re-embedded {self.chunks_embedded} chunks into {self.target.name}", extra={"event": "reembed_progress"})
+
+
+class ReindexManager:
+    """Runs one re-embed job at a time in the background of the API server."""
+
+    def __init__(self):
+        self.reindexer: Optional[Reindexer] = None
+        self._task: Optional[asyncio.Task] = None
+        self._status: Optional[ReindexStatus] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, request: ReindexRequest, store: VectorStore) -> ReindexStatus:
+        if self.running:
+            raise RuntimeError("A re-embed job is already running")
+
+        target = new_space(request.model, request.version)
+        self.reindexer = Reindexer(store, target, switch=request.switch)
+        self._status = ReindexStatus(
+            status="running",
+            active=store.space,
+            target=target,
+            started_at=datetime.now(timezone.utc)
+        )
+        self._task = asyncio.create_task(self._run())
+        return self.status()
+
+    def status(self) -> ReindexStatus:
+        if self._status is None:
+            return ReindexStatus(active=embedding_spaces.current(), target=embedding_spaces.target)
+
+        return self._status.model_copy(update={
+            "active": embedding_spaces.current(),
+            "target": self.reindexer.target,
+            "chunks_embedded": self.reindexer.chunks_embedded,
+            "chunks_total": self.reindexer.chunks_total
+        })
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        try:
+            await self.reindexer.run()
+            self._status.status = "completed"
+        except asyncio.CancelledError:
+            self._status.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Re-embed into {self.reindexer.target.name} failed: {e}")
+            self._status.status = "failed"
+            self._status.error = str(e)
+        finally:
+            self._status.finished_at = datetime.now(timezone.utc)
+
+
+reindex_jobs = ReindexManager()
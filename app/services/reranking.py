@@ -0,0 +1,125 @@
+from typing import List, Dict, Any, Optional
+import numpy as np
+from app.core.config import configs
+from app.utils.chunking import estimate_tokens
+
+
+def rerank(
+    candidates: List[Dict[str, Any]],
+    query_embedding: Optional[List[float]],
+    top_k: int,
+    max_tokens: int = None
+) -> List[Dict[str, Any]]:
+    """Picks up to top_k chunks for the prompt, then merges them per paper.
+
+    Candidates are ordered by maximal marginal relevance when embeddings are
+    available, chunks are taken in that order while they fit the token
+    budget, and the selection is collapsed to one context entry per paper.
+    """
+    if max_tokens is None:
+        max_tokens = configs.context_max_tokens
+
+    if configs.mmr_enabled and query_embedding is not None:
+        candidates = mmr_order(candidates, configs.mmr_lambda)
+
+    selected = []
+    used_tokens = 0
+    for doc in candidates:
+        if len(selected) >= top_k:
+            break
+        cost = estimate_tokens(doc["chunk_text"])
+        # A later, shorter chunk may still fit, so keep scanning.
+        if selected and used_tokens + cost > max_tokens:
+            continue
+        selected.append(doc)
+        used_tokens += cost
+
+    return collapse_by_paper(selected)
+
+
+def mmr_order(candidates: List[Dict[str, Any]], lambda_: float) -> List[Dict[str, Any]]:
+    """Orders candidates by maximal marginal relevance.
+
+    Relevance is the retrieval score rescaled to [0, 1] over the candidates,
+    so it weighs against cosine redundancy on the same scale whatever the
+    scorer (fused RRF scores sit in a narrow band). Redundancy is the highest
+    cosine similarity to an already picked chunk. Chunks without an embedding
+    (lexical only matches) take no part: they keep their rank and the other
+    positions are filled in MMR order.
+    """
+    embedded = [i for i, doc in enumerate(candidates) if doc.get("embedding") is not None]
+    n = len(embedded)
+    if n <= 1:
+        return list(candidates)
+
+    vectors = np.array([candidates[i]["embedding"] for i in embedded], dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = vectors @ vectors.T
+
+    scores = np.array([candidates[i].get("score", 0.0) for i in embedded], dtype=np.float32)
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones(n, dtype=np.float32)
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    remaining = np.ones(n, dtype=bool)
+    order = []
+
+    for _ in range(n):
+        penalty = np.maximum(redundancy, 0.0) if order else 0.0
+        mmr = lambda_ * relevance - (1 - lambda_) * penalty
+        mmr[~remaining] = -np.inf
+        best = int(np.argmax(mmr))
+        order.append(embedded[best])
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+
+    picks = iter(order)
+    return [candidates[next(picks)] if doc.get("embedding") is not None else doc for doc in candidates]
+
+
+def collapse_by_paper(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One entry per paper, in the order papers first appear in docs.
+
+    docs arrive in MMR order, so papers keep that order rather than being resorted
+    by score. Each entry takes its fields and score from the paper's best chunk;
+    adjacent chunk_index runs are merged with their overlap removed and separate
+    runs from the same paper are joined with an ellipsis.
+    """
+    papers: Dict[str, List[Dict[str, Any]]] = {}
+    for doc in docs:
+        papers.setdefault(doc["arxiv_id"], []).append(doc)
+
+    results = []
+    for chunks in papers.values():
+        best = max(chunks, key=lambda doc: doc.get("score", 0.0))
+        merged = {key: value for key, value in best.items() if key != "embedding"}
+        merged.setdefault("score", 0.0)
+
+        if len(chunks) > 1:
+            chunks = sorted(chunks, key=lambda doc: doc.get("chunk_index") or 0)
+            spans = []
+            for doc in chunks:
+                index = doc.get("chunk_index") or 0
+                if spans and spans[-1][1] + 1 == index:
+                    spans[-1][1] = index
+                    spans[-1][2] = merge_overlap(spans[-1][2], doc["chunk_text"])
+                else:
+                    spans.append([index, index, doc["chunk_text"]])
+
+            merged["chunk_text"] = " … ".join(text for _, _, text in spans)
+            merged["chunk_index"] = spans[0][0]
+            merged["chunk_spans"] = [(start, end) for start, end, _ in spans]
+            merged["chunk_ids"] = [str(doc["_id"]) for doc in chunks if "_id" in doc]
+
+        results.append(merged)
+
+    return results
+
+
+def merge_overlap(left: str, right: str, min_overlap: int = 8) -> str:
+    """Joins consecutive chunks, dropping the text chunk_text repeats between them."""
+    # Chunks share whole sentences of up to chunk_overlap_tokens (about four characters each).
+    longest = min(len(left), len(right), configs.chunk_overlap_tokens * 4 * 2)
+    for size in range(longest, min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return f"{left} {right}"
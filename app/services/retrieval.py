@@ -1,49 +1,138 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.core.config import configs
-from app.core.logging import logger
+from app.core.logging import get_logger
+from app.core.metrics import timed
+from app.db.lexical_index import lexical_index, fusion_key
+from app.db.vector_store import VectorStore
+from app.models.schema import QueryRequest
 from app.services.embedding import generate_embedding
+from app.services.reranking import rerank
 
 
-async def search_papers(query: str, collection, top_k: int = None) -> List[Dict[str, Any]]:
+logger = get_logger(__name__)
+
+
+async def search_papers(
+    query: str,
+    store: VectorStore,
+    top_k: int = None,
+    query_embedding: List[float] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    num_candidates: int = None,
+    embed_if_missing: bool = True
+) -> List[Dict[str, Any]]:
     if top_k is None:
         top_k = configs.top_k
     
     logger.info(f"Searching for: '{query[:50]}...'")
     
-    query_embedding = generate_embedding(query)
-    logger.info(f"Generated query embedding (dim={len(query_embedding)})")
-    
-    pipeline = [
-        {
-            "$vectorSearch": {
-                "index": "vector_index",  
-                "path": "embedding",
-                "queryVector": query_embedding,
-                "numCandidates": top_k * 10,  
-                "limit": top_k
-            }
-        },
-        {
-            "$project": {
-                "arxiv_id": 1,
-                "title": 1,
-                "authors": 1,
-                "chunk_text": 1,
-                "chunk_index": 1,
-                "score": {"$meta": "vectorSearchScore"}
-            }
-        }
-    ]
+    hybrid = configs.hybrid_search_enabled and len(lexical_index) > 0
+    # Re-ranking needs spare candidates to trade relevance for diversity.
+    depth = top_k * max(
+        configs.hybrid_depth_factor if hybrid else 1,
+        configs.mmr_depth_factor if configs.mmr_enabled else 1
+    )
+    if num_candidates is None:
+        num_candidates = depth * configs.num_candidates_factor
+    
+    lexical = []
+    if hybrid:
+        with timed("lexical_search"):
+            lexical = lexical_index.search(query, depth, filters)
     
     try:
-        results = []
-        async for doc in collection.aggregate(pipeline):
-            if doc.get("score", 0) >= configs.min_score:
-                results.append(doc)
+        if query_embedding is None and embed_if_missing:
+            query_embedding = await generate_embedding(query, model=store.space.model, version=store.space.version)
+        if query_embedding is None:
+            raise RuntimeError("Query embedding unavailable")
+        logger.info(f"Generated query embedding (dim={len(query_embedding)})")
         
-        logger.info(f"Found {len(results)} relevant chunks")
-        return results
+        with timed("vector_search"):
+            docs = await store.search(
+                query_embedding, depth, num_candidates, filters, include_embeddings=configs.mmr_enabled
+            )
+        dense = [doc for doc in docs if doc.get("score", 0) >= configs.min_score]
     
     except Exception as e:
-        logger.error(f"Vector search failed: {e}")
-        raise
\ No newline at end of file
+        if not lexical:
+            logger.error(f"Vector search failed: {e}")
+            raise
+        # Degraded mode: exact-term matches still give the LLM something to cite.
+        logger.warning(f"Vector search failed ({e}), using {len(lexical)} lexical matches")
+        dense = []
+    
+    if lexical:
+        # Generic words ("study", "patients") match chunks of any topic; without a
+        # rare shared term a BM25-only hit would keep off-topic queries from
+        # ever coming back empty.
+        max_df = max(configs.lexical_min_df, int(configs.lexical_max_df * lexical_index.paper_count()))
+        confirmed = {fusion_key(doc) for doc in dense}
+        matched = len(lexical)
+        lexical = [doc for doc in lexical if doc["lexical_df"] <= max_df or fusion_key(doc) in confirmed]
+        if len(lexical) < matched:
+            logger.info(f"Dropped {matched - len(lexical)} lexical matches without a rare query term")
+    
+    if not lexical:
+        candidates = dense
+    else:
+        candidates = reciprocal_rank_fusion([dense, lexical], depth)
+        logger.info(f"Fused {len(dense)} vector and {len(lexical)} lexical candidates")
+    
+    with timed("rerank"):
+        results = rerank(candidates, query_embedding, top_k)
+    
+    logger.info(f"Found {len(results)} relevant chunks from {len(candidates)} candidates")
+    return results
+
+
+def build_search_filter(request: QueryRequest) -> Optional[Dict[str, Any]]:
+    """The $vectorSearch pre-filter for a query; every field is in VECTOR_INDEX_DEFINITION."""
+    clauses = []
+    if request.categories:
+        clauses.append({"categories": {"$in": request.categories}})
+    if request.arxiv_ids:
+        clauses.append({"arxiv_id": {"$in": request.arxiv_ids}})
+    
+    published = {}
+    if request.published_from:
+        published["$gte"] = request.published_from
+    if request.published_to:
+        published["$lte"] = request.published_to
+    if published:
+        clauses.append({"published": published})
+    
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict[str, Any]]], top_k: int, k: int = None) -> List[Dict[str, Any]]:
+    """Merges ranked lists by summing 1 / (k + rank) per chunk.
+
+    The fused score is normalized so a chunk ranked first in every list scores
+    1.0; the original vector similarity is kept as vector_score.
+    """
+    k = k or configs.rrf_k
+    fused: Dict[Any, Dict[str, Any]] = {}
+    scores: Dict[Any, float] = {}
+    
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = fusion_key(doc)
+            if key not in fused:
+                fused[key] = dict(doc)
+                if "score" in doc:
+                    fused[key]["vector_score"] = doc["score"]
+            else:
+                fused[key].update({field: value for field, value in doc.items() if field not in fused[key]})
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    
+    best_possible = len(rankings) / (k + 1)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    
+    results = []
+    for key in ranked:
+        doc = fused[key]
+        doc["score"] = round(scores[key] / best_possible, 4)
+        results.append(doc)
+    return results
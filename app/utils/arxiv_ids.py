@@ -0,0 +1,19 @@
+import re
+from typing import Optional, Tuple
+
+
+_VERSIONED = re.compile(r"^(.+?)v(\d+)$")
+_PREFIX = re.compile(r"^(?:https?://arxiv\.org/(?:abs|pdf)/|arxiv:)", re.IGNORECASE)
+
+
+def split_arxiv_id(arxiv_id: str) -> Tuple[str, Optional[int]]:
+    """("1002.1184", 2) for "1002.1184v2"; the version is None when the ID carries none."""
+    arxiv_id = _PREFIX.sub("", arxiv_id.strip())
+    match = _VERSIONED.match(arxiv_id)
+    if match is None:
+        return arxiv_id, None
+    return match.group(1), int(match.group(2))
+
+
+def base_arxiv_id(arxiv_id: str) -> str:
+    return split_arxiv_id(arxiv_id)[0]
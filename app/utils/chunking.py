@@ -1,22 +1,129 @@
-from typing import List
+import re
+from typing import List, Tuple
+import numpy as np
 
 
-def chunk_text(text: str, chunk_size: int = 512, overlap: int = 50) -> List[str]:
-    if len(text) <= chunk_size:
-        return [text]
-    
+# Words that end in a period without ending the sentence.
+ABBREVIATIONS = frozenset({
+    "e.g", "i.e", "cf", "vs", "viz", "approx", "ca", "resp", "fig", "figs", "eq", "eqs",
+    "ref", "refs", "vol", "sp", "spp", "var", "dr", "prof", "al", "etc"
+})
+# These also close sentences ("... by Smith et al. The model ..."), so they
+# only end one when the next word is capitalized.
+_AMBIGUOUS = frozenset({"al", "etc"})
+
+_CANDIDATE = re.compile(r"[.!?]+[\"')\]”’]*(\s+)")
+_WORD_WINDOW = 16
+
+Span = Tuple[int, int]
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English prose with most tokenizers.
+    return max(1, (len(text) + 3) // 4)
+
+
+def sentence_spans(text: str) -> List[Span]:
+    """(start, end) of each sentence, found in one regex pass over the text.
+
+    A candidate boundary is terminal punctuation followed by whitespace; it
+    is dropped after abbreviations such as "e.g." or "Fig." and single-letter
+    initials, and after "et al." unless the next word is capitalized.
+    """
+    spans = []
+    start = _skip_space(text, 0)
+    for match in _CANDIDATE.finditer(text):
+        end, next_start = match.start(1), match.end(1)
+        if next_start >= len(text):
+            break
+        if not _ends_sentence(text, match.start(), next_start):
+            continue
+        if end > start:
+            spans.append((start, end))
+        start = next_start
+
+    end = len(text.rstrip())
+    if end > start:
+        spans.append((start, end))
+    return spans
+
+
+def split_sentences(text: str) -> List[str]:
+    return [text[start:end] for start, end in sentence_spans(text)]
+
+
+def chunk_text(text: str, max_tokens: int = 128, overlap_tokens: int = 16) -> List[str]:
+    """Splits text into chunks of at most max_tokens, cut at sentence boundaries.
+
+    Consecutive chunks share up to overlap_tokens of whole trailing sentences.
+    Sentences longer than a chunk are cut at word boundaries. Every chunk ends
+    further into the text than the one before, so the loop runs at most once
+    per sentence and never repeats a tail.
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens - 1))
+
+    units = _units(text, sentence_spans(text), max_tokens * 4)
+    if not units:
+        return []
+
+    starts = np.fromiter((start for start, _ in units), dtype=np.int64, count=len(units))
+    ends = np.fromiter((end for _, end in units), dtype=np.int64, count=len(units))
+    # A unit's length runs to the next unit, so summed costs bound the joined chunk.
+    lengths = np.append(starts[1:], ends[-1]) - starts
+    costs = np.maximum(1, (lengths + 3) // 4)
+    prefix = np.concatenate(([0], np.cumsum(costs)))
+
     chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = start + chunk_size
-        
-        if end < len(text):
-            last_period = text.rfind('. ', start, end)
-            if last_period != -1 and last_period > start:
-                end = last_period + 1
-        
-        chunks.append(text[start:end].strip())
-        start = end - overlap
-    
-    return chunks
\ No newline at end of file
+    n = len(units)
+    first = 0
+    while True:
+        last = int(np.searchsorted(prefix, prefix[first] + max_tokens, side="right")) - 1
+        last = max(last, first + 1)
+        chunks.append(text[starts[first]:ends[last - 1]].strip())
+        if last >= n:
+            return chunks
+
+        # Overlap: the trailing units that fit in overlap_tokens and still leave room for the next unit.
+        floor = max(prefix[last] - overlap_tokens, prefix[last + 1] - max_tokens)
+        first = min(max(int(np.searchsorted(prefix, floor, side="left")), first + 1), last)
+
+
+def _ends_sentence(text: str, punctuation: int, next_start: int) -> bool:
+    if text[punctuation] != ".":
+        return True
+
+    window = text[max(0, punctuation - _WORD_WINDOW):punctuation]
+    words = window.split()
+    if not words or (punctuation > _WORD_WINDOW and len(words) == 1 and not window[0].isspace()):
+        # A run of non-space longer than any abbreviation.
+        return True
+
+    word = words[-1].lstrip("([\"'").lower()
+    if len(word) == 1 and word.isalpha():
+        return False
+    if word in _AMBIGUOUS:
+        return text[next_start].isupper()
+    return word not in ABBREVIATIONS
+
+
+def _units(text: str, spans: List[Span], max_chars: int) -> List[Span]:
+    """Sentences, with any longer than max_chars cut at the last space that fits."""
+    units = []
+    for start, end in spans:
+        while end - start > max_chars:
+            cut = text.rfind(" ", start + 1, start + max_chars)
+            if cut == -1:
+                cut = start + max_chars
+            units.append((start, cut))
+            start = _skip_space(text, cut)
+        if end > start:
+            units.append((start, end))
+    return units
+
+
+def _skip_space(text: str, position: int) -> int:
+    while position < len(text) and text[position].isspace():
+        position += 1
+    return position
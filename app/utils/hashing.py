@@ -0,0 +1,11 @@
+import hashlib
+
+
+def content_hash(text: str) -> str:
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def embedding_key(model: str, text: str) -> str:
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{model}\x00{normalized}".encode("utf-8")).hexdigest()
@@ -0,0 +1,131 @@
+"""Chunking benchmark: throughput and chunk sizes on abstracts and full-text-sized documents.
+
+    python -m benchmarks.chunking --full-text-kb 50 --repeat 5 --output chunking.json
+
+Abstracts come from an arXiv Atom feed (sample_xml.xml by default); full-text
+documents are built by concatenating those abstracts up to --full-text-kb.
+Both are cleaned first, as at ingest time, and chunked with the configured
+token limits.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any
+import numpy as np
+from app.core.config import configs
+from app.services.paper import parse_response
+from app.utils.chunking import chunk_text, estimate_tokens
+from app.utils.text_cleaning import clean_text
+from benchmarks.retrieval import DEFAULT_FEED, _git_commit, progress_logger
+
+logger = progress_logger(__name__)
+
+
+def load_abstracts(feed_path: Path) -> List[str]:
+    papers = parse_response(feed_path.read_text(encoding="utf-8"))
+    if not papers:
+        raise ValueError(f"No papers found in {feed_path}")
+    return [clean_text(paper.abstract) for paper in papers]
+
+
+def build_full_texts(abstracts: List[str], size_kb: int, count: int) -> List[str]:
+    """Documents of about size_kb, each starting at a different abstract."""
+    target = size_kb * 1024
+    documents = []
+    for offset in range(count):
+        parts = []
+        length = 0
+        i = offset
+        while length < target:
+            parts.append(abstracts[i % len(abstracts)])
+            length += len(parts[-1]) + 1
+            i += 1
+        documents.append(" ".join(parts))
+    return documents
+
+
+def measure(texts: List[str], max_tokens: int, overlap_tokens: int, repeat: int) -> Dict[str, Any]:
+    total_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = [chunk for text in texts for chunk in chunk_text(text, max_tokens, overlap_tokens)]
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    tokens = np.array([estimate_tokens(chunk) for chunk in chunks])
+    return {
+        "documents": len(texts),
+        "megabytes": round(total_bytes / 1e6, 4),
+        "chunks": len(chunks),
+        "seconds": round(best, 6),
+        "mb_per_sec": round(total_bytes / 1e6 / best, 2) if best > 0 else None,
+        "chunks_per_sec": round(len(chunks) / best, 1) if best > 0 else None,
+        "tokens_per_chunk": {
+            "mean": round(float(tokens.mean()), 1) if len(tokens) else 0.0,
+            "max": int(tokens.max()) if len(tokens) else 0
+        }
+    }
+
+
+def run_benchmark(
+    feed_path: Path = DEFAULT_FEED,
+    full_text_kb: int = 50,
+    full_texts: int = 20,
+    repeat: int = 5,
+    max_tokens: int = None,
+    overlap_tokens: int = None
+) -> Dict[str, Any]:
+    max_tokens = min(max_tokens or configs.chunk_max_tokens, configs.embedding_max_tokens)
+    overlap_tokens = configs.chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+
+    abstracts = load_abstracts(feed_path)
+    documents = build_full_texts(abstracts, full_text_kb, full_texts)
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "config": {
+            "feed": str(feed_path),
+            "max_tokens": max_tokens,
+            "overlap_tokens": overlap_tokens,
+            "full_text_kb": full_text_kb,
+            "repeat": repeat
+        },
+        "abstracts": measure(abstracts, max_tokens, overlap_tokens, repeat),
+        "full_text": measure(documents, max_tokens, overlap_tokens, repeat)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feed", type=Path, default=DEFAULT_FEED)
+    parser.add_argument("--full-text-kb", type=int, default=50)
+    parser.add_argument("--full-texts", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5, help="the fastest run is reported")
+    parser.add_argument("--max-tokens", type=int, default=None)
+    parser.add_argument("--overlap-tokens", type=int, default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        feed_path=args.feed,
+        full_text_kb=args.full_text_kb,
+        full_texts=args.full_texts,
+        repeat=args.repeat,
+        max_tokens=args.max_tokens,
+        overlap_tokens=args.overlap_tokens
+    )
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        args.output.write_text(output + "\n")
+        logger.info(f"Report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
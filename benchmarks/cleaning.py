@@ -0,0 +1,126 @@
+"""Cleaning benchmark: throughput per cleaning profile on abstracts and full-text-sized documents.
+
+    python -m benchmarks.cleaning --full-text-kb 50 --repeat 5 --output cleaning.json
+
+Abstracts come from an arXiv Atom feed (sample_xml.xml by default) and are
+cleaned raw, as at ingest time; full-text documents are built from them as
+in the chunking benchmark. The regex chain clean_text used before cleaning
+profiles is measured alongside as a baseline.
+"""
+import argparse
+import json
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List, Dict, Any
+from app.services.paper import parse_response
+from app.utils.text_cleaning import PROFILES, clean_texts
+from benchmarks.chunking import build_full_texts
+from benchmarks.retrieval import DEFAULT_FEED, _git_commit, progress_logger
+
+logger = progress_logger(__name__)
+
+
+def legacy_clean_text(text: str) -> str:
+    """clean_text before cleaning profiles: seven re.sub passes compiled on every call."""
+    text = re.sub(r'\(According to\s+arXiv:[^)]+\)', '', text, flags=re.IGNORECASE)
+    for pattern in (
+        r'^Based on available research literature,\s*',
+        r'^In summary,\s*',
+        r'^Furthermore,\s*',
+        r'^For instance,\s*',
+    ):
+        text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.MULTILINE)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s.,!?()-]', '', text)
+    return text.strip()
+
+
+def load_raw_abstracts(feed_path: Path) -> List[str]:
+    papers = parse_response(feed_path.read_text(encoding="utf-8"))
+    if not papers:
+        raise ValueError(f"No papers found in {feed_path}")
+    return [paper.abstract for paper in papers]
+
+
+def measure(clean: Callable[[List[str]], List[str]], texts: List[str], repeat: int) -> Dict[str, Any]:
+    total_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cleaned = clean(texts)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    return {
+        "documents": len(texts),
+        "megabytes": round(total_bytes / 1e6, 4),
+        "seconds": round(best, 6),
+        "mb_per_sec": round(total_bytes / 1e6 / best, 2) if best > 0 else None,
+        "output_ratio": round(sum(len(text) for text in cleaned) / max(1, sum(len(text) for text in texts)), 4)
+    }
+
+
+def run_benchmark(
+    feed_path: Path = DEFAULT_FEED,
+    full_text_kb: int = 50,
+    full_texts: int = 20,
+    copies: int = 20,
+    repeat: int = 5
+) -> Dict[str, Any]:
+    # The sample feed is small; copies make the abstract run long enough to time.
+    abstracts = load_raw_abstracts(feed_path) * copies
+    corpora = {
+        "abstracts": abstracts,
+        "full_text": build_full_texts(abstracts, full_text_kb, full_texts)
+    }
+
+    cleaners = {name: (lambda texts, profile=profile: clean_texts(texts, profile)) for name, profile in PROFILES.items()}
+    cleaners["legacy"] = lambda texts: [legacy_clean_text(text) for text in texts]
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "config": {
+            "feed": str(feed_path),
+            "full_text_kb": full_text_kb,
+            "copies": copies,
+            "repeat": repeat,
+            "profiles": {name: list(profile.steps) for name, profile in PROFILES.items()}
+        },
+        **{
+            corpus: {name: measure(clean, texts, repeat) for name, clean in cleaners.items()}
+            for corpus, texts in corpora.items()
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feed", type=Path, default=DEFAULT_FEED)
+    parser.add_argument("--full-text-kb", type=int, default=50)
+    parser.add_argument("--full-texts", type=int, default=20)
+    parser.add_argument("--copies", type=int, default=20, help="times the feed's abstracts are repeated")
+    parser.add_argument("--repeat", type=int, default=5, help="the fastest run is reported")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        feed_path=args.feed,
+        full_text_kb=args.full_text_kb,
+        full_texts=args.full_texts,
+        copies=args.copies,
+        repeat=args.repeat
+    )
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        args.output.write_text(output + "\n")
+        logger.info(f"Report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Offline retrieval benchmark: recall@k against exact search and search latency.
+
+    python -m benchmarks.retrieval --sizes 1000,10000 --factors 1,10,50,100 --output report.json
+
+Builds a synthetic corpus from an arXiv Atom feed (sample_xml.xml by default),
+embeds it with a deterministic stub embedder (or Ollama with --embedder ollama),
+loads it into the local vector backend and times search_papers for every
+corpus size and numCandidates setting, with the IVF index and with
+binary-quantized vectors.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any
+import numpy as np
+from app.core.config import configs
+from app.core.logging import ROOT_LOGGER
+from app.db.local_vector_store import LocalVectorStore
+from app.services.paper import parse_response
+from app.services.retrieval import search_papers
+from app.utils.hashing import content_hash
+from app.utils.text_cleaning import clean_text
+
+
+DEFAULT_FEED = Path(__file__).resolve().parent.parent / "sample_xml.xml"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def progress_logger(name: str) -> logging.Logger:
+    """Benchmark progress goes to stderr so it never mixes with a report on stdout."""
+    progress = logging.getLogger(name)
+    if not progress.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        progress.addHandler(handler)
+        progress.setLevel(logging.INFO)
+        progress.propagate = False
+    return progress
+
+
+logger = progress_logger(__name__)
+
+
+class StubEmbedder:
+    """Hashed bag-of-words embeddings: texts sharing words land close together."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self._vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.sha256(token.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).normal(size=self.dim).astype(np.float32)
+            self._vectors[token] = vector
+        return vector
+
+    def embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN.findall(text.lower()):
+            vector += self._token_vector(token)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed(text) for text in texts]
+
+
+class OllamaEmbedder:
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        from app.services.embedding import generate_embeddings_batch
+        return await generate_embeddings_batch(texts)
+
+
+def build_corpus(feed_path: Path, size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    papers = parse_response(feed_path.read_text(encoding="utf-8"))
+    if not papers:
+        raise ValueError(f"No papers found in {feed_path}")
+
+    sentences = [
+        sentence.strip()
+        for paper in papers
+        for sentence in re.split(r"(?<=[.!?])\s+", clean_text(paper.abstract))
+        if len(sentence.split()) >= 5
+    ]
+
+    rng = np.random.default_rng(seed)
+    docs = []
+    for i in range(size):
+        paper = papers[i % len(papers)]
+        picked = rng.choice(len(sentences), size=int(rng.integers(3, 7)), replace=False)
+        text = " ".join(sentences[j] for j in picked)
+        docs.append({
+            "arxiv_id": f"synthetic.{i:06d}",
+            "version": 1,
+            "title": paper.title,
+            "authors": paper.authors,
+            "published": paper.published,
+            "categories": paper.categories,
+            "chunk_text": text,
+            "chunk_index": 0,
+            "content_hash": content_hash(text)
+        })
+    return docs
+
+
+def build_queries(docs: List[Dict[str, Any]], count: int, seed: int = 0) -> List[str]:
+    """Queries are word-dropped excerpts of corpus chunks, so each has a clear best match."""
+    rng = np.random.default_rng(seed + 1)
+    queries = []
+    for i in rng.choice(len(docs), size=min(count, len(docs)), replace=False):
+        words = docs[i]["chunk_text"].split()
+        keep = rng.random(len(words)) > 0.3
+        queries.append(" ".join(word for word, kept in zip(words, keep) if kept))
+    return queries
+
+
+def percentiles(samples: List[float], suffix: str = "") -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        f"p50{suffix}": round(float(p50), 4),
+        f"p95{suffix}": round(float(p95), 4),
+        f"p99{suffix}": round(float(p99), 4),
+        f"mean{suffix}": round(float(np.mean(samples)), 4)
+    }
+
+
+async def measure(
+    store: LocalVectorStore,
+    queries: List[str],
+    query_vectors: List[List[float]],
+    exact_ids: List[List[str]],
+    top_k: int,
+    num_candidates: int
+) -> Dict[str, Any]:
+    latencies = []
+    recalls = []
+    kept = []
+
+    for query, vector, expected in zip(queries, query_vectors, exact_ids):
+        start = time.perf_counter()
+        results = await search_papers(
+            query, store, top_k=top_k, query_embedding=vector, num_candidates=num_candidates
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        kept.append(len(results))
+
+        # Recall is measured before min_score so it reflects the index, not the threshold.
+        found = {doc["_id"] for doc in store.search_sync(vector, top_k, num_candidates)}
+        recalls.append(len(found & set(expected)) / len(expected) if expected else 1.0)
+
+    return {
+        "num_candidates": num_candidates,
+        f"recall@{top_k}": round(float(np.mean(recalls)), 4),
+        "mean_results_after_min_score": round(float(np.mean(kept)), 2),
+        "latency": percentiles(latencies, "_ms")
+    }
+
+
+async def run_benchmark(
+    feed_path: Path = DEFAULT_FEED,
+    sizes: List[int] = (1000, 10000),
+    factors: List[int] = (1, 10, 50, 100),
+    top_k: int = None,
+    num_queries: int = 100,
+    embedder=None,
+    ivf_nlist: int = 0,
+    seed: int = 0
+) -> Dict[str, Any]:
+    top_k = top_k or configs.top_k
+    embedder = embedder or StubEmbedder()
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "config": {
+            "feed": str(feed_path),
+            "top_k": top_k,
+            "min_score": configs.min_score,
+            "num_queries": num_queries,
+            "embedder": type(embedder).__name__,
+            "ivf_nlist": ivf_nlist,
+            "seed": seed
+        },
+        "runs": []
+    }
+
+    for size in sizes:
+        logger.info(f"Benchmarking corpus of {size} chunks")
+        docs = build_corpus(feed_path, size, seed)
+        embeddings = await embedder.embed_many([doc["chunk_text"] for doc in docs])
+        for doc, embedding in zip(docs, embeddings):
+            doc["embedding"] = embedding
+
+        queries = build_queries(docs, num_queries, seed)
+        query_vectors = await embedder.embed_many(queries)
+
+        exact = LocalVectorStore(ivf_min_vectors=0)
+        approximate = LocalVectorStore(ivf_min_vectors=1, ivf_nlist=ivf_nlist)
+        binary = LocalVectorStore(ivf_min_vectors=0, quantization="binary")
+        exact.insert_sync(docs)
+        approximate.insert_sync(docs)
+        binary.insert_sync(docs)
+
+        build_start = time.perf_counter()
+        approximate.build_index()
+        build_ms = (time.perf_counter() - build_start) * 1000
+
+        exact_results = [exact.search_sync(vector, top_k, top_k) for vector in query_vectors]
+        exact_ids = [[doc["_id"] for doc in results] for results in exact_results]
+        top_scores = [results[0]["score"] for results in exact_results if results]
+
+        run = {
+            "corpus_size": size,
+            "ivf_lists": approximate._ivf.centroids.shape[0],
+            "ivf_build_ms": round(build_ms, 3),
+            "top1_score": percentiles(top_scores) if top_scores else None,
+            "exact": await measure(exact, queries, query_vectors, exact_ids, top_k, top_k),
+            "ivf": [],
+            # Hamming search over sign bits, rescoring numCandidates rows exactly.
+            "binary": [],
+            "binary_code_bytes": int(binary._codes.nbytes),
+            "float32_bytes": int(exact._matrix.nbytes)
+        }
+        for factor in factors:
+            run["ivf"].append(
+                await measure(approximate, queries, query_vectors, exact_ids, top_k, top_k * factor)
+            )
+            run["binary"].append(
+                await measure(binary, queries, query_vectors, exact_ids, top_k, top_k * factor)
+            )
+        report["runs"].append(run)
+
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feed", type=Path, default=DEFAULT_FEED)
+    parser.add_argument("--sizes", default="1000,10000")
+    parser.add_argument("--factors", default="1,10,50,100", help="numCandidates = top_k * factor")
+    parser.add_argument("--top-k", type=int, default=None)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--embedder", choices=["stub", "ollama"], default="stub")
+    parser.add_argument("--dim", type=int, default=256, help="stub embedder dimension")
+    parser.add_argument("--ivf-nlist", type=int, default=0, help="0 picks sqrt(corpus size)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    # search_papers logs every query at INFO to stdout, which would drown the report.
+    logging.getLogger(ROOT_LOGGER).setLevel(logging.WARNING)
+
+    embedder = StubEmbedder(args.dim) if args.embedder == "stub" else OllamaEmbedder()
+    report = asyncio.run(run_benchmark(
+        feed_path=args.feed,
+        sizes=[int(size) for size in args.sizes.split(",")],
+        factors=[int(factor) for factor in args.factors.split(",")],
+        top_k=args.top_k,
+        num_queries=args.queries,
+        embedder=embedder,
+        ivf_nlist=args.ivf_nlist,
+        seed=args.seed
+    ))
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        args.output.write_text(output + "\n")
+        logger.info(f"Report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
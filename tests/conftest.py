@@ -6,6 +6,37 @@ import sys
 ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
+
+@pytest.fixture(autouse=True)
+def isolated_embedding_cache(monkeypatch):
+    from app.services.embedding_cache import EmbeddingCache
+    
+    cache = EmbeddingCache(path=None, max_entries=100)
+    monkeypatch.setattr("app.services.embedding.embedding_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_answer_cache(monkeypatch):
+    from app.services.answer_cache import AnswerCache
+    
+    cache = AnswerCache(max_entries=16, ttl_seconds=60, max_distance=0.05)
+    monkeypatch.setattr("app.api.routes.query.answer_cache", cache)
+    monkeypatch.setattr("app.services.ingestion.answer_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_lexical_index(monkeypatch):
+    from app.db.lexical_index import BM25Index
+    
+    index = BM25Index()
+    monkeypatch.setattr("app.db.vector_store.lexical_index", index)
+    monkeypatch.setattr("app.db.local_vector_store.lexical_index", index)
+    monkeypatch.setattr("app.services.retrieval.lexical_index", index)
+    return index
+
+
 @pytest.fixture
 def sample_paper_data():
     return {
@@ -0,0 +1,62 @@
+import time
+from app.models.schema import QueryResponse, Reference
+from app.services.answer_cache import AnswerCache
+
+
+def make_response(answer="Based on available research literature, autophagy..."):
+    return QueryResponse(
+        answer=answer,
+        references=[Reference(arxiv_id="2301.12345", title="Paper 1", score=0.9)]
+    )
+
+
+class TestAnswerCache:
+    
+    def test_hits_for_near_identical_query(self):
+        cache = AnswerCache(max_distance=0.05)
+        cache.store([1.0, 0.0, 0.0], ["a", "b"], make_response())
+        
+        cached = cache.lookup([0.99, 0.05, 0.0], ["b", "a"])
+        
+        assert cached is not None
+        assert cached.references[0].arxiv_id == "2301.12345"
+        assert cache.stats()["hits"] == 1
+    
+    def test_misses_for_distant_query(self):
+        cache = AnswerCache(max_distance=0.05)
+        cache.store([1.0, 0.0, 0.0], ["a"], make_response())
+        
+        assert cache.lookup([0.0, 1.0, 0.0], ["a"]) is None
+        assert cache.stats()["misses"] == 1
+    
+    def test_misses_when_retrieved_set_changes(self):
+        cache = AnswerCache()
+        cache.store([1.0, 0.0], ["a", "b"], make_response())
+        
+        assert cache.lookup([1.0, 0.0], ["a", "c"]) is None
+    
+    def test_expires_after_ttl(self):
+        cache = AnswerCache(ttl_seconds=0.01)
+        cache.store([1.0, 0.0], ["a"], make_response())
+        time.sleep(0.02)
+        
+        assert cache.lookup([1.0, 0.0], ["a"]) is None
+        assert cache.stats()["entries"] == 0
+    
+    def test_evicts_least_recently_used(self):
+        cache = AnswerCache(max_entries=2)
+        cache.store([1.0, 0.0], ["a"], make_response("A"))
+        cache.store([1.0, 0.0], ["b"], make_response("B"))
+        cache.lookup([1.0, 0.0], ["a"])
+        cache.store([1.0, 0.0], ["c"], make_response("C"))
+        
+        assert cache.lookup([1.0, 0.0], ["b"]) is None
+        assert cache.lookup([1.0, 0.0], ["a"]).answer == "A"
+    
+    def test_invalidate_clears_entries(self):
+        cache = AnswerCache()
+        cache.store([1.0, 0.0], ["a"], make_response())
+        cache.invalidate()
+        
+        assert cache.lookup([1.0, 0.0], ["a"]) is None
+        assert cache.stats()["invalidations"] == 1
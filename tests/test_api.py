@@ -1,3 +1,7 @@
+import asyncio
+import json
+import time
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock, MagicMock
@@ -31,6 +35,11 @@ class TestHealthEndpoints:
 
 
 class TestQueryEndpoint:    
+    @pytest.fixture(autouse=True)
+    def mock_query_embedding(self):
+        with patch('app.api.routes.query.generate_embedding', return_value=[0.1] * 8) as mock_embed:
+            yield mock_embed
+    
     @patch('app.api.routes.query.search_papers')
     @patch('app.api.routes.query.generate_answer')
     def test_successful_query(self, mock_generate, mock_search):
@@ -60,9 +69,32 @@ class TestQueryEndpoint:
         data = response.json()
         assert "answer" in data
         assert "references" in data
-        assert "research literature" in data["answer"]
+        assert data["answer"] == "autophagy is a cellular process. According to arXiv:2301.12345, it plays a role in cancer."
         assert len(data["references"]) > 0
     
+    @patch('app.api.routes.query.search_papers')
+    @patch('app.api.routes.query.generate_answer')
+    def test_passes_metadata_filters_to_search(self, mock_generate, mock_search):
+        mock_search.return_value = []
+        mock_generate.return_value = "No results"
+        
+        response = client.post(
+            "/query/case",
+            json={
+                "case_description": "What is the role of autophagy in cancer?",
+                "categories": ["q-bio.CB", "q-bio.TO"],
+                "published_from": "2022-01-01T00:00:00"
+            }
+        )
+        
+        assert response.status_code == 200
+        assert mock_search.call_args.kwargs["filters"] == {
+            "$and": [
+                {"categories": {"$in": ["q-bio.CB", "q-bio.TO"]}},
+                {"published": {"$gte": datetime(2022, 1, 1)}}
+            ]
+        }
+    
     def test_rejects_short_query(self):
         response = client.post(
             "/query/case",
@@ -153,6 +185,271 @@ class TestQueryEndpoint:
         assert response.status_code == 500
 
 
+class TestAnswerCache:
+    @pytest.fixture(autouse=True)
+    def mock_query_embedding(self):
+        with patch('app.api.routes.query.generate_embedding', return_value=[0.1] * 8) as mock_embed:
+            yield mock_embed
+    
+    def retrieved(self, chunk_id="c1"):
+        return [
+            {
+                "_id": chunk_id,
+                "arxiv_id": "2301.12345",
+                "title": "Autophagy in Cancer",
+                "chunk_text": "Autophagy plays a role...",
+                "score": 0.92
+            }
+        ]
+    
+    @patch('app.api.routes.query.search_papers')
+    @patch('app.api.routes.query.generate_answer')
+    def test_repeat_query_skips_generation(self, mock_generate, mock_search):
+        mock_search.return_value = self.retrieved()
+        mock_generate.return_value = "Cached answer."
+        payload = {"case_description": "What is the role of autophagy in cancer?"}
+        
+        first = client.post("/query/case", json=payload)
+        second = client.post("/query/case", json=payload)
+        
+        assert first.json() == second.json()
+        assert mock_generate.call_count == 1
+    
+    @patch('app.api.routes.query.search_papers')
+    @patch('app.api.routes.query.generate_answer')
+    def test_changed_retrieval_misses_cache(self, mock_generate, mock_search):
+        mock_generate.return_value = "Fresh answer."
+        payload = {"case_description": "What is the role of autophagy in cancer?"}
+        
+        mock_search.return_value = self.retrieved("c1")
+        client.post("/query/case", json=payload)
+        mock_search.return_value = self.retrieved("c2")
+        client.post("/query/case", json=payload)
+        
+        assert mock_generate.call_count == 2
+
+
+class TestStreamingQueryEndpoint:
+    @pytest.fixture(autouse=True)
+    def mock_query_embedding(self):
+        with patch('app.api.routes.query.generate_embedding', return_value=[0.1] * 8) as mock_embed:
+            yield mock_embed
+    
+    def read_events(self, response):
+        return [json.loads(line) for line in response.text.splitlines() if line]
+    
+    @patch('app.api.routes.query.search_papers')
+    @patch('app.api.routes.query.stream_answer')
+    def test_streams_references_then_tokens(self, mock_stream, mock_search):
+        mock_search.return_value = [
+            {
+                "arxiv_id": "2301.12345",
+                "title": "Autophagy in Cancer",
+                "chunk_text": "Autophagy plays a role...",
+                "score": 0.92
+            }
+        ]
+        
+        async def tokens(query, docs):
+            for token in ["Autophagy is ", "a cellular process. ", "It matters", "."]:
+                yield token
+        
+        mock_stream.side_effect = tokens
+        
+        response = client.post(
+            "/query/case/stream",
+            json={"case_description": "What is the role of autophagy in cancer?"}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        events = self.read_events(response)
+        assert events[0]["type"] == "references"
+        assert events[0]["references"][0]["arxiv_id"] == "2301.12345"
+        assert events[-1]["type"] == "done"
+        
+        answer = "".join(e["text"] for e in events if e["type"] == "token")
+        assert answer == "Autophagy is a cellular process. It matters."
+    
+    @patch('app.api.routes.query.search_papers')
+    @patch('app.api.routes.query.stream_answer')
+    def test_cleans_streamed_boilerplate(self, mock_stream, mock_search):
+        mock_search.return_value = [
+            {"arxiv_id": "2301.12345", "title": "T", "chunk_text": "C", "score": 0.9}
+        ]
+        
+        async def tokens(query, docs):
+            for token in ["Based on available ", "research literature, ", "autophagy ", "is key."]:
+                yield token
+        
+        mock_stream.side_effect = tokens
+        
+        response = client.post(
+            "/query/case/stream",
+            json={"case_description": "What is the role of autophagy in cancer?"}
+        )
+        
+        answer = "".join(e["text"] for e in self.read_events(response) if e["type"] == "token")
+        assert answer == "autophagy is key."
+    
+    @patch('app.api.routes.query.search_papers')
+    @patch('app.api.routes.query.stream_answer')
+    @patch('app.api.routes.query.generate_answer')
+    def test_matches_non_streaming_answer(self, mock_generate, mock_stream, mock_search, isolated_answer_cache):
+        mock_search.return_value = [
+            {"_id": "c1", "arxiv_id": "2301.12345", "title": "T", "chunk_text": "C", "score": 0.9}
+        ]
+        raw = [
+            "Based on available research literature, **autophagy** is key ",
+            "(According to arXiv:2301.12345v1).\n",
+            "## Summary\n",
+            "In summary, it `matters`.",
+        ]
+        mock_generate.return_value = "".join(raw)
+        
+        async def tokens(query, docs):
+            for token in raw:
+                yield token
+        
+        mock_stream.side_effect = tokens
+        payload = {"case_description": "What is the role of autophagy in cancer?"}
+        
+        def streamed():
+            response = client.post("/query/case/stream", json=payload)
+            return "".join(e["text"] for e in self.read_events(response) if e["type"] == "token")
+        
+        fresh_stream = streamed()
+        cached_case = client.post("/query/case", json=payload).json()["answer"]
+        isolated_answer_cache.invalidate()
+        fresh_case = client.post("/query/case", json=payload).json()["answer"]
+        cached_stream = streamed()
+        
+        assert fresh_stream == "autophagy is key . Summary it matters."
+        assert cached_case == fresh_case == cached_stream == fresh_stream
+        assert mock_generate.call_count == 1
+        assert mock_stream.call_count == 1
+    
+    @patch('app.api.routes.query.search_papers')
+    def test_retrieval_failure_returns_500(self, mock_search):
+        mock_search.side_effect = Exception("Database connection failed")
+        
+        response = client.post(
+            "/query/case/stream",
+            json={"case_description": "Valid query but service fails"}
+        )
+        
+        assert response.status_code == 500
+    
+    @patch('app.api.routes.query.search_papers')
+    @patch('app.api.routes.query.stream_answer')
+    def test_generation_failure_emits_error_event(self, mock_stream, mock_search):
+        mock_search.return_value = [
+            {"arxiv_id": "2301.12345", "title": "T", "chunk_text": "C", "score": 0.9}
+        ]
+        
+        async def tokens(query, docs):
+            yield "Partial"
+            raise Exception("Ollama connection failed")
+        
+        mock_stream.side_effect = tokens
+        
+        response = client.post(
+            "/query/case/stream",
+            json={"case_description": "What is the role of autophagy in cancer?"}
+        )
+        
+        events = self.read_events(response)
+        assert events[-1]["type"] == "error"
+        assert "Ollama" in events[-1]["detail"]
+
+
+class TestConcurrentQueries:
+    
+    def test_concurrent_queries_do_not_serialize(self):
+        delay = 0.2
+        n_queries = 5
+        
+        async def fake_embed(model, input):
+            await asyncio.sleep(delay / 10)
+            return {"embeddings": [[0.1] * 8]}
+        
+        async def fake_generate(model, prompt, **options):
+            await asyncio.sleep(delay)
+            return {"response": "Based on available research literature, ..."}
+        
+        fake_client = MagicMock()
+        fake_client.embed = fake_embed
+        fake_client.generate = fake_generate
+        
+        retrieved = [{"arxiv_id": "2301.12345", "title": "T", "chunk_text": "C", "score": 0.9}]
+        
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+                async def timed(request):
+                    start = time.perf_counter()
+                    response = await request
+                    return response, time.perf_counter() - start
+                
+                async def health_while_busy():
+                    await asyncio.sleep(delay / 4)
+                    return await timed(api.get("/health"))
+                
+                start = time.perf_counter()
+                results = await asyncio.gather(
+                    *(
+                        timed(api.post(
+                            "/query/case",
+                            json={"case_description": f"Concurrent question {i} about autophagy"}
+                        ))
+                        for i in range(n_queries)
+                    ),
+                    health_while_busy()
+                )
+                return results, time.perf_counter() - start
+        
+        with patch('app.services.embedding.ollama_client.get_client', return_value=fake_client), \
+             patch('app.services.generation.ollama_client.get_client', return_value=fake_client), \
+             patch('app.api.routes.query.search_papers', AsyncMock(return_value=retrieved)), \
+             patch('app.services.ollama_client.configs.llm_concurrency', n_queries):
+            results, elapsed = asyncio.run(run())
+        
+        *queries, (health_response, health_latency) = results
+        
+        assert all(response.status_code == 200 for response, _ in queries)
+        assert elapsed < delay * n_queries / 2
+        assert health_response.status_code == 200
+        assert health_latency < delay / 2
+    
+    def test_llm_concurrency_limit_is_enforced(self):
+        in_flight = 0
+        peak = 0
+        
+        async def fake_generate(model, prompt, **options):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+            return {"response": "Answer"}
+        
+        fake_client = MagicMock()
+        fake_client.generate = fake_generate
+        chunks = [{"arxiv_id": "123", "title": "T", "chunk_text": "C"}]
+        
+        from app.services.generation import generate_answer
+        
+        async def run():
+            await asyncio.gather(*(generate_answer(f"query {i}", chunks) for i in range(6)))
+        
+        with patch('app.services.generation.ollama_client.get_client', return_value=fake_client), \
+             patch('app.services.ollama_client.configs.model_concurrency', {"llama3.2": 2}):
+            asyncio.run(run())
+        
+        assert peak == 2
+
+
 class TestAPIDocumentation:
     
     def test_docs_endpoint_exists(self):
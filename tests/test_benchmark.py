@@ -0,0 +1,63 @@
+import asyncio
+from app.utils.text_cleaning import INGEST
+from benchmarks.retrieval import StubEmbedder, build_corpus, build_queries, run_benchmark, DEFAULT_FEED
+
+
+class TestRetrievalBenchmark:
+
+    def test_stub_embedder_is_deterministic_and_normalized(self):
+        embedder = StubEmbedder(dim=32)
+        vector = embedder.embed("Autophagy in tumour cells")
+
+        assert vector == StubEmbedder(dim=32).embed("autophagy in tumour cells")
+        assert abs(sum(x * x for x in vector) - 1.0) < 1e-5
+
+    def test_builds_corpus_and_queries_from_feed(self):
+        docs = build_corpus(DEFAULT_FEED, 50)
+        queries = build_queries(docs, 10)
+
+        assert len(docs) == 50
+        assert len({doc["arxiv_id"] for doc in docs}) == 50
+        assert len(queries) == 10
+
+    def test_report_covers_every_size_and_factor(self):
+        report = asyncio.run(run_benchmark(
+            sizes=[100, 200], factors=[1, 10], top_k=5, num_queries=5, embedder=StubEmbedder(dim=32)
+        ))
+
+        assert [run["corpus_size"] for run in report["runs"]] == [100, 200]
+        for run in report["runs"]:
+            assert run["exact"]["recall@5"] == 1.0
+            assert [entry["num_candidates"] for entry in run["ivf"]] == [5, 50]
+            assert [entry["num_candidates"] for entry in run["binary"]] == [5, 50]
+            assert run["binary_code_bytes"] * 32 == run["float32_bytes"]
+            assert set(run["exact"]["latency"]) == {"p50_ms", "p95_ms", "p99_ms", "mean_ms"}
+
+
+class TestChunkingBenchmark:
+
+    def test_reports_abstracts_and_full_text(self):
+        from benchmarks.chunking import run_benchmark as run_chunking_benchmark
+
+        report = run_chunking_benchmark(full_text_kb=8, full_texts=2, repeat=1, max_tokens=64, overlap_tokens=8)
+
+        for section in ("abstracts", "full_text"):
+            assert report[section]["chunks"] >= report[section]["documents"]
+            assert report[section]["tokens_per_chunk"]["max"] <= 64
+            assert report[section]["mb_per_sec"] > 0
+        assert report["full_text"]["megabytes"] > 2 * 8 * 1024 / 1e6 * 0.9
+
+
+class TestCleaningBenchmark:
+
+    def test_reports_every_profile_and_the_legacy_baseline(self):
+        from benchmarks.cleaning import run_benchmark as run_cleaning_benchmark
+
+        report = run_cleaning_benchmark(full_text_kb=8, full_texts=2, copies=1, repeat=1)
+
+        for section in ("abstracts", "full_text"):
+            assert set(report[section]) == {"ingest", "answer", "legacy"}
+            for result in report[section].values():
+                assert result["mb_per_sec"] > 0
+                assert result["output_ratio"] <= 1.0
+        assert report["config"]["profiles"]["ingest"] == list(INGEST.steps)
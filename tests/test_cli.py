@@ -0,0 +1,100 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+from app.cli import BulkLoader, iter_papers, main, paper_from_record
+from app.db.local_vector_store import LocalVectorStore
+
+
+SAMPLE_FEED = Path(__file__).resolve().parent.parent / "sample_xml.xml"
+
+
+async def fake_embed(texts, model=None, version=None):
+    return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+
+def load(papers, workers=0, store=None):
+    if store is None:
+        store = LocalVectorStore(ivf_min_vectors=0)
+    loader = BulkLoader(store, workers=workers, batch_papers=4)
+    
+    with patch('app.services.ingestion.generate_embeddings_batch', side_effect=fake_embed):
+        stats = asyncio.run(loader.run(papers))
+    return loader, stats, store
+
+
+class TestInputs:
+    
+    def test_reads_atom_and_jsonl_files(self, tmp_path):
+        dump = tmp_path / "dump.jsonl"
+        dump.write_text(
+            json.dumps({"arxiv_id": "2301.00001v2", "title": "A", "abstract": "Text  one.", "authors": "Doe"}) + "\n"
+            + "not json\n"
+            + json.dumps({
+                "id": "0704.0001", "title": "B", "abstract": "Text two.", "update_date": "2008-11-13",
+                "versions": [
+                    {"version": "v1", "created": "Mon, 2 Apr 2007 19:18:42 GMT"},
+                    {"version": "v2", "created": "Tue, 24 Jul 2007 20:10:27 GMT"}
+                ]
+            }) + "\n"
+            + json.dumps({"title": "no id or text"}) + "\n"
+        )
+        
+        papers = list(iter_papers([SAMPLE_FEED, dump]))
+        
+        assert len(papers) == 12
+        assert (papers[10].arxiv_id, papers[10].version) == ("2301.00001", 2)
+        assert papers[10].abstract == "Text one."
+        assert papers[10].authors == ["Doe"]
+        assert (papers[11].arxiv_id, papers[11].version) == ("0704.0001", 2)
+        assert papers[11].published == datetime(2007, 4, 2, 19, 18, 42, tzinfo=timezone.utc)
+        assert papers[11].updated == datetime(2008, 11, 13)
+    
+    def test_walks_directories(self, tmp_path):
+        (tmp_path / "nested").mkdir()
+        (tmp_path / "nested" / "feed.xml").write_bytes(SAMPLE_FEED.read_bytes())
+        (tmp_path / "notes.txt").write_text("ignored")
+        
+        assert len(list(iter_papers([tmp_path]))) == 10
+    
+    def test_record_needs_id_and_text(self):
+        assert paper_from_record({"id": "x"}) is None
+        assert paper_from_record({"summary": "text"}) is None
+        assert paper_from_record({"request_id": "user-001", "title": "Ticket", "body": "Text."}) is None
+
+    def test_refuses_local_store_open_elsewhere(self, tmp_path):
+        store = LocalVectorStore(str(tmp_path), exclusive=True)
+        
+        with pytest.raises(SystemExit) as exc_info:
+            main(["ingest", str(SAMPLE_FEED), "--backend", "local", "--index-path", str(tmp_path)])
+        
+        assert exc_info.value.code == 1
+        store.close()
+
+
+class TestBulkLoader:
+    
+    def test_loads_feed_into_store(self):
+        loader, stats, store = load(iter_papers([SAMPLE_FEED]))
+        
+        assert loader.papers_read == 10
+        assert stats.documents == loader.chunks_created
+        assert len(store) == loader.chunks_created
+    
+    def test_skips_chunks_already_stored(self):
+        store = LocalVectorStore(ivf_min_vectors=0)
+        load(iter_papers([SAMPLE_FEED]), store=store)
+        
+        loader, stats, _ = load(iter_papers([SAMPLE_FEED]), store=store)
+        
+        assert stats.documents == 0
+        assert loader.chunks_skipped == loader.chunks_created
+    
+    def test_chunks_in_worker_processes(self):
+        inline, _, _ = load(iter_papers([SAMPLE_FEED]))
+        pooled, stats, store = load(iter_papers([SAMPLE_FEED]), workers=2)
+        
+        assert pooled.chunks_created == inline.chunks_created
+        assert len(store) == stats.documents
@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+from unittest.mock import Mock, AsyncMock
+from pymongo.errors import BulkWriteError
+from app.db.chunk_writer import ChunkWriter
+
+
+def make_collection(delay: float = 0.0):
+    collection = Mock()
+    collection.batches = []
+
+    async def insert_many(docs, ordered=True):
+        assert ordered is False
+        await asyncio.sleep(delay)
+        collection.batches.append(list(docs))
+
+    collection.insert_many = AsyncMock(side_effect=insert_many)
+    return collection
+
+
+class TestChunkWriter:
+
+    def test_flushes_by_size(self):
+        collection = make_collection()
+
+        async def run():
+            async with ChunkWriter(collection, batch_size=4, flush_interval=0) as writer:
+                await writer.add_many([{"chunk_index": i} for i in range(10)])
+            return writer
+
+        writer = asyncio.run(run())
+
+        assert [len(batch) for batch in collection.batches] == [4, 4, 2]
+        assert writer.documents_written == 10
+
+    def test_flushes_by_time(self):
+        collection = make_collection()
+
+        async def run():
+            async with ChunkWriter(collection, batch_size=100, flush_interval=0.01) as writer:
+                await writer.add({"chunk_index": 0})
+                await asyncio.sleep(0.05)
+                flushed_before_close = len(collection.batches)
+            return flushed_before_close
+
+        assert asyncio.run(run()) == 1
+
+    def test_applies_backpressure(self):
+        collection = Mock()
+        in_flight = 0
+        peak = 0
+
+        async def insert_many(docs, ordered=True):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+
+        collection.insert_many = insert_many
+
+        async def run():
+            async with ChunkWriter(collection, batch_size=1, flush_interval=0, max_inflight=2) as writer:
+                for i in range(6):
+                    await writer.add({"chunk_index": i})
+            return writer
+
+        writer = asyncio.run(run())
+
+        assert peak == 2
+        assert writer.documents_written == 6
+
+    def test_close_writes_batch_held_by_cancelled_timer(self):
+        collection = Mock()
+        written = []
+
+        async def insert_many(docs, ordered=True):
+            await asyncio.sleep(0.1)
+            written.extend(docs)
+
+        collection.insert_many = insert_many
+
+        async def run():
+            async with ChunkWriter(collection, batch_size=2, flush_interval=0.05, max_inflight=1) as writer:
+                await writer.add_many([{"chunk_index": i} for i in range(3)])
+                # The timer now waits for the only slot, still busy with the first batch.
+                await asyncio.sleep(0.07)
+            return writer
+
+        writer = asyncio.run(run())
+
+        assert sorted(doc["chunk_index"] for doc in written) == [0, 1, 2]
+        assert writer.documents_written == 3
+
+    def test_reports_batch_stats(self):
+        collection = make_collection()
+
+        async def run():
+            async with ChunkWriter(collection, batch_size=5, flush_interval=0) as writer:
+                await writer.add_many([{"chunk_index": i} for i in range(7)])
+            return writer.stats()
+
+        stats = asyncio.run(run())
+
+        assert stats.batches == 2
+        assert stats.documents == 7
+        assert len(stats.batch_latencies_ms) == 2
+        assert stats.max_batch_latency_ms >= stats.mean_batch_latency_ms
+
+    def test_raises_write_errors_on_close(self):
+        collection = Mock()
+        collection.insert_many = AsyncMock(side_effect=Exception("Mongo unavailable"))
+
+        async def run():
+            async with ChunkWriter(collection, batch_size=2, flush_interval=0) as writer:
+                await writer.add_many([{"chunk_index": i} for i in range(2)])
+
+        with pytest.raises(Exception) as exc_info:
+            asyncio.run(run())
+
+        assert "Mongo" in str(exc_info.value)
+
+    def test_tolerates_duplicate_key_errors(self):
+        collection = Mock()
+        collection.insert_many = AsyncMock(side_effect=BulkWriteError({
+            "nInserted": 1,
+            "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}]
+        }))
+
+        async def run():
+            async with ChunkWriter(collection, batch_size=2, flush_interval=0) as writer:
+                await writer.add_many([{"chunk_index": i} for i in range(2)])
+            return writer.stats()
+
+        stats = asyncio.run(run())
+
+        assert stats.documents == 1
+        assert stats.duplicates == 1
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from unittest.mock import Mock, AsyncMock, patch
+from app.services.embedding import generate_embedding, generate_embeddings_batch
+from app.services.embedding_cache import EmbeddingCache
+
+
+def get(cache, model, text):
+    return asyncio.run(cache.aget_many(model, [text]))[0]
+
+
+def put(cache, model, text, vector):
+    asyncio.run(cache.aput_many(model, [text], [vector]))
+
+
+class TestEmbeddingCache:
+    
+    def test_returns_none_on_miss(self):
+        cache = EmbeddingCache(path=None)
+        
+        assert get(cache, "model", "text") is None
+        assert cache.stats()["misses"] == 1
+    
+    def test_memory_hit_after_put(self):
+        cache = EmbeddingCache(path=None)
+        put(cache, "model", "autophagy text", [0.5, -0.25])
+        
+        assert get(cache, "model", "autophagy text") == [0.5, -0.25]
+        assert cache.stats()["memory_hits"] == 1
+    
+    def test_keys_by_model_and_normalized_text(self):
+        cache = EmbeddingCache(path=None)
+        put(cache, "model-a", "autophagy  in\ncancer", [1.0])
+        
+        assert get(cache, "model-a", "autophagy in cancer") == [1.0]
+        assert get(cache, "model-b", "autophagy in cancer") is None
+    
+    def test_evicts_least_recently_used(self):
+        cache = EmbeddingCache(path=None, max_entries=2)
+        put(cache, "model", "a", [1.0])
+        put(cache, "model", "b", [2.0])
+        get(cache, "model", "a")
+        put(cache, "model", "c", [3.0])
+        
+        assert get(cache, "model", "b") is None
+        assert get(cache, "model", "a") == [1.0]
+    
+    def test_disk_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "cache" / "embeddings.sqlite3")
+        cache = EmbeddingCache(path=path)
+        asyncio.run(cache.aput_many("model", ["a", "b"], [[0.25, 0.5], [0.75, 1.0]]))
+        cache.close()
+        
+        reopened = EmbeddingCache(path=path)
+        
+        assert asyncio.run(reopened.aget_many("model", ["b", "a", "c"])) == [[0.75, 1.0], [0.25, 0.5], None]
+        stats = reopened.stats()
+        assert stats["disk_hits"] == 2
+        assert stats["misses"] == 1
+        reopened.close()
+    
+    def test_async_disk_tier_runs_off_the_event_loop(self, tmp_path):
+        cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"))
+        loop_thread = threading.get_ident()
+        disk_threads = []
+        load, write = cache._load, cache._write
+
+        def record(method):
+            def wrapper(*args):
+                disk_threads.append(threading.get_ident())
+                return method(*args)
+            return wrapper
+
+        cache._load, cache._write = record(load), record(write)
+
+        async def run():
+            await cache.aput_many("model", ["a"], [[0.25]])
+            cache._memory.clear()
+            return await cache.aget_many("model", ["a", "b"])
+
+        assert asyncio.run(run()) == [[0.25], None]
+        assert len(disk_threads) == 2
+        assert loop_thread not in disk_threads
+        assert cache.stats()["disk_hits"] == 1
+        cache.close()
+
+    @patch('app.services.embedding.ollama_client.get_client')
+    def test_repeated_query_skips_model(self, mock_client):
+        mock_instance = Mock()
+        mock_instance.embed = AsyncMock(return_value={"embeddings": [[0.5] * 8]})
+        mock_client.return_value = mock_instance
+        
+        first = asyncio.run(generate_embedding("What is the role of autophagy in cancer?"))
+        second = asyncio.run(generate_embedding("What is the role of autophagy in cancer?"))
+        
+        assert first == second
+        assert mock_instance.embed.call_count == 1
+    
+    @patch('app.services.embedding.ollama_client.get_client')
+    def test_miss_returns_the_values_a_hit_would(self, mock_client, tmp_path, monkeypatch):
+        cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"))
+        monkeypatch.setattr("app.services.embedding.embedding_cache", cache)
+        mock_instance = Mock()
+        mock_instance.embed = AsyncMock(side_effect=lambda model, input: {
+            "embeddings": [[0.1, 1 / 3]] * (len(input) if isinstance(input, list) else 1)
+        })
+        mock_client.return_value = mock_instance
+        
+        single_miss = asyncio.run(generate_embedding("autophagy"))
+        batch_miss = asyncio.run(generate_embeddings_batch(["apoptosis"]))
+        cache._memory.clear()
+        
+        assert single_miss == asyncio.run(generate_embedding("autophagy"))
+        assert batch_miss == asyncio.run(generate_embeddings_batch(["apoptosis"]))
+        assert single_miss != [0.1, 1 / 3]
+        assert mock_instance.embed.call_count == 2
+        cache.close()
@@ -0,0 +1,208 @@
+import asyncio
+import time
+import httpx
+from app.services.paper import ArxivHarvester, TokenBucket
+
+
+ENTRY = """
+  <entry>
+    <id>http://arxiv.org/abs/{arxiv_id}</id>
+    <title>Paper {arxiv_id}</title>
+    <published>2023-01-15T00:00:00Z</published>
+    <summary>Abstract of {arxiv_id}.</summary>
+    <author><name>Author</name></author>
+    <category term="{category}"/>
+  </entry>"""
+
+
+def atom_feed(query: str, start: int, count: int, total: int = None, malformed=()) -> str:
+    category = query.split(":")[-1]
+    entries = []
+    for i in range(start, start + count):
+        entry = ENTRY.format(arxiv_id=f"{category}.{i:05d}v1", category=category)
+        if i in malformed:
+            entry = entry.replace(f"<summary>Abstract of {category}.{i:05d}v1.</summary>", "")
+        entries.append(entry)
+    entries = "".join(entries)
+    total_results = (
+        f'<opensearch:totalResults xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">{total}'
+        f'</opensearch:totalResults>' if total is not None else ""
+    )
+    return f'<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom">{total_results}{entries}</feed>'
+
+
+class MockArxiv:
+    """Serves Atom pages for any query, with scripted failures per offset."""
+
+    def __init__(self, total: int = 200, failures=None, delay: float = 0.0, malformed=(), short_pages=(),
+                 report_total: bool = True):
+        self.total = total
+        self.malformed = set(malformed)
+        # Offsets at which the server returns one entry fewer than asked, as arXiv sometimes does.
+        self.short_pages = set(short_pages)
+        self.report_total = report_total
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        query = params["search_query"]
+        start = int(params["start"])
+        size = int(params["max_results"])
+        self.requests.append((query, start, request.headers.get("If-None-Match")))
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        remaining = self.failures.get(start, [])
+        if remaining:
+            status = remaining.pop(0)
+            if status == "disconnect":
+                raise httpx.ConnectError("connection reset", request=request)
+            return httpx.Response(status, headers={"Retry-After": "0"})
+
+        if request.headers.get("If-None-Match") == f'"{query}-{start}"':
+            return httpx.Response(304)
+
+        count = max(0, min(size, self.total - start) - (start in self.short_pages))
+        total = self.total if self.report_total else None
+        return httpx.Response(
+            200,
+            text=atom_feed(query, start, count, total, self.malformed),
+            headers={"ETag": f'"{query}-{start}"'}
+        )
+
+
+def make_harvester(server: MockArxiv, **kwargs) -> ArxivHarvester:
+    options = dict(page_size=50, rate=1000, burst=10, concurrency=4, max_retries=3, backoff_base=0.001)
+    options.update(kwargs)
+    return ArxivHarvester(
+        base_url="http://arxiv.test/api/query",
+        transport=httpx.MockTransport(server),
+        **options
+    )
+
+
+async def collect(harvester, query="cat:q-bio.TO", max_results=200, start_offset=0):
+    return [page async for page in harvester.iter_pages(query, max_results, start_offset)]
+
+
+class TestTokenBucket:
+
+    def test_limits_request_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+
+        async def run():
+            start = time.perf_counter()
+            await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(run())
+
+        assert elapsed >= 5 / 50 * 0.9
+
+    def test_allows_burst_up_to_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=5)
+
+        async def run():
+            start = time.perf_counter()
+            await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+            return time.perf_counter() - start
+
+        assert asyncio.run(run()) < 0.1
+
+
+class TestArxivHarvester:
+
+    def test_yields_pages_in_order(self):
+        server = MockArxiv(total=200, delay=0.01)
+        pages = asyncio.run(collect(make_harvester(server)))
+
+        assert [next_start for next_start, _ in pages] == [50, 100, 150, 200]
+        assert [len(papers) for _, papers in pages] == [50, 50, 50, 50]
+        assert pages[0][1][0].arxiv_id == "q-bio.TO.00000"
+
+    def test_fetches_pages_concurrently(self):
+        server = MockArxiv(total=400, delay=0.02)
+        asyncio.run(collect(make_harvester(server, concurrency=4), max_results=400))
+
+        assert 1 < server.peak_in_flight <= 4
+
+    def test_stops_after_short_page(self):
+        server = MockArxiv(total=120)
+        pages = asyncio.run(collect(make_harvester(server, concurrency=1), max_results=500))
+
+        assert [len(papers) for _, papers in pages] == [50, 50, 20]
+        assert len(server.requests) == 3
+
+    def test_stops_at_empty_page_without_total_results(self):
+        server = MockArxiv(total=120, report_total=False)
+        pages = asyncio.run(collect(make_harvester(server, concurrency=1), max_results=500))
+
+        assert [len(papers) for _, papers in pages] == [50, 50, 20, 0]
+
+    def test_malformed_entry_does_not_end_harvest(self):
+        server = MockArxiv(total=9, malformed={1})
+        pages = asyncio.run(collect(make_harvester(server, page_size=3, concurrency=1), max_results=9))
+
+        assert [len(papers) for _, papers in pages] == [2, 3, 3]
+        assert [start for _, start, _ in server.requests] == [0, 3, 6]
+
+    def test_short_page_mid_feed_does_not_end_harvest(self):
+        server = MockArxiv(total=150, short_pages={50})
+        pages = asyncio.run(collect(make_harvester(server, concurrency=1), max_results=150))
+
+        assert [len(papers) for _, papers in pages] == [50, 49, 50]
+
+    def test_retries_transient_failures(self):
+        server = MockArxiv(total=100, failures={50: [503, "disconnect", 429]})
+        pages = asyncio.run(collect(make_harvester(server), max_results=100))
+
+        assert [len(papers) for _, papers in pages] == [50, 50]
+        assert sum(1 for _, start, _ in server.requests if start == 50) == 4
+
+    def test_failed_page_does_not_end_harvest(self):
+        server = MockArxiv(total=150, failures={50: [503] * 10})
+        pages = asyncio.run(collect(make_harvester(server, max_retries=2), max_results=150))
+
+        assert [next_start for next_start, _ in pages] == [50, 100, 150]
+        assert pages[1][1] is None
+        assert len(pages[2][1]) == 50
+
+    def test_does_not_retry_client_errors(self):
+        server = MockArxiv(total=50, failures={0: [400]})
+        pages = asyncio.run(collect(make_harvester(server), max_results=50))
+
+        assert pages == [(50, None)]
+        assert len(server.requests) == 1
+
+    def test_revalidates_with_etag(self):
+        server = MockArxiv(total=50)
+        harvester = make_harvester(server)
+
+        first = asyncio.run(collect(harvester, max_results=50))
+        second = asyncio.run(collect(harvester, max_results=50))
+
+        assert server.requests[1][2] == '"cat:q-bio.TO-0"'
+        assert [p.arxiv_id for p in second[0][1]] == [p.arxiv_id for p in first[0][1]]
+
+    def test_harvests_multiple_queries(self):
+        server = MockArxiv(total=100, delay=0.01)
+        harvester = make_harvester(server)
+
+        async def run():
+            return [page async for page in harvester.harvest(["cat:q-bio.TO", "cat:q-bio.NC"], 100)]
+
+        pages = asyncio.run(run())
+
+        assert sorted((query, next_start) for query, next_start, _ in pages) == [
+            ("cat:q-bio.NC", 50), ("cat:q-bio.NC", 100),
+            ("cat:q-bio.TO", 50), ("cat:q-bio.TO", 100)
+        ]
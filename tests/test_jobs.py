@@ -0,0 +1,187 @@
+import asyncio
+import httpx
+from fastapi.testclient import TestClient
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+from app.db.jobs import MemoryJobStore
+from app.main import app
+from app.models.schema import IngestJob, IngestRequest
+from app.services.jobs import IngestionJobManager
+
+
+class FakePipeline:
+    def __init__(self, request, release=None, error=None):
+        self.request = request
+        self.release = release
+        self.error = error
+        self.writer = SimpleNamespace(duplicates_skipped=1)
+
+        self.papers_fetched = 0
+        self.chunks_created = 0
+        self.chunks_embedded = 0
+        self.chunks_stored = 0
+        self.chunks_skipped = 0
+
+    async def run(self):
+        self.papers_fetched = 5
+        self.chunks_created = 10
+        self.chunks_embedded = 8
+        self.chunks_stored = 8
+        self.chunks_skipped = 2
+        if self.release is not None:
+            await self.release.wait()
+        if self.error:
+            raise self.error
+
+
+def make_manager(pipelines, **kwargs):
+    def factory(request):
+        pipeline = FakePipeline(request, **kwargs)
+        pipelines.append(pipeline)
+        return pipeline
+
+    return IngestionJobManager(concurrency=1, progress_interval=0.01, pipeline_factory=factory)
+
+
+async def wait_for_status(manager, job_id, status):
+    for _ in range(200):
+        job = await manager.get(job_id)
+        if job.status == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {job.status}")
+
+
+class TestIngestionJobManager:
+
+    def test_runs_job_and_records_stats(self):
+        pipelines = []
+        manager = make_manager(pipelines)
+
+        async def run():
+            await manager.start(MemoryJobStore())
+            job = await manager.submit(IngestRequest(max_papers=5))
+            done = await wait_for_status(manager, job.job_id, "completed")
+            await manager.stop()
+            return done
+
+        job = asyncio.run(run())
+
+        assert job.papers_fetched == 5
+        assert job.chunks_stored == 8
+        assert job.chunks_skipped == 3
+        assert job.eta_seconds == 0.0
+        assert job.finished_at is not None
+        assert pipelines[0].request.max_papers == 5
+
+    def test_reports_progress_while_running(self):
+        manager = make_manager([])
+
+        async def run():
+            event = asyncio.Event()
+            manager.pipeline_factory = lambda request: FakePipeline(request, release=event)
+            await manager.start(MemoryJobStore())
+            job = await manager.submit(IngestRequest(max_papers=10))
+            await wait_for_status(manager, job.job_id, "running")
+            await asyncio.sleep(0.05)
+            running = await manager.get(job.job_id)
+            event.set()
+            await wait_for_status(manager, job.job_id, "completed")
+            await manager.stop()
+            return running
+
+        job = asyncio.run(run())
+
+        assert job.papers_fetched == 5
+        assert job.rate_chunks_per_sec > 0
+        assert job.eta_seconds is not None
+
+    def test_cancels_running_job(self):
+        manager = make_manager([])
+
+        async def run():
+            manager.pipeline_factory = lambda request: FakePipeline(request, release=asyncio.Event())
+            await manager.start(MemoryJobStore())
+            first = await manager.submit(IngestRequest(max_papers=5))
+            second = await manager.submit(IngestRequest(max_papers=5))
+            await wait_for_status(manager, first.job_id, "running")
+
+            queued = await manager.cancel(second.job_id)
+            running = await manager.cancel(first.job_id)
+            await manager.stop()
+            return queued, running
+
+        queued, running = asyncio.run(run())
+
+        assert queued.status == "cancelled"
+        assert running.status == "cancelled"
+        assert running.papers_fetched == 5
+
+    def test_records_failures(self):
+        manager = make_manager([], error=RuntimeError("Ollama connection failed"))
+
+        async def run():
+            await manager.start(MemoryJobStore())
+            job = await manager.submit(IngestRequest(max_papers=5))
+            failed = await wait_for_status(manager, job.job_id, "failed")
+            await manager.stop()
+            return failed
+
+        job = asyncio.run(run())
+
+        assert "Ollama" in job.error
+
+    def test_resumes_interrupted_jobs_on_start(self):
+        pipelines = []
+        manager = make_manager(pipelines)
+        store = MemoryJobStore()
+        now = datetime.now(timezone.utc)
+
+        async def run():
+            await store.create(IngestJob(job_id="interrupted", status="running", request=IngestRequest(), created_at=now))
+            await store.create(IngestJob(job_id="waiting", request=IngestRequest(), created_at=now))
+            await manager.start(store)
+            await wait_for_status(manager, "interrupted", "completed")
+            await wait_for_status(manager, "waiting", "completed")
+            await manager.stop()
+
+        asyncio.run(run())
+
+        assert [p.request.resume for p in pipelines] == [True, False]
+
+
+class TestIngestJobEndpoints:
+
+    def test_submit_poll_and_cancel(self):
+        manager = make_manager([])
+
+        async def run():
+            manager.pipeline_factory = lambda request: FakePipeline(request, release=asyncio.Event())
+            await manager.start(MemoryJobStore())
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                submitted = await client.post("/ingest/jobs", json={"max_papers": 5})
+                job_id = submitted.json()["job_id"]
+                await wait_for_status(manager, job_id, "running")
+
+                polled = await client.get(f"/ingest/jobs/{job_id}")
+                cancelled = await client.delete(f"/ingest/jobs/{job_id}")
+                missing = await client.get("/ingest/jobs/unknown")
+            await manager.stop()
+            return submitted, polled, cancelled, missing
+
+        with patch('app.api.routes.ingest.ingestion_jobs', manager):
+            submitted, polled, cancelled, missing = asyncio.run(run())
+
+        assert submitted.status_code == 202
+        assert submitted.json()["status"] == "queued"
+        assert polled.json()["status"] == "running"
+        assert cancelled.json()["status"] == "cancelled"
+        assert missing.status_code == 404
+
+    def test_rejects_jobs_when_queue_is_down(self):
+        with patch('app.api.routes.ingest.ingestion_jobs', IngestionJobManager()):
+            response = TestClient(app).post("/ingest/jobs", json={"max_papers": 5})
+
+        assert response.status_code == 503
@@ -0,0 +1,204 @@
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import Mock, AsyncMock
+from app.db.lexical_index import BM25Index, tokenize, matches_filter
+from app.db.local_vector_store import LocalVectorStore
+from app.services.retrieval import search_papers, reciprocal_rank_fusion
+
+
+def chunk(arxiv_id, text, categories=None, published=None, score=None):
+    doc = {
+        "_id": arxiv_id,
+        "arxiv_id": arxiv_id,
+        "version": 1,
+        "title": f"Paper {arxiv_id}",
+        "chunk_text": text,
+        "chunk_index": 0,
+        "content_hash": f"hash-{arxiv_id}",
+        "categories": categories or ["q-bio.TO"],
+        "published": published or datetime(2023, 1, 1)
+    }
+    if score is not None:
+        doc["score"] = score
+    return doc
+
+
+CORPUS = [
+    chunk("a", "Autophagy regulates tissue homeostasis in the liver.", categories=["q-bio.CB"]),
+    chunk("b", "BRCA1 mutations impair homologous recombination repair in breast tissue.", published=datetime(2021, 6, 1)),
+    chunk("c", "IL-6 signalling drives chronic inflammation and fibrosis."),
+    chunk("d", "Tissue engineering scaffolds support fibroblast growth."),
+]
+
+
+class TestTokenize:
+
+    def test_drops_stopwords_and_splits_hyphenated_terms(self):
+        assert tokenize("The role of IL-6 in BRCA1/2 carriers") == [
+            "role", "il-6", "il", "6", "brca1/2", "brca1", "2", "carriers"
+        ]
+
+
+class TestBM25Index:
+
+    def test_ranks_exact_gene_matches_first(self):
+        index = BM25Index()
+        index.add(CORPUS)
+
+        results = index.search("BRCA1 repair", top_k=2)
+
+        assert results[0]["arxiv_id"] == "b"
+        assert results[0]["lexical_score"] > 0
+        assert results[0]["lexical_df"] == 1
+        assert len(results) == 1
+
+    def test_adds_incrementally_and_skips_duplicates(self):
+        index = BM25Index()
+        assert index.add(CORPUS[:2]) == 2
+        assert index.add(CORPUS) == 2
+
+        assert len(index) == 4
+        assert index.search("IL-6", top_k=3)[0]["arxiv_id"] == "c"
+
+    def test_removed_chunks_stop_matching(self):
+        index = BM25Index()
+        index.add(CORPUS)
+
+        assert index.remove([("b", 0, "hash-b"), ("missing", 0, "hash")]) == 1
+
+        assert len(index) == 3
+        assert index.paper_count() == 3
+        assert index.search("BRCA1 repair", top_k=2) == []
+        assert index.search("tissue", top_k=5)[0]["arxiv_id"] == "a"
+        assert index.add([CORPUS[1]]) == 1
+
+    def test_applies_filters(self):
+        index = BM25Index()
+        index.add(CORPUS)
+
+        results = index.search("tissue", top_k=5, filters={"categories": {"$in": ["q-bio.CB"]}})
+        dated = index.search("tissue", top_k=5, filters={"published": {"$gte": datetime(2022, 1, 1)}})
+
+        assert [doc["arxiv_id"] for doc in results] == ["a"]
+        assert "b" not in {doc["arxiv_id"] for doc in dated}
+
+    def test_builds_from_store_documents(self):
+        store = LocalVectorStore()
+        docs = [{**doc, "embedding": [1.0, 0.0]} for doc in CORPUS]
+        for doc in docs:
+            doc.pop("_id")
+        asyncio.run(store.insert_many(docs))
+
+        index = BM25Index()
+        assert asyncio.run(index.build(store.iter_documents())) == 4
+
+
+class TestMatchesFilter:
+
+    def test_combines_operators(self):
+        doc = CORPUS[1]
+
+        assert matches_filter(doc, {"$or": [{"arxiv_id": "x"}, {"categories": "q-bio.TO"}]})
+        assert not matches_filter(doc, {"$and": [{"arxiv_id": "b"}, {"categories": {"$nin": ["q-bio.TO"]}}]})
+
+    def test_rejects_unknown_operators(self):
+        with pytest.raises(ValueError):
+            matches_filter(CORPUS[0], {"arxiv_id": {"$regex": "a"}})
+
+
+class TestReciprocalRankFusion:
+
+    def test_rewards_chunks_found_by_both_rankers(self):
+        dense = [chunk("a", "", score=0.9), chunk("b", "", score=0.8)]
+        lexical = [chunk("b", ""), chunk("c", "")]
+
+        results = reciprocal_rank_fusion([dense, lexical], top_k=3, k=60)
+
+        assert [doc["arxiv_id"] for doc in results] == ["b", "a", "c"]
+        assert results[1]["vector_score"] == 0.9
+        assert "vector_score" not in results[2]
+        assert all(0 < doc["score"] <= 1 for doc in results)
+
+    def test_top_ranked_everywhere_scores_one(self):
+        results = reciprocal_rank_fusion([[chunk("a", "")], [chunk("a", "")]], top_k=1)
+
+        assert results[0]["score"] == 1.0
+
+
+class TestHybridSearch:
+
+    def test_fuses_lexical_matches_into_vector_results(self, isolated_lexical_index):
+        isolated_lexical_index.add(CORPUS)
+        store = Mock()
+        store.search = AsyncMock(return_value=[chunk("a", "", score=0.9)])
+
+        results = asyncio.run(search_papers("BRCA1", store, top_k=2, query_embedding=[0.1]))
+
+        assert {doc["arxiv_id"] for doc in results} == {"a", "b"}
+        assert store.search.call_args[0][1] == 2 * 4
+
+    def test_falls_back_to_lexical_when_vector_search_fails(self, isolated_lexical_index):
+        isolated_lexical_index.add(CORPUS)
+        store = Mock()
+        store.search = AsyncMock(side_effect=RuntimeError("Atlas unavailable"))
+
+        results = asyncio.run(search_papers("IL-6 inflammation", store, top_k=2, query_embedding=[0.1]))
+
+        assert results[0]["arxiv_id"] == "c"
+
+    def test_uses_lexical_only_without_query_embedding(self, isolated_lexical_index):
+        isolated_lexical_index.add(CORPUS)
+        store = Mock()
+        store.search = AsyncMock()
+
+        results = asyncio.run(search_papers("BRCA1", store, top_k=2, embed_if_missing=False))
+
+        assert results[0]["arxiv_id"] == "b"
+        store.search.assert_not_called()
+
+    def test_drops_lexical_only_matches_on_common_terms(self, isolated_lexical_index):
+        isolated_lexical_index.add(CORPUS + [
+            chunk(f"filler-{i}", f"This study followed patients for {i} months.") for i in range(200)
+        ])
+        store = Mock()
+        store.search = AsyncMock(return_value=[])
+
+        off_topic = asyncio.run(search_papers("study on patients commuting", store, top_k=2, query_embedding=[0.1]))
+        rare = asyncio.run(search_papers("study of BRCA1 patients", store, top_k=2, query_embedding=[0.1]))
+
+        assert off_topic == []
+        assert [doc["arxiv_id"] for doc in rare] == ["b"]
+
+    def test_degraded_mode_keeps_term_repeated_by_chunk_overlap(self, isolated_lexical_index):
+        overlapping = [
+            {**chunk("e", "Mitophagy clears damaged mitochondria. PINK1 recruits parkin to them."), "chunk_index": 0},
+            {**chunk("e", "PINK1 recruits parkin to them. Loss of PINK1 causes early-onset Parkinson's."),
+             "chunk_index": 1, "content_hash": "hash-e-1"},
+        ]
+        isolated_lexical_index.add(CORPUS + overlapping)
+        store = Mock()
+        store.search = AsyncMock(side_effect=RuntimeError("Ollama unavailable"))
+
+        results = asyncio.run(search_papers("PINK1 parkin", store, top_k=2, query_embedding=[0.1]))
+
+        assert [doc["arxiv_id"] for doc in results] == ["e"]
+        assert results[0]["chunk_spans"] == [(0, 1)]
+
+    def test_keeps_common_term_matches_confirmed_by_vector_search(self, isolated_lexical_index):
+        isolated_lexical_index.add(CORPUS + [
+            chunk(f"filler-{i}", f"This study followed patients for {i} months.") for i in range(200)
+        ])
+        store = Mock()
+        store.search = AsyncMock(return_value=[chunk("filler-7", "", score=0.9), chunk("a", "", score=0.85)])
+
+        results = asyncio.run(search_papers("study of patients", store, top_k=2, query_embedding=[0.1]))
+
+        assert [doc["arxiv_id"] for doc in results] == ["filler-7", "a"]
+
+    def test_stays_dense_only_with_empty_index(self):
+        store = Mock()
+        store.search = AsyncMock(side_effect=RuntimeError("Atlas unavailable"))
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(search_papers("BRCA1", store, top_k=2, query_embedding=[0.1]))
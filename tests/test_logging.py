@@ -0,0 +1,122 @@
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.logging import (
+    ContextFilter, NonBlockingQueueHandler, JsonFormatter, RequestIdMiddleware,
+    get_logger, request_id_var, job_id_var
+)
+
+
+def capture_logger(name, sample_every=None, maxsize=0):
+    """A logger wired like setup_logger, writing JSON lines to a StringIO."""
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(maxsize=maxsize)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(ContextFilter(sample_every))
+
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, handler, QueueListener(log_queue, output), stream
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestStructuredLogging:
+
+    def test_writes_json_off_thread(self):
+        logger, _, listener, stream = capture_logger("test_logging.json")
+        listener.start()
+        logger.info("Fetched %d papers", 3, extra={"query": "sepsis"})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed")
+        listener.stop()
+
+        first, second = lines(stream)
+        assert first["message"] == "Fetched 3 papers"
+        assert first["level"] == "INFO"
+        assert first["logger"] == "test_logging.json"
+        assert first["query"] == "sepsis"
+        assert "request_id" not in first
+        assert "ValueError: boom" in second["exc"]
+
+    def test_attaches_correlation_ids(self):
+        logger, _, listener, stream = capture_logger("test_logging.ids")
+        request_token = request_id_var.set("req-1")
+        job_token = job_id_var.set("job-1")
+        try:
+            logger.info("Working")
+        finally:
+            request_id_var.reset(request_token)
+            job_id_var.reset(job_token)
+        listener.start()
+        listener.stop()
+
+        [entry] = lines(stream)
+        assert entry["request_id"] == "req-1"
+        assert entry["job_id"] == "job-1"
+
+    def test_samples_high_volume_events(self):
+        logger, _, listener, stream = capture_logger("test_logging.sampling", {"chunks_created": 10})
+        for i in range(25):
+            logger.info(f"Created chunks for paper {i}", extra={"event": "chunks_created"})
+        logger.info("Done")
+        listener.start()
+        listener.stop()
+
+        entries = lines(stream)
+        assert [entry["message"] for entry in entries] == [
+            "Created chunks for paper 0", "Created chunks for paper 10", "Created chunks for paper 20", "Done"
+        ]
+        assert entries[0]["sampled_every"] == 10
+
+    def test_drops_records_instead_of_blocking(self):
+        logger, handler, listener, stream = capture_logger("test_logging.full", maxsize=2)
+        for i in range(5):
+            logger.info(f"Record {i}")
+        listener.start()
+        listener.stop()
+
+        assert handler.dropped == 3
+        assert [entry["message"] for entry in lines(stream)] == ["Record 0", "Record 1"]
+
+    def test_module_loggers_are_children_of_app_logger(self):
+        assert get_logger("app.services.ingestion").name == "medical_rag.services.ingestion"
+        assert get_logger("benchmarks.retrieval").name == "medical_rag.benchmarks.retrieval"
+
+
+class TestRequestIdMiddleware:
+
+    def build_app(self):
+        demo = FastAPI()
+        demo.add_middleware(RequestIdMiddleware)
+
+        @demo.get("/whoami")
+        async def whoami():
+            return {"request_id": request_id_var.get()}
+
+        return TestClient(demo)
+
+    def test_generates_request_id(self):
+        response = self.build_app().get("/whoami")
+
+        assert response.headers["x-request-id"] == response.json()["request_id"]
+        assert len(response.headers["x-request-id"]) == 32
+
+    def test_reuses_incoming_request_id(self):
+        response = self.build_app().get("/whoami", headers={"X-Request-ID": "abc-123"})
+
+        assert response.headers["x-request-id"] == "abc-123"
+        assert response.json()["request_id"] == "abc-123"
@@ -0,0 +1,110 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.metrics import (
+    Counter, Gauge, Histogram, Registry, MetricsMiddleware, STAGE_SECONDS, STAGE_IN_PROGRESS,
+    STAGE_ERRORS, LLM_TOKENS, LLM_TOKENS_PER_SECOND, timed, record_llm_usage, server_timing
+)
+from app.main import app
+
+
+class TestMetricTypes:
+
+    def test_renders_histogram_buckets_cumulatively(self):
+        histogram = Histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage="search")
+        histogram.observe(0.5, stage="search")
+        histogram.observe(5, stage="search")
+
+        lines = histogram.render()
+
+        assert 'latency_seconds_bucket{stage="search",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{stage="search",le="1"} 2' in lines
+        assert 'latency_seconds_bucket{stage="search",le="+Inf"} 3' in lines
+        assert 'latency_seconds_count{stage="search"} 3' in lines
+        assert "# TYPE latency_seconds histogram" in lines
+
+    def test_counters_gauges_and_label_escaping(self):
+        registry = Registry()
+        counter = registry.register(Counter("requests_total", "Requests", ("route",)))
+        gauge = registry.register(Gauge("in_flight", "In flight"))
+        counter.inc(route='say "hi"')
+        counter.inc(2, route='say "hi"')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        text = registry.render()
+
+        assert 'requests_total{route="say \\"hi\\""} 3' in text
+        assert "in_flight 1" in text
+
+
+class TestTimed:
+
+    def test_records_duration_and_restores_in_flight_gauge(self):
+        before = STAGE_SECONDS.count(stage="test_stage")
+
+        with timed("test_stage"):
+            assert STAGE_IN_PROGRESS.value(stage="test_stage") == 1
+
+        assert STAGE_SECONDS.count(stage="test_stage") == before + 1
+        assert STAGE_IN_PROGRESS.value(stage="test_stage") == 0
+
+    def test_counts_errors(self):
+        before = STAGE_ERRORS.value(stage="failing_stage")
+
+        with pytest.raises(RuntimeError):
+            with timed("failing_stage"):
+                raise RuntimeError("boom")
+
+        assert STAGE_ERRORS.value(stage="failing_stage") == before + 1
+
+    def test_records_llm_tokens_and_speed(self):
+        before = LLM_TOKENS.value(model="test-llm", kind="completion")
+
+        record_llm_usage("test-llm", {"prompt_eval_count": 300, "eval_count": 50, "eval_duration": 2_000_000_000})
+
+        assert LLM_TOKENS.value(model="test-llm", kind="completion") == before + 50
+        assert LLM_TOKENS.value(model="test-llm", kind="prompt") >= 300
+        assert 'rag_llm_tokens_per_second_bucket{model="test-llm",le="40"} 1' in LLM_TOKENS_PER_SECOND.render()
+
+
+class TestServerTiming:
+
+    def test_adds_stage_timings_to_response(self):
+        demo = FastAPI()
+        demo.add_middleware(MetricsMiddleware)
+
+        @demo.get("/work")
+        async def work():
+            with timed("embedding"):
+                pass
+            with timed("vector_search"):
+                pass
+            return {"ok": True}
+
+        response = TestClient(demo).get("/work")
+        header = response.headers["server-timing"]
+
+        assert header.startswith("embedding;dur=")
+        assert "vector_search;dur=" in header
+        assert "total;dur=" in header
+
+    def test_formats_header(self):
+        assert server_timing({"embedding": 0.0123}, 0.05) == "embedding;dur=12.3, total;dur=50.0"
+
+
+class TestMetricsEndpoint:
+
+    def test_exposes_prometheus_text(self):
+        client = TestClient(app)
+        client.get("/health")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'rag_http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+        assert 'rag_cache_hit_ratio{cache="embedding"}' in response.text
+        assert "server-timing" in response.headers
@@ -0,0 +1,69 @@
+import asyncio
+from pathlib import Path
+from app.services.paper import AtomEntryParser, iter_entries, parse_response
+
+
+SAMPLE_FEED = Path(__file__).resolve().parent.parent / "sample_xml.xml"
+
+
+class TestAtomParsing:
+
+    def test_parses_sample_feed(self):
+        papers = parse_response(SAMPLE_FEED.read_text(encoding="utf-8"))
+        
+        assert len(papers) == 10
+        assert papers[0].arxiv_id == "1002.1184"
+        assert papers[0].version == 1
+        assert papers[0].updated >= papers[0].published
+        assert papers[0].title.startswith("Implementation of an Innovative Bio Inspired")
+        assert papers[0].authors
+        assert papers[0].categories
+        assert "  " not in papers[0].abstract
+    
+    def test_incremental_parse_matches_full_parse(self):
+        data = SAMPLE_FEED.read_bytes()
+        parser = AtomEntryParser()
+        
+        papers = []
+        for i in range(0, len(data), 97):
+            papers.extend(parser.feed(data[i:i + 97]))
+        papers.extend(parser.close())
+        
+        assert papers == parse_response(data.decode("utf-8"))
+    
+    def test_yields_entries_before_feed_ends(self):
+        data = SAMPLE_FEED.read_bytes()
+        first_entry_end = data.index(b"</entry>") + len(b"</entry>")
+        
+        parser = AtomEntryParser()
+        
+        assert len(parser.feed(data[:first_entry_end])) == 1
+    
+    def test_releases_finished_entries(self):
+        parser = AtomEntryParser()
+        parser.feed(SAMPLE_FEED.read_bytes())
+        
+        assert parser._root.findall("{http://www.w3.org/2005/Atom}entry") == []
+    
+    def test_skips_malformed_entries(self):
+        feed = (
+            '<feed xmlns="http://www.w3.org/2005/Atom">'
+            '<entry><id>http://arxiv.org/abs/1</id></entry>'
+            '</feed>'
+        )
+        
+        assert parse_response(feed) == []
+    
+    def test_iterates_async_byte_stream(self):
+        data = SAMPLE_FEED.read_bytes()
+        
+        async def chunks():
+            for i in range(0, len(data), 512):
+                yield data[i:i + 512]
+        
+        async def run():
+            return [paper async for paper in iter_entries(chunks())]
+        
+        papers = asyncio.run(run())
+        
+        assert [p.arxiv_id for p in papers] == [p.arxiv_id for p in parse_response(data.decode("utf-8"))]
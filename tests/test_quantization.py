@@ -0,0 +1,126 @@
+import asyncio
+import numpy as np
+import pytest
+from bson.binary import Binary
+from unittest.mock import Mock
+from app.db.local_vector_store import LocalVectorStore
+from app.db.quantization import (
+    quantize_int8, encode_embedding, decode_embedding, binary_codes, hamming_distances
+)
+from app.db.vector_store import AtlasVectorStore
+from tests.test_vector_store import make_docs, random_vectors
+
+
+class TestQuantization:
+
+    def test_int8_keeps_cosine_similarity(self):
+        vectors = random_vectors(50, dim=256)
+        quantized = np.array([quantize_int8(v) for v in vectors], dtype=np.float32)
+
+        def cosine(m):
+            m = m / np.linalg.norm(m, axis=1, keepdims=True)
+            return m @ m.T
+
+        assert np.abs(cosine(vectors) - cosine(quantized)).max() < 0.02
+
+    def test_encodes_packed_binary_vectors(self):
+        vector = [0.5, -0.25, 0.125, 0.0]
+
+        float32 = encode_embedding(vector, "float32")
+        int8 = encode_embedding(vector, "int8")
+
+        assert isinstance(float32, Binary)
+        assert decode_embedding(float32) == vector
+        assert decode_embedding(int8) == [127.0, -64.0, 32.0, 0.0]
+        assert encode_embedding(vector, "array") is vector
+        assert encode_embedding(int8, "int8") is int8
+
+    def test_rejects_unknown_storage(self):
+        with pytest.raises(ValueError):
+            encode_embedding([0.1], "float16")
+
+    def test_storage_shrinks(self):
+        vector = random_vectors(1, dim=1024)[0]
+
+        assert len(encode_embedding(vector, "float32")) < 4 * 1024 + 8
+        assert len(encode_embedding(vector, "int8")) < 1024 + 8
+
+    def test_hamming_distance_counts_differing_signs(self):
+        codes = binary_codes(np.array([[1, 1, -1, -1], [-1, -1, 1, 1]], dtype=np.float32))
+        query = binary_codes(np.array([1, 1, -1, 1], dtype=np.float32))
+
+        assert hamming_distances(codes, query, block=1).tolist() == [1, 3]
+
+
+class TestAtlasQuantizedStorage:
+
+    def test_encodes_documents_and_query(self):
+        collection = Mock()
+        pipelines = []
+
+        async def insert_many(docs, ordered=False):
+            return Mock(inserted_ids=[1])
+
+        async def results():
+            yield {"arxiv_id": "a", "score": 0.9, "embedding": encode_embedding([0.5, -0.5], "int8")}
+
+        def aggregate(pipeline):
+            pipelines.append(pipeline)
+            return results()
+
+        collection.insert_many = insert_many
+        collection.aggregate = aggregate
+        store = AtlasVectorStore(collection, storage="int8")
+
+        docs = [{"arxiv_id": "a", "chunk_index": 0, "content_hash": "h", "embedding": [0.5, -0.5]}]
+        asyncio.run(store.insert_many(docs))
+        found = asyncio.run(store.search([0.5, -0.5], 1, 10, include_embeddings=True))
+
+        assert isinstance(docs[0]["embedding"], Binary)
+        assert isinstance(pipelines[0][0]["$vectorSearch"]["queryVector"], Binary)
+        assert found[0]["embedding"] == [127.0, -127.0]
+
+
+class TestBinaryLocalStore:
+
+    def test_rescored_results_match_exact_search(self):
+        # Clustered like real embeddings; top-k of isotropic noise is nearly arbitrary.
+        centers = random_vectors(40, dim=128, seed=1)
+        vectors = centers[np.arange(2000) % 40] + 0.5 * random_vectors(2000, dim=128)
+        docs = make_docs(vectors)
+        exact = LocalVectorStore(ivf_min_vectors=0)
+        binary = LocalVectorStore(ivf_min_vectors=0, quantization="binary", rescore_factor=4)
+        exact.insert_sync(make_docs(vectors))
+        binary.insert_sync(docs)
+
+        hits = 0
+        for query in vectors[:50] + 0.1:
+            expected = {doc["_id"] for doc in exact.search_sync(list(query), 10, 10)}
+            found = {doc["_id"] for doc in binary.search_sync(list(query), 10, 200)}
+            hits += len(expected & found)
+
+        assert binary._codes.shape == (2000, 16)
+        assert hits / 500 >= 0.9
+
+    def test_scores_are_full_precision(self):
+        vectors = random_vectors(100)
+        exact = LocalVectorStore(ivf_min_vectors=0)
+        binary = LocalVectorStore(ivf_min_vectors=0, quantization="binary")
+        exact.insert_sync(make_docs(vectors))
+        binary.insert_sync(make_docs(vectors))
+
+        assert binary.search_sync(list(vectors[3]), 1, 100) == exact.search_sync(list(vectors[3]), 1, 100)
+
+    def test_rebuilds_codes_on_load(self, tmp_path):
+        vectors = random_vectors(40)
+        store = LocalVectorStore(str(tmp_path), quantization="binary")
+        asyncio.run(store.insert_many(make_docs(vectors)))
+
+        reloaded = LocalVectorStore(str(tmp_path), quantization="binary")
+
+        assert np.array_equal(reloaded._codes, store._codes)
+        assert reloaded.search_sync(list(vectors[9]), 1, 4)[0]["arxiv_id"] == "paper-9"
+
+    def test_rejects_unknown_quantization(self):
+        with pytest.raises(ValueError):
+            LocalVectorStore(quantization="pq")
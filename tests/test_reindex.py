@@ -0,0 +1,230 @@
+import asyncio
+import zlib
+import numpy as np
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+from app.db.embedding_spaces import embedding_spaces, new_space, default_space
+from app.db.local_vector_store import LocalVectorStore
+from app.db.vector_store import AtlasVectorStore
+from app.services.embedding import generate_embedding
+from app.services.embedding_cache import EmbeddingCache
+from app.services.ingestion import embed_chunk_docs
+from app.services.reindex import Reindexer
+from tests.test_vector_store import make_docs, random_vectors
+
+
+NEW_DIM = 6
+
+
+def new_model_vector(text):
+    """Deterministic stand-in for the new model: a different size than the stored vectors."""
+    rng = np.random.default_rng(zlib.crc32(text.encode()))
+    return rng.normal(size=NEW_DIM).tolist()
+
+
+async def fake_embed(texts, model=None, version=None):
+    if model != "new-model":
+        return random_vectors(len(texts)).tolist()
+    return [new_model_vector(text) for text in texts]
+
+
+def reindex(store, switch=True, batch_size=7):
+    target = new_space("new-model", dimensions=NEW_DIM)
+    reindexer = Reindexer(store, target, batch_size=batch_size, switch=switch)
+    with patch('app.services.reindex.generate_embeddings_batch', side_effect=fake_embed):
+        asyncio.run(reindexer.run())
+    return reindexer
+
+
+class TestLocalReindex:
+
+    def setup_method(self):
+        embedding_spaces.active = None
+        embedding_spaces.target = None
+
+    teardown_method = setup_method
+
+    def test_switches_search_to_new_model(self):
+        store = LocalVectorStore(ivf_min_vectors=0)
+        asyncio.run(store.insert_many(make_docs(random_vectors(30))))
+
+        reindexer = reindex(store)
+
+        assert reindexer.chunks_embedded == 30
+        assert store.space.name == "new_model_v1"
+        assert store.dim == NEW_DIM
+        assert embedding_spaces.current().name == "new_model_v1"
+        assert embedding_spaces.target is None
+
+        results = asyncio.run(store.search(new_model_vector("chunk 12"), top_k=1, num_candidates=30))
+        assert results[0]["arxiv_id"] == "paper-12"
+        assert results[0]["score"] > 0.99
+
+    def test_keeps_old_space_until_switch(self):
+        store = LocalVectorStore(ivf_min_vectors=0)
+        vectors = random_vectors(10)
+        asyncio.run(store.insert_many(make_docs(vectors)))
+
+        reindex(store, switch=False)
+
+        assert store.space.name == default_space().name
+        assert asyncio.run(store.count_embeddings(new_space("new-model"))) == (10, 10)
+        results = asyncio.run(store.search(list(vectors[3]), top_k=1, num_candidates=10))
+        assert results[0]["arxiv_id"] == "paper-3"
+
+    def test_refuses_switch_before_full_coverage(self):
+        store = LocalVectorStore(ivf_min_vectors=0)
+        asyncio.run(store.insert_many(make_docs(random_vectors(10))))
+        target = new_space("new-model", dimensions=NEW_DIM)
+        asyncio.run(store.begin_space(target))
+        docs = asyncio.run(store.missing_embeddings(target, 4))
+        asyncio.run(store.add_embeddings(target, docs, asyncio.run(fake_embed([d["chunk_text"] for d in docs], "new-model"))))
+
+        assert asyncio.run(store.count_embeddings(target)) == (4, 10)
+        with pytest.raises(ValueError, match="covers 4 of 10"):
+            asyncio.run(store.switch_space(target))
+
+    def test_ingestion_writes_both_spaces_while_caught_up(self):
+        store = LocalVectorStore(ivf_min_vectors=0)
+        asyncio.run(store.insert_many(make_docs(random_vectors(5))))
+        reindex(store, switch=False)
+        embedding_spaces.target = new_space("new-model", dimensions=NEW_DIM)
+
+        docs = make_docs(random_vectors(3, seed=1))
+        for i, doc in enumerate(docs):
+            doc.update(content_hash=f"new-{i}", chunk_text=f"new chunk {i}")
+            del doc["embedding"]
+
+        with patch('app.services.ingestion.generate_embeddings_batch', side_effect=fake_embed):
+            asyncio.run(embed_chunk_docs(store, docs))
+        assert all("new_model_v1" in doc["embeddings"] for doc in docs)
+
+        asyncio.run(store.insert_many(docs))
+        assert asyncio.run(store.count_embeddings(embedding_spaces.target)) == (8, 8)
+        assert asyncio.run(store.missing_embeddings(embedding_spaces.target, 10)) == []
+
+    def test_resumes_and_persists_switch_on_disk(self, tmp_path):
+        store = LocalVectorStore(str(tmp_path), ivf_min_vectors=0)
+        asyncio.run(store.insert_many(make_docs(random_vectors(20))))
+        target = new_space("new-model", dimensions=NEW_DIM)
+        asyncio.run(store.begin_space(target))
+        docs = asyncio.run(store.missing_embeddings(target, 8))
+        asyncio.run(store.add_embeddings(target, docs, asyncio.run(fake_embed([d["chunk_text"] for d in docs], "new-model"))))
+
+        reopened = LocalVectorStore(str(tmp_path), ivf_min_vectors=0)
+        assert asyncio.run(reopened.load_spaces()) == (None, target)
+        assert asyncio.run(reopened.count_embeddings(target)) == (8, 20)
+
+        reindexer = reindex(reopened)
+        assert reindexer.chunks_embedded == 12
+
+        switched = LocalVectorStore(str(tmp_path), ivf_min_vectors=0)
+        active, pending = asyncio.run(switched.load_spaces())
+        assert active.name == "new_model_v1"
+        assert pending is None
+        assert switched.dim == NEW_DIM
+        results = asyncio.run(switched.search(new_model_vector("chunk 15"), top_k=1, num_candidates=20))
+        assert results[0]["arxiv_id"] == "paper-15"
+
+
+class TestReindexThroughEmbeddingCache:
+    """Runs the real embedding service and a SQLite cache; only the model server is faked."""
+
+    def setup_method(self):
+        embedding_spaces.active = None
+        embedding_spaces.target = None
+
+    teardown_method = setup_method
+
+    def test_new_version_of_same_model_is_embedded_again(self, tmp_path, monkeypatch):
+        cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"))
+        monkeypatch.setattr("app.services.embedding.embedding_cache", cache)
+        server = {"dim": 4, "calls": 0}
+
+        async def embed(model, input):
+            server["calls"] += 1
+            texts = [input] if isinstance(input, str) else input
+            return {"embeddings": [
+                np.random.default_rng(zlib.crc32(text.encode())).normal(size=server["dim"]).tolist()
+                for text in texts
+            ]}
+
+        client = Mock()
+        client.embed = embed
+        store = LocalVectorStore(ivf_min_vectors=0)
+        docs = make_docs(random_vectors(10))
+        for doc in docs:
+            del doc["embedding"]
+
+        with patch('app.services.embedding.ollama_client.get_client', return_value=client):
+            asyncio.run(embed_chunk_docs(store, docs))
+            asyncio.run(store.insert_many(docs))
+
+            # The model behind the same name now produces different vectors.
+            server.update(dim=NEW_DIM, calls=0)
+            target = new_space(store.space.model, 2)
+            asyncio.run(Reindexer(store, target, batch_size=4).run())
+            assert server["calls"] > 0
+            assert store.space.name == target.name
+            assert store.dim == NEW_DIM
+
+            query = asyncio.run(generate_embedding("chunk 7", model=target.model, version=target.version))
+            assert len(query) == NEW_DIM
+
+        results = asyncio.run(store.search(query, top_k=1, num_candidates=10))
+        assert results[0]["arxiv_id"] == "paper-7"
+        assert results[0]["score"] > 0.99
+        cache.close()
+
+
+class TestAtlasEmbeddingSpaces:
+
+    def test_inserts_vectors_under_space_paths(self):
+        collection = Mock()
+        collection.insert_many = AsyncMock()
+        store = AtlasVectorStore(collection, space=new_space("new-model"))
+        doc = {"chunk_text": "text", "embedding": [0.1, 0.2], "embeddings": {"other_v2": [0.3]}}
+
+        with patch('app.db.vector_store.lexical_index'):
+            asyncio.run(store.insert_many([doc]))
+
+        assert "embedding" not in doc
+        assert doc["embeddings"] == {"new_model_v1": [0.1, 0.2], "other_v2": [0.3]}
+
+    def test_switch_is_guarded_on_target(self):
+        collection = Mock()
+        spaces = Mock()
+        spaces.find_one_and_update = AsyncMock(return_value=None)
+        store = AtlasVectorStore(collection, spaces=spaces)
+        target = new_space("new-model", dimensions=NEW_DIM)
+
+        with patch('app.db.vector_store.wait_until_queryable', AsyncMock()), \
+             pytest.raises(RuntimeError, match="no longer the re-embed target"):
+            asyncio.run(store.switch_space(target))
+
+        query, update = spaces.find_one_and_update.call_args[0]
+        assert query == {"_id": "embedding_spaces", "target.name": "new_model_v1"}
+        assert update["$set"]["active"]["path"] == "embeddings.new_model_v1"
+        assert store.space.path == "embedding"
+
+    def test_reads_missing_chunks_after_last_id(self):
+        collection = Mock()
+        cursor = Mock()
+        cursor.sort.return_value = cursor
+        cursor.limit.return_value = cursor
+        cursor.__aiter__ = lambda self: _iterate([{"_id": 5, "chunk_text": "text"}])
+        collection.find.return_value = cursor
+        store = AtlasVectorStore(collection)
+
+        docs = asyncio.run(store.missing_embeddings(new_space("new-model"), 100, after=4))
+
+        assert docs == [{"_id": 5, "chunk_text": "text"}]
+        collection.find.assert_called_once_with(
+            {"embeddings.new_model_v1": {"$exists": False}, "_id": {"$gt": 4}}, {"chunk_text": 1}
+        )
+        cursor.limit.assert_called_once_with(100)
+
+
+async def _iterate(docs):
+    for doc in docs:
+        yield doc
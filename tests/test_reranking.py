@@ -0,0 +1,174 @@
+import asyncio
+from unittest.mock import patch
+from app.db.local_vector_store import LocalVectorStore
+from app.services.reranking import rerank, mmr_order, collapse_by_paper, merge_overlap
+from app.services.retrieval import search_papers
+from app.api.routes.query import retrieved_chunk_ids
+
+
+def chunk(arxiv_id, index, text, score, embedding=None):
+    doc = {
+        "_id": f"{arxiv_id}-{index}",
+        "arxiv_id": arxiv_id,
+        "version": 1,
+        "title": f"Paper {arxiv_id}",
+        "chunk_text": text,
+        "chunk_index": index,
+        "content_hash": f"{arxiv_id}-{index}",
+        "score": score
+    }
+    if embedding is not None:
+        doc["embedding"] = embedding
+    return doc
+
+
+class TestMMR:
+
+    def test_demotes_near_duplicates(self):
+        candidates = [
+            chunk("a", 0, "x", 0.95, [1.0, 0.0, 0.0]),
+            chunk("a", 1, "x", 0.94, [0.99, 0.01, 0.0]),
+            chunk("b", 0, "y", 0.90, [0.0, 1.0, 0.0]),
+            chunk("c", 0, "z", 0.50, [0.0, 0.0, 1.0]),
+        ]
+
+        order = mmr_order(candidates, lambda_=0.7)
+
+        assert [doc["_id"] for doc in order] == ["a-0", "b-0", "a-1", "c-0"]
+
+    def test_pure_relevance_keeps_score_order(self):
+        candidates = [
+            chunk("a", 0, "x", 0.95, [1.0, 0.0]),
+            chunk("a", 1, "x", 0.94, [1.0, 0.0]),
+            chunk("b", 0, "y", 0.90, [0.0, 1.0]),
+        ]
+
+        assert mmr_order(candidates, lambda_=1.0) == candidates
+
+    def test_lexical_only_candidates_keep_their_rank(self):
+        candidates = [
+            chunk("a", 0, "x", 0.50, [1.0, 0.0]),
+            chunk("a", 1, "x", 0.49, [1.0, 0.0]),
+            chunk("c", 0, "z", 0.45),
+            chunk("b", 0, "y", 0.40, [0.0, 1.0]),
+        ]
+
+        order = mmr_order(candidates, lambda_=0.5)
+
+        assert [doc["_id"] for doc in order] == ["a-0", "b-0", "c-0", "a-1"]
+
+    def test_rescales_narrow_fused_scores(self):
+        # RRF-style scores: without rescaling, a 0.12 relevance gap is outweighed
+        # by a 0.2 cosine overlap and the far less relevant chunk is picked second.
+        candidates = [
+            chunk("a", 0, "x", 0.50, [1.0, 0.0, 0.0]),
+            chunk("a", 1, "x", 0.49, [0.2, 0.98, 0.0]),
+            chunk("b", 0, "y", 0.38, [0.0, 0.0, 1.0]),
+        ]
+
+        order = mmr_order(candidates, lambda_=0.5)
+
+        assert [doc["_id"] for doc in order] == ["a-0", "a-1", "b-0"]
+
+    def test_equal_scores_order_by_diversity(self):
+        candidates = [
+            chunk("a", 0, "x", 0.5, [1.0, 0.0]),
+            chunk("a", 1, "x", 0.5, [1.0, 0.0]),
+            chunk("b", 0, "y", 0.5, [0.0, 1.0]),
+        ]
+
+        assert [doc["_id"] for doc in mmr_order(candidates, lambda_=0.5)] == ["a-0", "b-0", "a-1"]
+
+
+class TestCollapseByPaper:
+
+    def test_merges_adjacent_chunks_without_overlap(self):
+        docs = [
+            chunk("a", 1, "degradation pathway. It regulates homeostasis.", 0.8),
+            chunk("a", 0, "Autophagy is a lysosomal degradation pathway.", 0.9),
+        ]
+
+        merged = collapse_by_paper(docs)
+
+        assert len(merged) == 1
+        assert merged[0]["chunk_text"] == "Autophagy is a lysosomal degradation pathway. It regulates homeostasis."
+        assert merged[0]["chunk_spans"] == [(0, 1)]
+        assert merged[0]["chunk_ids"] == ["a-0", "a-1"]
+        assert merged[0]["score"] == 0.9
+
+    def test_joins_separate_spans_and_keeps_paper_order(self):
+        docs = [
+            chunk("b", 0, "First of b.", 0.9),
+            chunk("a", 0, "Only a.", 0.85),
+            chunk("b", 3, "Later in b.", 0.8),
+        ]
+
+        merged = collapse_by_paper(docs)
+
+        assert [doc["arxiv_id"] for doc in merged] == ["b", "a"]
+        assert merged[0]["chunk_text"] == "First of b. … Later in b."
+        assert merged[0]["chunk_spans"] == [(0, 0), (3, 3)]
+        assert "chunk_spans" not in merged[1]
+
+    def test_takes_fields_from_best_chunk(self):
+        docs = [
+            chunk("a", 1, "Second chunk.", 0.7),
+            chunk("b", 0, "Only b.", 0.8),
+            chunk("a", 0, "First chunk.", 0.9),
+        ]
+
+        merged = collapse_by_paper(docs)
+
+        assert [doc["arxiv_id"] for doc in merged] == ["a", "b"]
+        assert merged[0]["_id"] == "a-0"
+        assert merged[0]["content_hash"] == "a-0"
+        assert merged[0]["score"] == 0.9
+
+    def test_merge_overlap_falls_back_to_space(self):
+        assert merge_overlap("first part", "second part") == "first part second part"
+
+
+class TestRerank:
+
+    def test_enforces_token_budget(self):
+        candidates = [
+            chunk("a", 0, "x" * 400, 0.9),
+            chunk("b", 0, "y" * 400, 0.85),
+            chunk("c", 0, "z" * 40, 0.8),
+        ]
+
+        results = rerank(candidates, None, top_k=3, max_tokens=120)
+
+        assert [doc["arxiv_id"] for doc in results] == ["a", "c"]
+
+    def test_drops_embeddings_from_results(self):
+        results = rerank([chunk("a", 0, "x", 0.9, [1.0, 0.0])], [1.0, 0.0], top_k=1)
+
+        assert "embedding" not in results[0]
+
+    def test_collapsed_entries_expand_to_chunk_ids(self):
+        docs = collapse_by_paper([chunk("a", 0, "x", 0.9), chunk("a", 1, "y", 0.8), chunk("b", 0, "z", 0.7)])
+
+        assert retrieved_chunk_ids(docs) == ["a-0", "a-1", "b-0"]
+
+
+class TestSearchPapersReranking:
+
+    def test_prefers_distinct_papers_from_local_store(self):
+        store = LocalVectorStore()
+        docs = [
+            chunk("a", 0, "autophagy one", 0, [1.0, 0.0, 0.0]),
+            chunk("a", 2, "autophagy two", 0, [0.98, 0.02, 0.0]),
+            chunk("b", 0, "apoptosis", 0, [0.6, 0.8, 0.0]),
+            chunk("c", 0, "unrelated", 0, [0.0, 0.0, 1.0]),
+        ]
+        for doc in docs:
+            doc.pop("_id")
+            doc.pop("score")
+        asyncio.run(store.insert_many(docs))
+
+        with patch('app.services.retrieval.configs.min_score', 0.0), \
+             patch('app.services.retrieval.configs.hybrid_search_enabled', False):
+            results = asyncio.run(search_papers("autophagy", store, top_k=2, query_embedding=[1.0, 0.3, 0.0]))
+
+        assert [doc["arxiv_id"] for doc in results] == ["a", "b"]
@@ -92,6 +92,31 @@ class TestQueryRequest:
         )
         request = QueryRequest(case_description=long_query)
         assert len(request.case_description) > 100
+    
+    def test_accepts_metadata_filters(self):
+        request = QueryRequest(
+            case_description="What are the mechanisms of autophagy in cancer cells?",
+            categories=["q-bio.CB"],
+            published_from="2022-01-01",
+            arxiv_ids=["2301.12345"]
+        )
+        assert request.published_from == datetime(2022, 1, 1)
+        assert request.published_to is None
+    
+    def test_filters_by_base_arxiv_ids(self):
+        request = QueryRequest(
+            case_description="What are the mechanisms of autophagy in cancer cells?",
+            arxiv_ids=["2301.12345v2", "2301.12345", "arXiv:q-bio/0401001v1"]
+        )
+        assert request.arxiv_ids == ["2301.12345", "q-bio/0401001"]
+    
+    def test_rejects_inverted_date_range(self):
+        with pytest.raises(ValidationError):
+            QueryRequest(
+                case_description="What are the mechanisms of autophagy in cancer cells?",
+                published_from="2023-01-01",
+                published_to="2022-01-01"
+            )
 
 
 class TestReferenceSchema:
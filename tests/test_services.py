@@ -1,30 +1,39 @@
+import asyncio
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
-from app.services.embedding import generate_embedding
+from datetime import datetime
+from app.models.schema import Paper, IngestCheckpoint
+from app.services.paper import ARXIV_QUERY
+from app.services.embedding import generate_embedding, generate_embeddings_batch
+from app.services.ingestion import IngestionPipeline
+from app.db.vector_store import AtlasVectorStore
+from app.utils.chunking import estimate_tokens
 from app.services.generation import (
     build_context, 
     create_prompt, 
-    generate_answer
+    SYSTEM_PROMPT,
+    generate_answer,
+    stream_answer
 )
 
 
 class TestEmbeddingService:    
     
-    @patch('app.services.embedding.ollama.Client')
+    @patch('app.services.embedding.ollama_client.get_client')
     def test_calls_correct_model(self, mock_client):
         mock_instance = Mock()
-        mock_instance.embeddings.return_value = {"embedding": [0.1] * 1024}
+        mock_instance.embed = AsyncMock(return_value={"embeddings": [[0.1] * 1024]})
         mock_client.return_value = mock_instance
         
-        generate_embedding("test")
+        asyncio.run(generate_embedding("test"))
         
-        call_kwargs = mock_instance.embeddings.call_args[1]
+        call_kwargs = mock_instance.embed.call_args[1]
         assert call_kwargs['model'] == 'mxbai-embed-large'
     
-    @patch('app.services.embedding.ollama.Client')
+    @patch('app.services.embedding.ollama_client.get_client')
     def test_handles_scientific_text(self, mock_client):
         mock_instance = Mock()
-        mock_instance.embeddings.return_value = {"embedding": [0.1] * 1024}
+        mock_instance.embed = AsyncMock(return_value={"embeddings": [[0.1] * 1024]})
         mock_client.return_value = mock_instance
         
         scientific_text = (
@@ -33,20 +42,347 @@ class TestEmbeddingService:
             "and homeostasis."
         )
         
-        result = generate_embedding(scientific_text)
+        result = asyncio.run(generate_embedding(scientific_text))
         
-        call_kwargs = mock_instance.embeddings.call_args[1]
-        assert call_kwargs['prompt'] == scientific_text
+        call_kwargs = mock_instance.embed.call_args[1]
+        assert call_kwargs['input'] == scientific_text
         assert len(result) == 1024
     
-    @patch('app.services.embedding.ollama.Client')
+    @patch('app.services.embedding.ollama_client.get_client')
     def test_raises_on_ollama_failure(self, mock_client):
         mock_instance = Mock()
-        mock_instance.embeddings.side_effect = Exception("Ollama connection failed")
+        mock_instance.embed = AsyncMock(side_effect=Exception("Ollama connection failed"))
         mock_client.return_value = mock_instance
         
         with pytest.raises(Exception) as exc_info:
-            generate_embedding("test")
+            asyncio.run(generate_embedding("test"))
+        
+        assert "Ollama" in str(exc_info.value)
+
+
+class TestEmbeddingBatch:
+    
+    @patch('app.services.embedding.ollama_client.get_client')
+    def test_sends_multi_input_batches(self, mock_get_client):
+        mock_instance = Mock()
+        mock_instance.embed = AsyncMock(
+            side_effect=lambda model, input: {"embeddings": [[float(len(t))] for t in input]}
+        )
+        mock_get_client.return_value = mock_instance
+        
+        texts = ["a" * i for i in range(1, 8)]
+        result = asyncio.run(generate_embeddings_batch(texts, batch_size=3))
+        
+        assert mock_instance.embed.call_count == 3
+        batch_sizes = [len(call[1]['input']) for call in mock_instance.embed.call_args_list]
+        assert batch_sizes == [3, 3, 1]
+        assert result == [[float(i)] for i in range(1, 8)]
+    
+    @patch('app.services.embedding.ollama_client.get_client')
+    def test_bounds_requests_in_flight(self, mock_get_client):
+        in_flight = 0
+        peak = 0
+        
+        async def fake_embed(model, input):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"embeddings": [[0.1] for _ in input]}
+        
+        mock_instance = Mock()
+        mock_instance.embed = fake_embed
+        mock_get_client.return_value = mock_instance
+        
+        texts = [f"text {i}" for i in range(20)]
+        result = asyncio.run(generate_embeddings_batch(texts, batch_size=2, max_concurrency=3))
+        
+        assert len(result) == 20
+        assert peak == 3
+    
+    def test_empty_input_skips_server(self):
+        assert asyncio.run(generate_embeddings_batch([])) == []
+
+
+def make_paper(arxiv_id: str, abstract: str = "Autophagy is a lysosomal degradation pathway.") -> Paper:
+    return Paper(
+        arxiv_id=arxiv_id,
+        title=f"Paper {arxiv_id}",
+        authors=["John Doe"],
+        published=datetime(2023, 1, 15),
+        categories=["q-bio.TO"],
+        abstract=abstract
+    )
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+def make_chunk_collection(stored=None):
+    collection = Mock()
+    collection.stored = list(stored or [])
+    
+    async def insert_many(docs, ordered=True):
+        collection.stored.extend(docs)
+    
+    async def delete_many(query):
+        clauses = query["$or"]
+        kept = [doc for doc in collection.stored if not any(
+            # Like MongoDB, a null value also matches a missing field.
+            all(doc.get(field) == value for field, value in clause.items()) for clause in clauses
+        )]
+        result = Mock(deleted_count=len(collection.stored) - len(kept))
+        collection.stored = kept
+        return result
+    
+    collection.insert_many = AsyncMock(side_effect=insert_many)
+    collection.delete_many = AsyncMock(side_effect=delete_many)
+    collection.find = Mock(side_effect=lambda query, projection: FakeCursor([
+        {key: doc[key] for key in ("arxiv_id", "version", "chunk_index", "content_hash") if key in doc}
+        for doc in collection.stored
+        if doc["arxiv_id"] in query["arxiv_id"]["$in"]
+    ]))
+    return collection
+
+
+class FakeCheckpointStore:
+    def __init__(self, checkpoint=None):
+        self.checkpoint = checkpoint
+        self.saved = []
+    
+    async def load(self, query):
+        return self.checkpoint
+    
+    async def save(self, checkpoint):
+        self.saved.append(checkpoint.model_copy())
+        self.checkpoint = checkpoint.model_copy()
+
+
+class TestIngestionPipeline:
+    
+    def run_pipeline(self, pages, events=None, collection=None, embed_counter=None, **kwargs):
+        events = events if events is not None else []
+        offsets = []
+        budgets = {}
+        
+        async def fake_pages(max_results, start_offset=0, query=ARXIV_QUERY):
+            offsets.append(start_offset)
+            budgets[query] = max_results
+            for page_number, page in enumerate(pages, 1):
+                events.append(f"fetched page {page_number}")
+                yield start_offset + page_number * 50, page
+                await asyncio.sleep(0.01)
+        
+        async def fake_embed(texts, model=None, version=None):
+            events.append("embedded")
+            if embed_counter is not None:
+                embed_counter.extend(texts)
+            return [[0.1] * 4 for _ in texts]
+        
+        collection = collection or make_chunk_collection()
+        
+        with patch('app.services.ingestion.iter_paper_pages', fake_pages), \
+             patch('app.services.ingestion.generate_embeddings_batch', side_effect=fake_embed):
+            pipeline = IngestionPipeline(AtlasVectorStore(collection), max_papers=100, queue_size=2, **kwargs)
+            stats = asyncio.run(pipeline.run())
+        
+        pipeline.offsets = offsets
+        pipeline.budgets = budgets
+        return pipeline, stats, collection
+    
+    def test_stores_every_chunk(self):
+        pages = [[make_paper("1v1"), make_paper("2v1")], [make_paper("3v2")]]
+        pipeline, stats, collection = self.run_pipeline(pages)
+        
+        assert pipeline.papers_fetched == 3
+        assert pipeline.chunks_created == 3
+        assert stats.documents == 3
+        
+        assert sorted(doc["arxiv_id"] for doc in collection.stored) == ["1", "2", "3"]
+        assert all(doc["embedding"] == [0.1] * 4 for doc in collection.stored)
+        assert {doc["version"] for doc in collection.stored} == {1, 2}
+        assert all(len(doc["content_hash"]) == 64 for doc in collection.stored)
+    
+    def test_embeds_before_next_page_is_fetched(self):
+        events = []
+        pages = [[make_paper("1")], [make_paper("2")]]
+        self.run_pipeline(pages, events)
+        
+        assert events.index("embedded") < events.index("fetched page 2")
+    
+    def test_skips_stored_chunks_before_embedding(self):
+        pages = [[make_paper("1v1"), make_paper("2v1")]]
+        _, _, collection = self.run_pipeline(pages)
+        
+        embedded = []
+        pages = [[make_paper("1v1"), make_paper("2v1"), make_paper("3v1")]]
+        pipeline, stats, _ = self.run_pipeline(pages, collection=collection, embed_counter=embedded)
+        
+        assert pipeline.chunks_skipped == 2
+        assert stats.documents == 1
+        assert len(embedded) == 1
+        assert len(collection.stored) == 3
+    
+    def test_new_version_replaces_stored_chunks(self):
+        _, _, collection = self.run_pipeline([[make_paper("1v1")]])
+        
+        revised = make_paper("1v2", abstract="Autophagy is a lysosomal recycling pathway.")
+        pipeline, stats, _ = self.run_pipeline([[revised]], collection=collection)
+        
+        assert stats.documents == 1
+        assert [(doc["arxiv_id"], doc["version"]) for doc in collection.stored] == [("1", 2)]
+        assert collection.stored[0]["chunk_text"].endswith("recycling pathway.")
+    
+    def test_older_version_is_not_stored(self):
+        _, _, collection = self.run_pipeline([[make_paper("1v2")]])
+        
+        embedded = []
+        _, stats, _ = self.run_pipeline([[make_paper("1v1")]], collection=collection, embed_counter=embedded)
+        
+        assert stats.documents == 0
+        assert embedded == []
+        assert [doc["version"] for doc in collection.stored] == [2]
+    
+    def test_rechunked_version_replaces_stale_chunks(self):
+        _, _, collection = self.run_pipeline([[make_paper("1v1")]])
+        fresh = collection.stored[0]
+        # As stored by an earlier chunker or cleaning profile: same version, other boundaries.
+        collection.stored = [
+            {**fresh, "content_hash": "f" * 64},
+            {**fresh, "chunk_index": 1, "content_hash": "0" * 64}
+        ]
+        
+        embedded = []
+        _, stats, _ = self.run_pipeline([[make_paper("1v1")]], collection=collection, embed_counter=embedded)
+        
+        assert stats.documents == 1
+        assert len(embedded) == 1
+        assert [(doc["chunk_index"], doc["content_hash"]) for doc in collection.stored] == [
+            (0, fresh["content_hash"])
+        ]
+    
+    def test_replaces_chunks_stored_before_versions_and_hashes(self):
+        # Stored before versions and content hashes were tracked, as left by
+        # migrate_arxiv_ids: no content_hash, and no version without an ID suffix.
+        collection = make_chunk_collection([
+            {"arxiv_id": "1", "version": 1, "chunk_index": 0, "chunk_text": "old", "embedding": [0.2] * 4},
+            {"arxiv_id": "2", "chunk_index": 0, "chunk_text": "old", "embedding": [0.2] * 4},
+        ])
+        
+        _, stats, _ = self.run_pipeline([[make_paper("1v1"), make_paper("2v1")]], collection=collection)
+        
+        assert stats.documents == 2
+        assert sorted((doc["arxiv_id"], doc["version"]) for doc in collection.stored) == [("1", 1), ("2", 1)]
+        assert all(len(doc["content_hash"]) == 64 for doc in collection.stored)
+    
+    def test_revision_in_same_run_replaces_queued_chunks(self):
+        pages = [[make_paper("1v1")], [make_paper("1v2", abstract="A revised abstract.")]]
+        _, _, collection = self.run_pipeline(pages)
+        
+        assert [(doc["version"], doc["chunk_text"].split(": ")[-1]) for doc in collection.stored] == [
+            (2, "A revised abstract.")
+        ]
+    
+    def test_page_without_parsed_papers_does_not_end_run(self):
+        checkpoints = FakeCheckpointStore()
+        pipeline, stats, _ = self.run_pipeline([[], [make_paper("2")]], checkpoints=checkpoints)
+        
+        assert pipeline.papers_fetched == 1
+        assert stats.documents == 1
+        assert checkpoints.checkpoint.completed
+    
+    def test_records_checkpoint_per_page(self):
+        checkpoints = FakeCheckpointStore()
+        pages = [[make_paper("1")], [make_paper("2")]]
+        self.run_pipeline(pages, checkpoints=checkpoints)
+        
+        assert [c.next_start for c in checkpoints.saved[:2]] == [50, 100]
+        assert checkpoints.checkpoint.completed
+        assert checkpoints.checkpoint.newest_updated == datetime(2023, 1, 15)
+    
+    def test_resumes_from_interrupted_checkpoint(self):
+        checkpoints = FakeCheckpointStore(
+            IngestCheckpoint(query=ARXIV_QUERY, next_start=150, completed=False)
+        )
+        pipeline, _, _ = self.run_pipeline([[make_paper("4")]], checkpoints=checkpoints, resume=True)
+        
+        assert pipeline.offsets == [150]
+    
+    def test_incremental_stops_at_previous_watermark(self):
+        checkpoints = FakeCheckpointStore(IngestCheckpoint(
+            query=ARXIV_QUERY,
+            completed=True,
+            newest_updated=datetime(2023, 1, 10)
+        ))
+        old_paper = make_paper("1")
+        old_paper.updated = datetime(2023, 1, 5)
+        pages = [[make_paper("2"), old_paper], [make_paper("3")]]
+        
+        pipeline, _, _ = self.run_pipeline(pages, checkpoints=checkpoints, incremental=True)
+        
+        assert pipeline.papers_fetched == 1
+        assert checkpoints.checkpoint.completed
+    
+    def test_incremental_fetches_revised_old_papers(self):
+        checkpoints = FakeCheckpointStore(IngestCheckpoint(
+            query=ARXIV_QUERY,
+            completed=True,
+            newest_updated=datetime(2023, 1, 10)
+        ))
+        revised = make_paper("1v2")
+        revised.published = datetime(2022, 6, 1)
+        revised.updated = datetime(2023, 2, 1)
+        
+        pipeline, _, _ = self.run_pipeline([[revised]], checkpoints=checkpoints, incremental=True)
+        
+        assert pipeline.papers_fetched == 1
+        assert checkpoints.checkpoint.newest_updated == datetime(2023, 2, 1)
+    
+    def test_failed_page_freezes_checkpoint(self):
+        checkpoints = FakeCheckpointStore()
+        pages = [[make_paper("1")], None, [make_paper("3")]]
+        pipeline, stats, _ = self.run_pipeline(pages, checkpoints=checkpoints)
+        
+        assert stats.documents == 2
+        assert checkpoints.checkpoint.next_start == 50
+        assert not checkpoints.checkpoint.completed
+    
+    def test_fetches_every_query(self):
+        pages = [[make_paper("1"), make_paper("2")]]
+        pipeline, stats, collection = self.run_pipeline(pages, queries=["cat:q-bio.TO", "cat:q-bio.NC"])
+        
+        assert pipeline.offsets == [0, 0]
+        assert pipeline.papers_fetched == 4
+        assert len(collection.stored) == 2
+    
+    def test_splits_max_papers_across_queries(self):
+        queries = ["cat:q-bio.TO", "cat:q-bio.NC", "cat:q-bio.CB"]
+        pipeline, _, _ = self.run_pipeline([[make_paper("1")]], queries=queries)
+        
+        assert pipeline.budgets == {"cat:q-bio.TO": 34, "cat:q-bio.NC": 33, "cat:q-bio.CB": 33}
+    
+    def test_propagates_stage_failures(self):
+        async def failing_pages(max_results, start_offset=0, query=ARXIV_QUERY):
+            yield 50, [make_paper("1")]
+        
+        collection = make_chunk_collection()
+        
+        with patch('app.services.ingestion.iter_paper_pages', failing_pages), \
+             patch('app.services.ingestion.generate_embeddings_batch',
+                   side_effect=Exception("Ollama connection failed")):
+            pipeline = IngestionPipeline(AtlasVectorStore(collection), max_papers=1)
+            with pytest.raises(Exception) as exc_info:
+                asyncio.run(pipeline.run())
         
         assert "Ollama" in str(exc_info.value)
 
@@ -83,25 +419,75 @@ class TestGenerationService:
         
         prompt = create_prompt(query, context)
         
-        assert "ONLY" in prompt or "only" in prompt.lower()
-        assert "research" in prompt.lower()
+        assert "ONLY" in SYSTEM_PROMPT
+        assert "research" in SYSTEM_PROMPT.lower()
         assert query in prompt
         assert context in prompt
         
-        assert "cite" in prompt.lower() or "arxiv" in prompt.lower()
+        assert "cite" in SYSTEM_PROMPT.lower() or "arxiv" in SYSTEM_PROMPT.lower()
+        
+        assert "hallucinate" in SYSTEM_PROMPT.lower() or "make up" in SYSTEM_PROMPT.lower()
+        assert "RULES" not in prompt
+    
+    def test_drops_sentences_repeated_across_chunks(self):
+        chunks = [
+            {"arxiv_id": "a", "title": "A", "chunk_text": "Autophagy is a degradation pathway. It is conserved."},
+            {"arxiv_id": "b", "title": "B", "chunk_text": "Autophagy  is a degradation pathway. Apoptosis differs."}
+        ]
+        
+        context = build_context(chunks)
         
-        assert "hallucinate" in prompt.lower() or "make up" in prompt.lower()
+        assert context.count("degradation pathway") == 1
+        assert "Apoptosis differs." in context
     
-    @patch('app.services.generation.ollama.Client')
+    def test_packs_context_within_token_budget(self):
+        sentence = "Autophagy recycles damaged organelles in stressed cells number {}."
+        chunks = [
+            {
+                "arxiv_id": f"paper-{i}",
+                "title": f"Paper {i}",
+                "chunk_text": " ".join(sentence.format(f"{i}-{j}") for j in range(20)),
+                "score": score
+            }
+            for i, score in enumerate([0.9, 0.6, 0.3])
+        ]
+        
+        context = build_context(chunks, max_tokens=300)
+        parts = context.split("[Research Paper ")[1:]
+        
+        assert estimate_tokens(context) <= 300
+        assert len(parts) == 3
+        assert len(parts[0]) > len(parts[1]) > len(parts[2])
+    
+    def test_short_chunks_leave_budget_to_others(self):
+        chunks = [
+            {"arxiv_id": "a", "title": "A", "chunk_text": "Short finding.", "score": 0.9},
+            {"arxiv_id": "b", "title": "B", "chunk_text": " ".join(f"Supporting sentence {i}." for i in range(60)), "score": 0.5}
+        ]
+        
+        context = build_context(chunks, max_tokens=200)
+        
+        assert "Short finding." in context
+        assert estimate_tokens(context) > 150
+    
+    def test_cuts_overlong_sentence_at_word_boundary(self):
+        chunks = [{"arxiv_id": "a", "title": "A", "chunk_text": "word " * 400}]
+        
+        context = build_context(chunks, max_tokens=100)
+        
+        assert context.rstrip().endswith("…")
+        assert estimate_tokens(context) <= 100
+    
+    @patch('app.services.generation.ollama_client.get_client')
     def test_generates_answer_with_chunks(self, mock_client):
         mock_instance = Mock()
-        mock_instance.generate.return_value = {
+        mock_instance.generate = AsyncMock(return_value={
             "response": (
                 "Based on available research literature, autophagy "
                 "is a cellular degradation process. According to "
                 "arXiv:2301.12345, it plays a role in cancer."
             )
-        }
+        })
         mock_client.return_value = mock_instance
         
         chunks = [
@@ -112,7 +498,7 @@ class TestGenerationService:
             }
         ]
         
-        answer = generate_answer("What is autophagy?", chunks)
+        answer = asyncio.run(generate_answer("What is autophagy?", chunks))
         
         assert isinstance(answer, str)
         assert len(answer) > 0
@@ -120,15 +506,15 @@ class TestGenerationService:
         mock_instance.generate.assert_called_once()
     
     def test_handles_empty_chunks(self):
-        answer = generate_answer("query", [])
+        answer = asyncio.run(generate_answer("query", []))
         
         assert isinstance(answer, str)
         assert "could not find" in answer.lower() or "insufficient" in answer.lower()
     
-    @patch('app.services.generation.ollama.Client')
+    @patch('app.services.generation.ollama_client.get_client')
     def test_passes_complete_context_to_llm(self, mock_client):
         mock_instance = Mock()
-        mock_instance.generate.return_value = {"response": "Answer"}
+        mock_instance.generate = AsyncMock(return_value={"response": "Answer"})
         mock_client.return_value = mock_instance
         
         chunks = [
@@ -144,7 +530,7 @@ class TestGenerationService:
             }
         ]
         
-        generate_answer("query", chunks)
+        asyncio.run(generate_answer("query", chunks))
         
         call_kwargs = mock_instance.generate.call_args[1]
         prompt = call_kwargs['prompt']
@@ -154,14 +540,38 @@ class TestGenerationService:
         assert "Important finding A" in prompt
         assert "Important finding B" in prompt
     
-    @patch('app.services.generation.ollama.Client')
+    @patch('app.services.generation.ollama_client.get_client')
     def test_uses_correct_llm_model(self, mock_client):
         mock_instance = Mock()
-        mock_instance.generate.return_value = {"response": "Answer"}
+        mock_instance.generate = AsyncMock(return_value={"response": "Answer"})
         mock_client.return_value = mock_instance
         
         chunks = [{"arxiv_id": "123", "title": "T", "chunk_text": "C"}]
-        generate_answer("query", chunks)
+        asyncio.run(generate_answer("query", chunks))
+        
+        call_kwargs = mock_instance.generate.call_args[1]
+        assert call_kwargs['model'] == 'llama3.2'
+        assert call_kwargs['system'] == SYSTEM_PROMPT
+        assert call_kwargs['keep_alive'] == '30m'
+    
+    @patch('app.services.generation.ollama_client.get_client')
+    def test_streams_tokens_from_llm(self, mock_get_client):
+        async def parts():
+            for token in ["Based on ", "research", ""]:
+                yield {"response": token}
+        
+        mock_instance = Mock()
+        mock_instance.generate = AsyncMock(return_value=parts())
+        mock_get_client.return_value = mock_instance
+        
+        chunks = [{"arxiv_id": "123", "title": "T", "chunk_text": "C"}]
+        
+        async def collect():
+            return [token async for token in stream_answer("query", chunks)]
+        
+        tokens = asyncio.run(collect())
         
+        assert tokens == ["Based on ", "research"]
         call_kwargs = mock_instance.generate.call_args[1]
-        assert call_kwargs['model'] == 'llama3.2'
\ No newline at end of file
+        assert call_kwargs['stream'] is True
+        assert call_kwargs['model'] == 'llama3.2'
@@ -1,6 +1,7 @@
 
 import pytest
-from app.utils.text_cleaning import clean_text, chunk_text
+from app.utils.chunking import chunk_text, split_sentences, estimate_tokens
+from app.utils.text_cleaning import clean_text, clean_texts, CleaningProfile, ANSWER, StreamingCleaner
 
 
 class TestCleanText:
@@ -39,50 +40,155 @@ class TestCleanText:
         assert "\n" not in result
         assert "autophagy" in result.lower()
 
+    def test_preserves_scientific_notation(self):
+        text = "IC50 of 5 µM ± 0.2 for α-synuclein at 37 °C; Na⁺/K⁺-ATPase → 50% (p < 0.05)"
+        assert clean_text(text) == text
+        assert clean_text(text, ANSWER) == text
+
+    def test_removes_control_and_zero_width_characters(self):
+        assert clean_text("Auto\u00adphagy\u200b is\x00 key\ufeff.") == "Autophagy is key."
+
+    def test_ingest_keeps_paper_text(self):
+        text = "Furthermore, autophagy (According to arXiv:2301.12345v1) is *key*."
+        assert clean_text(text) == text
+
+    def test_answer_strips_boilerplate_citations_and_markdown(self):
+        text = (
+            "## Summary\n"
+            "Based on available research literature, **autophagy** is `key` (According to arXiv:2301.12345v1).\n"
+            "In summary, it matters. In summary, twice."
+        )
+        assert clean_text(text, "answer") == "Summary autophagy is key . it matters. In summary, twice."
+
+    def test_batch_matches_single(self):
+        texts = ["Line  1\n", "", "α  β\tγ", "Furthermore, done."]
+        assert clean_texts(texts) == [clean_text(text) for text in texts]
+        assert clean_texts(texts, ANSWER) == [clean_text(text, ANSWER) for text in texts]
+
+    def test_custom_profile(self):
+        profile = CleaningProfile("citations only", ["citations"])
+        assert profile.clean("**Cells** (According to arXiv:1) adapt") == "**Cells** adapt"
+
+    def test_rejects_unknown_steps_and_profiles(self):
+        with pytest.raises(ValueError, match="Unknown cleaning steps"):
+            CleaningProfile("bad", ["citations", "stemming"])
+        with pytest.raises(ValueError, match="Unknown cleaning profile"):
+            clean_text("text", "abstract")
+
+
+class TestStreamingCleaner:
+    
+    def stream(self, text, step):
+        cleaner = StreamingCleaner()
+        output = ""
+        for i in range(0, len(text), step):
+            output += cleaner.feed(text[i:i + step])
+        return output + cleaner.flush()
+    
+    @pytest.mark.parametrize("step", [1, 3, 7, 1000])
+    def test_matches_clean_text(self, step):
+        text = (
+            "Based on available research literature, autophagy is key "
+            "(According to arXiv:2301.12345v1). It matters.\n"
+            "Furthermore, cells die. For instance, this holds. Done"
+        )
+        assert self.stream(text, step) == clean_text(text, ANSWER)
+
+    @pytest.mark.parametrize("step", [1, 5, 1000])
+    def test_matches_clean_text_with_markdown(self, step):
+        text = (
+            "## Mechanism\n"
+            "**Furthermore**, α-synuclein binds at 5 µM. See `LC3` # 2.\n"
+            "# Outcome\n"
+            "In summary, 37 °C → 42 °C raises *HSP70*."
+        )
+        assert self.stream(text, step) == clean_text(text, ANSWER)
+    
+    def test_holds_text_until_sentence_ends(self):
+        cleaner = StreamingCleaner()
+        assert cleaner.feed("Autophagy is") == ""
+        assert cleaner.feed(" a process. It") == "Autophagy is a process."
+        assert cleaner.flush() == " It"
+    
+    def test_waits_for_closing_parenthesis(self):
+        cleaner = StreamingCleaner()
+        assert cleaner.feed("Cells adapt (see e.g. ") == ""
+        assert cleaner.feed("prior work). Next") == "Cells adapt (see e.g. prior work)."
+
+
+class TestSentenceSplitting:
+    
+    def test_keeps_biomedical_abbreviations_inside_sentences(self):
+        text = (
+            "Smith et al. reported lower IC50 values (e.g. 0.5 uM) in Fig. 2. "
+            "Responses were measured vs. baseline. Cells from donor J. Doe were excluded. "
+            "Results held across cohorts, cf. the supplement."
+        )
+        assert split_sentences(text) == [
+            "Smith et al. reported lower IC50 values (e.g. 0.5 uM) in Fig. 2.",
+            "Responses were measured vs. baseline.",
+            "Cells from donor J. Doe were excluded.",
+            "Results held across cohorts, cf. the supplement."
+        ]
+    
+    def test_et_al_ends_sentence_before_capitalized_word(self):
+        text = "This was shown by Chen et al. The effect persisted. Was it causal? Yes!"
+        assert split_sentences(text) == [
+            "This was shown by Chen et al.", "The effect persisted.", "Was it causal?", "Yes!"
+        ]
+    
+    def test_keeps_closing_quotes_and_brackets(self):
+        text = 'Mice were "resistant." (Data not shown.) Next.'
+        assert split_sentences(text) == ['Mice were "resistant."', "(Data not shown.)", "Next."]
+
 
 class TestChunkText:
     
     def test_short_text_returns_single_chunk(self):
         text = "Short abstract about autophagy."
-        chunks = chunk_text(text, chunk_size=100, overlap=20)
-        assert len(chunks) == 1
-        assert chunks[0] == text
+        assert chunk_text(text, max_tokens=100, overlap_tokens=20) == [text]
     
-    def test_long_text_creates_multiple_chunks(self):
-        text = "A" * 500
-        chunks = chunk_text(text, chunk_size=100, overlap=0)
+    def test_blank_text_has_no_chunks(self):
+        assert chunk_text("   ") == []
+    
+    def test_respects_token_limit(self):
+        text = " ".join(f"Sentence number {i} describes a finding." for i in range(200))
+        chunks = chunk_text(text, max_tokens=40, overlap_tokens=10)
+        
         assert len(chunks) > 1
-        assert len(chunks) == 5 
-    def test_respects_chunk_size_limit(self):
-        text = "word " * 200  
-        chunks = chunk_text(text, chunk_size=150, overlap=0)
-        for chunk in chunks:
-            assert len(chunk) <= 150
-    
-    def test_overlap_creates_shared_content(self):
-        text = "AAAAA BBBBB CCCCC DDDDD EEEEE FFFFF GGGGG"
-        chunks = chunk_text(text, chunk_size=25, overlap=10)
+        assert all(estimate_tokens(chunk) <= 40 for chunk in chunks)
+        assert all(chunk.endswith(".") for chunk in chunks)
+    
+    def test_overlap_repeats_whole_trailing_sentences(self):
+        sentences = [f"Finding {i} was significant." for i in range(12)]
+        chunks = chunk_text(" ".join(sentences), max_tokens=30, overlap_tokens=8)
         
-        if len(chunks) > 1:
-            for i in range(len(chunks) - 1):
-                overlap_found = any(
-                    word in chunks[i+1] 
-                    for word in chunks[i].split()[-2:]
-                )
-                assert overlap_found, "Chunks should have overlapping content"
-    
-    def test_sentence_boundary_splitting(self):
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current.startswith(split_sentences(previous)[-1])
+            assert split_sentences(current)[-1] != split_sentences(previous)[-1]
+    
+    def test_without_overlap_chunks_partition_the_text(self):
         text = "First sentence. Second sentence. Third sentence. Fourth sentence."
-        chunks = chunk_text(text, chunk_size=40, overlap=0)
+        chunks = chunk_text(text, max_tokens=10, overlap_tokens=0)
         
-        period_endings = [chunk.rstrip().endswith('.') for chunk in chunks]
-        assert any(period_endings), "Should split at sentence boundaries"
+        assert " ".join(chunks) == text
+        assert all(chunk.endswith(".") for chunk in chunks)
     
-    def test_no_empty_chunks_created(self):
-        text = "Some text with   spaces"
-        chunks = chunk_text(text, chunk_size=10, overlap=3)
-        for chunk in chunks:
-            assert len(chunk.strip()) > 0
+    def test_splits_long_sentences_at_words(self):
+        text = "word " * 200
+        chunks = chunk_text(text, max_tokens=25, overlap_tokens=5)
+        
+        assert all(estimate_tokens(chunk) <= 25 for chunk in chunks)
+        assert all(not chunk.startswith("ord") for chunk in chunks)
+        assert sum(chunk.count("word") for chunk in chunks) >= 200
+    
+    def test_pathological_input_terminates_quickly(self):
+        # No spaces and a period every other character: the old rfind loop's worst case.
+        text = "a." * 200000
+        chunks = chunk_text(text, max_tokens=64, overlap_tokens=63)
+        
+        assert all(len(chunk) <= 256 for chunk in chunks)
+        assert "".join(chunks) == text
     
     def test_handles_scientific_abstract(self):
         text = (
@@ -93,12 +199,9 @@ class TestChunkText:
             "has been implicated in various diseases including cancer."
         )
         
-        chunks = chunk_text(text, chunk_size=150, overlap=30)
+        chunks = chunk_text(text, max_tokens=40, overlap_tokens=8)
         
         assert len(chunks) > 1
-        
-        combined = " ".join(chunks)
-        assert "Autophagy" in combined
-        assert "cancer" in combined
-        
-        assert all(len(chunk) <= 150 for chunk in chunks)
\ No newline at end of file
+        assert chunks[0].startswith("Autophagy")
+        assert chunks[-1].endswith("cancer.")
+        assert all(estimate_tokens(chunk) <= 40 for chunk in chunks)
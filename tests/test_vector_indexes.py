@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+from app.main import check_vector_index
+from app.db.vector_indexes import VECTOR_INDEX_DEFINITION, ensure_vector_index, vector_index_definition
+
+
+class FakeSearchIndexes:
+    """Collection stand-in whose search index becomes queryable after a few polls."""
+
+    def __init__(self, existing=None, polls_until_ready=2, status="BUILDING"):
+        self.index = existing
+        self.polls_until_ready = polls_until_ready
+        self.status = status
+        self.created = []
+        self.updated = []
+
+    async def list_search_indexes(self, name=None):
+        if self.index is not None and self.index["name"] == name:
+            if self.polls_until_ready <= 0:
+                self.index.update(status="READY", queryable=True)
+            self.polls_until_ready -= 1
+            yield self.index
+
+    async def create_search_index(self, model):
+        document = model.document
+        self.created.append(document)
+        self.index = {
+            "name": document["name"],
+            "status": self.status,
+            "queryable": False,
+            "latestDefinition": document["definition"]
+        }
+
+    async def update_search_index(self, name, definition):
+        self.updated.append(definition)
+        self.index["latestDefinition"] = definition
+
+
+def existing_index(dimensions=768, filters=("categories", "arxiv_id")):
+    fields = [{"type": "vector", "path": "embedding", "numDimensions": dimensions, "similarity": "cosine"}]
+    fields += [{"type": "filter", "path": path} for path in filters]
+    return {"name": "vector_index", "status": "READY", "queryable": True, "latestDefinition": {"fields": fields}}
+
+
+class TestEnsureVectorIndex:
+
+    def test_creates_missing_index_and_waits_until_queryable(self):
+        collection = FakeSearchIndexes()
+
+        index = asyncio.run(ensure_vector_index(collection, "vector_index", 768, timeout=5, poll_interval=0.001))
+
+        created = collection.created[0]
+        assert created["type"] == "vectorSearch"
+        assert created["definition"]["fields"][0]["numDimensions"] == 768
+        assert index["queryable"]
+
+    def test_rejects_dimension_mismatch(self):
+        collection = FakeSearchIndexes(existing=existing_index(dimensions=1024, filters=("categories", "arxiv_id", "published")))
+
+        with pytest.raises(RuntimeError, match="1024 dimensions"):
+            asyncio.run(ensure_vector_index(collection, "vector_index", 768, timeout=5, poll_interval=0.001))
+
+    def test_adds_missing_filter_fields(self):
+        collection = FakeSearchIndexes(existing=existing_index(), polls_until_ready=0)
+
+        asyncio.run(ensure_vector_index(collection, "vector_index", 768, timeout=5, poll_interval=0.001))
+
+        paths = {field["path"] for field in collection.updated[0]["fields"]}
+        assert "published" in paths
+        assert collection.created == []
+
+    def test_trusts_existing_index_when_model_size_unknown(self):
+        collection = FakeSearchIndexes(existing=existing_index(filters=("categories", "arxiv_id", "published")))
+
+        asyncio.run(ensure_vector_index(collection, "vector_index", None, timeout=5, poll_interval=0.001))
+
+        assert collection.updated == []
+
+    def test_times_out_while_building(self):
+        collection = FakeSearchIndexes(polls_until_ready=10 ** 6)
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(ensure_vector_index(collection, "vector_index", 768, timeout=0.01, poll_interval=0.001))
+
+    def test_definition_defaults_are_not_mutated(self):
+        vector_index_definition(384)
+
+        assert VECTOR_INDEX_DEFINITION["fields"][0]["numDimensions"] == 1024
+
+
+class TestStartupCheck:
+
+    def test_rejects_local_store_with_other_dimensions(self):
+        store = SimpleNamespace(dim=768)
+
+        with patch('app.main.configs.vector_backend', "local"), \
+             patch('app.main.get_vector_store', return_value=store), \
+             patch('app.main.probe_embedding_dimensions', AsyncMock(return_value=1024)):
+            with pytest.raises(RuntimeError, match="768 dimensions"):
+                asyncio.run(check_vector_index())
+
+    def test_provisions_atlas_index_with_probed_size(self):
+        ensure = AsyncMock()
+
+        with patch('app.main.configs.vector_backend', "atlas"), \
+             patch('app.main.ensure_vector_index', ensure), \
+             patch('app.main.probe_embedding_dimensions', AsyncMock(return_value=768)):
+            asyncio.run(check_vector_index())
+
+        assert ensure.call_args[0][2] == 768
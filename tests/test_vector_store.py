@@ -0,0 +1,248 @@
+import asyncio
+import pytest
+import numpy as np
+from datetime import datetime
+from unittest.mock import Mock
+from app.db.local_vector_store import LocalVectorStore, StoreLockedError
+from app.db.vector_store import AtlasVectorStore
+from app.db.vector_indexes import VECTOR_INDEX_DEFINITION
+from app.models.schema import QueryRequest
+from app.services.retrieval import search_papers, build_search_filter
+
+
+def make_docs(vectors, categories=None):
+    docs = []
+    for i, vector in enumerate(vectors):
+        docs.append({
+            "arxiv_id": f"paper-{i}",
+            "version": 1,
+            "title": f"Paper {i}",
+            "authors": ["Author"],
+            "published": datetime(2023, 1, 1 + i % 28),
+            "categories": (categories or {}).get(i, ["q-bio.TO"]),
+            "chunk_text": f"chunk {i}",
+            "chunk_index": 0,
+            "content_hash": f"hash-{i}",
+            "embedding": list(vector)
+        })
+    return docs
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+class TestLocalVectorStore:
+
+    def test_returns_exact_top_k(self):
+        vectors = random_vectors(200)
+        store = LocalVectorStore(ivf_min_vectors=0)
+        asyncio.run(store.insert_many(make_docs(vectors)))
+
+        query = vectors[42] + 0.01
+        results = asyncio.run(store.search(list(query), top_k=5, num_candidates=50))
+
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+
+        assert [doc["arxiv_id"] for doc in results] == [f"paper-{i}" for i in expected]
+        assert results[0]["arxiv_id"] == "paper-42"
+        assert 0.99 < results[0]["score"] <= 1.0
+        assert "embedding" not in results[0]
+
+    def test_filters_on_array_and_scalar_fields(self):
+        vectors = random_vectors(20)
+        categories = {3: ["q-bio.TO", "q-bio.CB"], 7: ["q-bio.CB"]}
+        store = LocalVectorStore(ivf_min_vectors=0)
+        asyncio.run(store.insert_many(make_docs(vectors, categories)))
+
+        results = asyncio.run(store.search(
+            list(vectors[0]), top_k=5, num_candidates=50, filters={"categories": "q-bio.CB"}
+        ))
+        assert sorted(doc["arxiv_id"] for doc in results) == ["paper-3", "paper-7"]
+
+        results = asyncio.run(store.search(
+            list(vectors[0]), top_k=20, num_candidates=50,
+            filters={"$and": [
+                {"arxiv_id": {"$nin": ["paper-0"]}},
+                {"published": {"$gte": datetime(2023, 1, 15)}}
+            ]}
+        ))
+        assert len(results) == 6
+        assert "paper-0" not in {doc["arxiv_id"] for doc in results}
+
+    def test_persists_and_reloads(self, tmp_path):
+        vectors = random_vectors(10)
+        store = LocalVectorStore(str(tmp_path), ivf_min_vectors=0)
+        asyncio.run(store.insert_many(make_docs(vectors)))
+
+        reloaded = LocalVectorStore(str(tmp_path), ivf_min_vectors=0)
+        results = asyncio.run(reloaded.search(list(vectors[4]), top_k=1, num_candidates=10))
+
+        assert len(reloaded) == 10
+        assert results[0]["arxiv_id"] == "paper-4"
+        keys = asyncio.run(reloaded.existing_keys(["paper-4"]))
+        assert keys == {("paper-4", 1, 0, "hash-4")}
+
+    def test_deleted_chunks_stay_deleted_after_reload(self, tmp_path):
+        vectors = random_vectors(10)
+        store = LocalVectorStore(str(tmp_path), ivf_min_vectors=0)
+        asyncio.run(store.insert_many(make_docs(vectors)))
+
+        deleted = asyncio.run(store.delete_chunks([("paper-4", 1, 0, "hash-4"), ("paper-4", 2, 0, "hash-4")]))
+        reloaded = LocalVectorStore(str(tmp_path), ivf_min_vectors=0)
+
+        for current in (store, reloaded):
+            results = asyncio.run(current.search(list(vectors[4]), top_k=10, num_candidates=10))
+            assert len(current) == 9
+            assert "paper-4" not in {doc["arxiv_id"] for doc in results}
+            assert asyncio.run(current.existing_keys(["paper-4"])) == set()
+        assert deleted == 1
+
+        asyncio.run(reloaded.insert_many(make_docs(vectors)[4:5]))
+        assert asyncio.run(reloaded.search(list(vectors[4]), top_k=1, num_candidates=10))[0]["arxiv_id"] == "paper-4"
+
+    def test_loads_legacy_versioned_ids_as_base_ids(self, tmp_path):
+        docs = make_docs(random_vectors(2))
+        docs[0]["arxiv_id"] = "2301.00001v3"
+        asyncio.run(LocalVectorStore(str(tmp_path), ivf_min_vectors=0).insert_many(docs))
+
+        reloaded = LocalVectorStore(str(tmp_path), ivf_min_vectors=0)
+
+        assert asyncio.run(reloaded.existing_keys(["2301.00001"])) == {("2301.00001", 1, 0, "hash-0")}
+
+    def test_exclusive_store_locks_its_directory(self, tmp_path):
+        store = LocalVectorStore(str(tmp_path), exclusive=True)
+
+        with pytest.raises(StoreLockedError):
+            LocalVectorStore(str(tmp_path), exclusive=True)
+        LocalVectorStore(str(tmp_path))
+
+        store.close()
+        LocalVectorStore(str(tmp_path), exclusive=True).close()
+
+    def test_skips_duplicate_chunks(self):
+        docs = make_docs(random_vectors(5))
+        store = LocalVectorStore(ivf_min_vectors=0)
+
+        asyncio.run(store.insert_many(docs))
+        asyncio.run(store.insert_many(docs[:3]))
+
+        assert len(store) == 5
+
+    def test_ivf_search_keeps_recall(self):
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(20, 32))
+        vectors = (centers[rng.integers(0, 20, 4000)] + rng.normal(scale=0.3, size=(4000, 32))).astype(np.float32)
+
+        exact = LocalVectorStore(ivf_min_vectors=0)
+        approximate = LocalVectorStore(ivf_min_vectors=1000, ivf_nlist=32)
+        docs = make_docs(vectors)
+        asyncio.run(exact.insert_many(docs))
+        asyncio.run(approximate.insert_many(docs))
+
+        hits = 0
+        for query in vectors[:50]:
+            expected = {doc["_id"] for doc in exact.search_sync(list(query), 10, 200)}
+            found = {doc["_id"] for doc in approximate.search_sync(list(query), 10, 200)}
+            hits += len(expected & found)
+
+        assert approximate._ivf is not None
+        assert hits / 500 >= 0.9
+
+
+class TestSearchPapers:
+
+    def test_delegates_to_store_and_applies_min_score(self):
+        store = Mock()
+
+        async def search(query_vector, top_k, num_candidates, filters=None, include_embeddings=False):
+            store.call = (top_k, num_candidates, filters)
+            return [
+                {"arxiv_id": "a", "chunk_text": "a", "score": 0.95},
+                {"arxiv_id": "b", "chunk_text": "b", "score": 0.2}
+            ]
+
+        store.search = search
+
+        results = asyncio.run(search_papers(
+            "query", store, top_k=3, query_embedding=[0.1] * 4, filters={"categories": "q-bio.TO"}
+        ))
+
+        assert [doc["arxiv_id"] for doc in results] == ["a"]
+        # Three results, over-fetched by mmr_depth_factor for re-ranking.
+        assert store.call == (12, 120, {"categories": "q-bio.TO"})
+
+    def test_atlas_store_builds_vector_search_stage(self):
+        collection = Mock()
+        pipelines = []
+
+        async def results():
+            yield {"arxiv_id": "a", "score": 0.9}
+
+        def aggregate(pipeline):
+            pipelines.append(pipeline)
+            return results()
+
+        collection.aggregate = aggregate
+        store = AtlasVectorStore(collection)
+
+        docs = asyncio.run(store.search([0.1] * 4, 5, 50, {"categories": "q-bio.TO"}))
+
+        stage = pipelines[0][0]["$vectorSearch"]
+        assert docs == [{"arxiv_id": "a", "score": 0.9}]
+        assert stage["filter"] == {"categories": "q-bio.TO"}
+        assert stage["numCandidates"] == 50
+        assert stage["limit"] == 5
+
+
+class TestSearchFilters:
+
+    def test_builds_single_and_combined_filters(self):
+        request = QueryRequest(case_description="a" * 20, arxiv_ids=["paper-1"])
+        assert build_search_filter(request) == {"arxiv_id": {"$in": ["paper-1"]}}
+
+        request = QueryRequest(
+            case_description="a" * 20,
+            published_from=datetime(2023, 1, 5),
+            published_to=datetime(2023, 1, 10)
+        )
+        assert build_search_filter(request) == {
+            "published": {"$gte": datetime(2023, 1, 5), "$lte": datetime(2023, 1, 10)}
+        }
+        assert build_search_filter(QueryRequest(case_description="a" * 20)) is None
+
+    def test_prefilters_local_store_search(self):
+        vectors = random_vectors(30)
+        store = LocalVectorStore()
+        asyncio.run(store.insert_many(make_docs(vectors, categories={3: ["q-bio.CB"], 7: ["q-bio.CB"]})))
+        request = QueryRequest(
+            case_description="a" * 20,
+            categories=["q-bio.CB"],
+            published_to=datetime(2023, 1, 6)
+        )
+
+        results = asyncio.run(store.search(
+            list(vectors[7]), top_k=5, num_candidates=50, filters=build_search_filter(request)
+        ))
+
+        assert [doc["arxiv_id"] for doc in results] == ["paper-3"]
+
+    def test_versioned_ids_match_stored_base_ids(self):
+        vectors = random_vectors(5)
+        docs = make_docs(vectors)
+        docs[2].update(arxiv_id="2301.12345", version=2)
+        store = LocalVectorStore()
+        asyncio.run(store.insert_many(docs))
+        request = QueryRequest(case_description="a" * 20, arxiv_ids=["2301.12345v1"])
+
+        results = asyncio.run(store.search(
+            list(vectors[0]), top_k=5, num_candidates=50, filters=build_search_filter(request)
+        ))
+
+        assert [(doc["arxiv_id"], doc["version"]) for doc in results] == [("2301.12345", 2)]
+
+    def test_index_definition_declares_filter_fields(self):
+        paths = {field["path"] for field in VECTOR_INDEX_DEFINITION["fields"] if field["type"] == "filter"}
+
+        assert {"categories", "arxiv_id", "published"} <= paths
@@ -1,7 +1,7 @@
 import streamlit as st
 import requests
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator
 import json
 st.set_page_config(
     page_title="Medical Case Assistant",
@@ -24,16 +24,37 @@ def get_api_url() -> str:
     return st.session_state.get('api_base_url', API_BASE_URL)
 
 
-def call_ingest_api(max_papers: int) -> Dict[str, Any]:
-    url = f"{get_api_url()}/ingest/arxiv"
+def call_ingest_api(max_papers: int, on_progress=None, poll_interval: float = 2.0) -> Dict[str, Any]:
+    """Submit an ingestion job and poll it until it finishes."""
+    url = f"{get_api_url()}/ingest/jobs"
     payload = {"max_papers": max_papers}
     
     try:
-        response = requests.post(url, json=payload, timeout=3600)  # 1 hour timeout
+        response = requests.post(url, json=payload, timeout=10)
         response.raise_for_status()
+        job = response.json()
+        
+        while job["status"] in ("queued", "running"):
+            time.sleep(poll_interval)
+            response = requests.get(f"{url}/{job['job_id']}", timeout=10)
+            response.raise_for_status()
+            job = response.json()
+            if on_progress:
+                on_progress(job)
+        
+        if job["status"] != "completed":
+            return {
+                "success": False,
+                "error": job.get("error") or f"Ingestion job {job['status']}"
+            }
+        
         return {
             "success": True,
-            "data": response.json()
+            "data": {
+                "papers_processed": job["papers_fetched"],
+                "chunks_created": job["chunks_stored"],
+                "message": job["message"]
+            }
         }
     except requests.exceptions.Timeout:
         return {
@@ -89,6 +110,38 @@ def call_query_api(case_description: str) -> Dict[str, Any]:
             "error": str(e)
         }
 
+def call_query_stream_api(case_description: str) -> Iterator[Dict[str, Any]]:
+    url = f"{get_api_url()}/query/case/stream"
+    payload = {"case_description": case_description}
+    
+    try:
+        # The read timeout applies between streamed lines, not to the whole answer
+        with requests.post(url, json=payload, stream=True, timeout=(5, 120)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+    except requests.exceptions.Timeout:
+        yield {
+            "type": "error",
+            "detail": "Query timed out. Try a simpler question or check the server."
+        }
+    except requests.exceptions.ConnectionError:
+        yield {
+            "type": "error",
+            "detail": "Cannot connect to API server. Is it running?"
+        }
+    except requests.exceptions.HTTPError as e:
+        yield {
+            "type": "error",
+            "detail": f"HTTP Error: {e.response.status_code} - {e.response.text}"
+        }
+    except Exception as e:
+        yield {
+            "type": "error",
+            "detail": str(e)
+        }
+
 def display_api_request(method: str, endpoint: str, payload: Dict = None):
     """Display the API request being made."""
     with st.expander("📡 API Request Details", expanded=False):
@@ -157,28 +210,46 @@ def main():
             if not query_text or len(query_text) < 20:
                 st.warning("Please enter a detailed query (at least 20 characters).")
             else:                
-                # Make API call
+                # Stream the answer: references arrive as soon as retrieval
+                # finishes, then tokens as the model produces them
+                st.subheader("Answer")
+                answer_placeholder = st.empty()
+                answer = ""
+                references = None
+                error = None
+                retrieval_time = 0.0
+                
+                start_time = time.time()
                 with st.spinner("🔎 Querying research literature via API..."):
-                    start_time = time.time()
-                    result = call_query_api(query_text)
-                    elapsed_time = time.time() - start_time
+                    for event in call_query_stream_api(query_text):
+                        if event["type"] == "references":
+                            references = event["references"]
+                            retrieval_time = time.time() - start_time
+                        elif event["type"] == "token":
+                            answer += event["text"]
+                            answer_placeholder.markdown(answer + "▌")
+                        elif event["type"] == "error":
+                            error = event["detail"]
+                            break
+                        elif event["type"] == "done":
+                            break
+                elapsed_time = time.time() - start_time
                 
                 # Display results
-                if result["success"]:
-                    data = result["data"]
+                if error is None:
+                    answer_placeholder.markdown(answer)
                     
                     # Show timing
-                    st.caption(f"Query completed in {elapsed_time:.2f} seconds")
-                    
-                    # Display answer
-                    st.subheader("Answer")
-                    st.markdown(data["answer"])
+                    st.caption(
+                        f"References in {retrieval_time:.2f} seconds, "
+                        f"query completed in {elapsed_time:.2f} seconds"
+                    )
                     
                     # Display references
-                    if data.get("references"):
-                        st.subheader(f"References ({len(data['references'])} papers)")
+                    if references:
+                        st.subheader(f"References ({len(references)} papers)")
                         
-                        for i, ref in enumerate(data["references"], 1):
+                        for i, ref in enumerate(references, 1):
                             with st.container():
                                 col1, col2, col3 = st.columns([0.5, 3, 1])
                                 
@@ -198,7 +269,7 @@ def main():
                         st.info("No references found for this query.")
                 
                 else:
-                    st.error(f"Query failed: {result['error']}")
+                    st.error(f"Query failed: {error}")
                     st.info("Make sure the API server is running and the database has papers.")
     
     
@@ -237,12 +308,22 @@ def main():
             
             with progress_container:
                 st.warning(f"⏳ Ingesting {max_papers} papers via API... This may take {estimated_time}+ minutes.")
-                st.info("💡 Tip: You can monitor the FastAPI server logs in your terminal to see detailed progress.")
+                st.info("💡 Tip: The job keeps running on the server even if this page is closed.")
             
             # Make API call
-            with st.spinner(f"📡 Calling API to ingest {max_papers} papers..."):
+            progress_bar = st.progress(0.0)
+            
+            def show_progress(job: Dict[str, Any]):
+                progress_bar.progress(min(job["papers_fetched"] / max_papers, 1.0))
+                eta = f", ~{job['eta_seconds'] / 60:.1f} min left" if job.get("eta_seconds") else ""
+                status_text.text(
+                    f"{job['status'].capitalize()}: {job['papers_fetched']} papers, "
+                    f"{job['chunks_stored']} chunks stored ({job['rate_chunks_per_sec']} chunks/s{eta})"
+                )
+            
+            with st.spinner(f"📡 Ingesting {max_papers} papers in the background..."):
                 start_time = time.time()
-                result = call_ingest_api(max_papers)
+                result = call_ingest_api(max_papers, on_progress=show_progress)
                 elapsed_time = time.time() - start_time
             
             # Display results